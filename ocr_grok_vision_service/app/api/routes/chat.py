@@ -1,8 +1,9 @@
 # app/api/routes/chat.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query, Header
+from fastapi.responses import StreamingResponse
 from typing import Annotated
 from app.models.schemas import ChatRequest, ChatResponse, ErrorDetail # Use ErrorDetail for Grok
-from app.services.ocr_service import OCRService # Reuse OCRService which now has chat method
+from app.services.ocr_service import OCRService, get_ocr_service, until_disconnected # Reuse OCRService which now has chat method
 from app.core.config import get_settings
 
 router = APIRouter()
@@ -20,7 +21,7 @@ def get_chat_configured_service(
     """Dependency to get OCRService instance, ready for chat or OCR."""
     try:
         # The service itself determines the model in the method call based on defaults or overrides
-        return OCRService() # API key check happens here
+        return get_ocr_service() # API key check happens here, the instance is shared
     except ValueError as e: # Catches API key configuration error from __init__
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -41,6 +42,7 @@ def get_chat_configured_service(
     }
 )
 async def generate_grok_chat_response(
+    request: Request,
     request_body: ChatRequest,
     service: Annotated[OCRService, Depends(get_chat_configured_service)],
     # Model name should come from the request body, not query parameter
@@ -50,19 +52,41 @@ async def generate_grok_chat_response(
 ):
     """
     Receives a user message and optional chat history, then returns
-    a text response generated by the configured Grok model.
+    a text response generated by the configured Grok model. With
+    "stream": true the response is relayed as server-sent events of
+    chat.completion.chunk objects while the model generates it. With a
+    session_id (see POST /vision/sessions) the session's image and history
+    are sent along and the turn is added to them.
     """
+    if request_body.session_id and request_body.history:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The history of an image session is kept by the session, send only the new message."
+        )
+
     try:
+        if request_body.stream:
+            generator = await service.stream_text_response(
+                message=request_body.message,
+                history=request_body.history,
+                model_name=request_body.model_name,
+                api_key=x_api_key,
+                session_id=request_body.session_id
+            )
+            return StreamingResponse(until_disconnected(request, generator), media_type="text/event-stream")
+
         # Pass the model_name override and api_key from the request to the service method
         response_text, model_used = await service.generate_text_response(
             message=request_body.message,
             history=request_body.history,
             model_name=request_body.model_name, # Pass model_name from the request body
-            api_key=x_api_key # Pass header override
+            api_key=x_api_key, # Pass header override
+            session_id=request_body.session_id
         )
         return ChatResponse(
             response_text=response_text,
-            model_used=model_used
+            model_used=model_used,
+            session_id=request_body.session_id
         )
     except HTTPException as http_exc:
         # Re-raise HTTPExceptions raised by the service
@@ -6,7 +6,10 @@ from datetime import datetime
 import psutil
 import time
 
-from app.services.ocr_service import OCRService
+from app.services.hedging import hedging_stats
+from app.services.http_client import upstream
+from app.services.image_sessions import image_sessions
+from app.services.ocr_service import get_ocr_service
 
 router = APIRouter()
 start_time = time.time()
@@ -16,6 +19,9 @@ class HealthResponse(BaseModel):
     uptime: str
     xai_api: bool
     system_stats: dict
+    upstream_pool: dict
+    hedging: dict
+    image_sessions: dict
 
 @router.get(
     "/health",
@@ -25,7 +31,7 @@ class HealthResponse(BaseModel):
 async def health_check():
     # Check XAI API connection
     try:
-        grok_service = OCRService()
+        get_ocr_service()
         xai_status = True
     except Exception:
         xai_status = False
@@ -44,5 +50,8 @@ async def health_check():
         status="healthy",
         uptime=uptime,
         xai_api=xai_status,
-        system_stats=system_stats
+        system_stats=system_stats,
+        upstream_pool=upstream.stats(),
+        hedging=hedging_stats(),
+        image_sessions=image_sessions.stats()
     )
\ No newline at end of file
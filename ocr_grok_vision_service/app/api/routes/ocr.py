@@ -7,10 +7,14 @@ from fastapi import (
     status,
     Depends,
     Header,
-    Query
+    Query,
+    Request,
+    Response
 )
-from app.services.ocr_service import OCRService
-from app.models.schemas import OCRResponse, ErrorDetail
+from fastapi.responses import StreamingResponse
+from app.services.ocr_service import OCRService, get_ocr_service as get_shared_ocr_service, until_disconnected
+from app.models.schemas import OCRResponse, ErrorDetail, ImageSessionResponse
+from app.services.image_sessions import ImageSession, image_sessions
 from app.core.config import get_settings, Settings
 from typing import Annotated
 import mimetypes # Keep for MIME type guessing
@@ -20,7 +24,7 @@ settings = get_settings()
 
 def get_ocr_service():
     try:
-        return OCRService()
+        return get_shared_ocr_service()
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -35,6 +39,8 @@ def get_ocr_service():
 )
 async def perform_ocr(
     service: Annotated[OCRService, Depends(get_ocr_service)],
+    request: Request,
+    response: Response,
     file: UploadFile = File(..., description="Image file (JPEG or PNG)."),
     model_name: str | None = Query(None, description=f"Optional: Specify Grok vision model."),
     prompt: str | None = Query(
@@ -42,10 +48,12 @@ async def perform_ocr(
         description="Custom prompt for OCR extraction"
     ),
     x_api_key: str | None = Header(None, alias="X-API-Key"),
+    stream: bool = Query(False, description="Stream the extracted text as server-sent events"),
 ):
     """
     Receives an image file (JPEG/PNG), sends it to the OCR service,
-    and returns the extracted text.
+    and returns the extracted text. With stream=true the text is relayed
+    as server-sent events of chat.completion.chunk objects as it is read.
     """
     if not file:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No upload file sent.")
@@ -61,7 +69,17 @@ async def perform_ocr(
             )
 
     try:
-        extracted_text, model_used = await service.extract_text_from_image(
+        if stream:
+            generator, image_budget = await service.stream_text_from_image(
+                file,
+                model_name=model_name,
+                prompt=prompt,
+                api_key=x_api_key
+            )
+            headers = {"Server-Timing": f"image_budget;dur={image_budget['budget_ms']}"} if image_budget else None
+            return StreamingResponse(until_disconnected(request, generator), media_type="text/event-stream", headers=headers)
+
+        extracted_text, model_used, image_budget = await service.extract_text_from_image(
             file,
             model_name=model_name,
             prompt=prompt,
@@ -75,11 +93,17 @@ async def perform_ocr(
             else:
                 content_type = "image/unknown"
 
+        if image_budget is not None:
+            response.headers["Server-Timing"] = (
+                f"image_budget;dur={image_budget['budget_ms']}, upstream;dur={image_budget['upstream_ms']}"
+            )
+
         return OCRResponse(
             filename=file.filename or "uploaded_image",
             content_type=content_type,
             extracted_text=extracted_text,
-            model_used=model_used
+            model_used=model_used,
+            image_budget=image_budget
         )
     except HTTPException as http_exc:
          raise http_exc
@@ -91,3 +115,47 @@ async def perform_ocr(
     finally:
         await file.close()
 
+
+def session_response(session: ImageSession) -> ImageSessionResponse:
+    return ImageSessionResponse(
+        session_id=session.session_id,
+        model=session.model,
+        detail=session.detail,
+        expires_in=image_sessions.ttl_seconds,
+        history=session.history,
+        image_budget=session.image_budget
+    )
+
+
+@router.post(
+    "/sessions",
+    response_model=ImageSessionResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Keep an Image for Follow-up Questions"
+)
+async def create_image_session(
+    service: Annotated[OCRService, Depends(get_ocr_service)],
+    file: UploadFile = File(..., description="Image file (JPEG or PNG)."),
+    model_name: str | None = Query(None, description="Optional: Grok vision model for the session's turns."),
+):
+    """
+    Uploads an image once. Chat requests with the returned session_id ask
+    about it without sending the image again; the session keeps the
+    conversation and expires after GROK_SESSION_TTL_SECONDS without turns.
+    """
+    try:
+        session = await service.create_image_session(file, model_name=model_name)
+        return session_response(session)
+    finally:
+        await file.close()
+
+
+@router.get("/sessions/{session_id}", response_model=ImageSessionResponse, summary="Get an Image Session")
+async def get_image_session(session_id: str, service: Annotated[OCRService, Depends(get_ocr_service)]):
+    return session_response(await service.get_image_session(session_id))
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT, summary="End an Image Session")
+async def delete_image_session(session_id: str):
+    if not await image_sessions.delete(session_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Image session '{session_id}' not found or expired.")
@@ -11,13 +11,46 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     APP_DESCRIPTION: str = "Using Grok Vision Models to Extract Text from Images"
 
-    XAI_API_KEY: str = os.getenv("XAI_API_KEY")
-    XAI_API_BASE_URL: str = "https://api.x.ai/v1"
+    XAI_API_KEY: str | None = os.getenv("XAI_API_KEY") # Requests get 503 while unset
+    XAI_API_BASE_URL: str = os.getenv("XAI_API_BASE_URL", "https://api.x.ai/v1")
     GROK_VISION_DEFAULT_MODEL: str =  os.getenv("GROK_VISION_DEFAULT_MODEL", "grok-2-vision-1212") # Renamed for clarity
     GROK_TEXT_DEFAULT_MODEL: str = os.getenv("GROK_TEXT_DEFAULT_MODEL", "grok-2-1212") # Default text model
     
     ALLOWED_CONTENT_TYPES: list[str] = ["image/jpeg", "image/png"]
 
+    # Shared xAI client: connections are kept alive and reused across requests
+    XAI_HTTP2: bool = os.getenv("XAI_HTTP2", "True").lower() == "true"
+    XAI_MAX_CONNECTIONS: int = int(os.getenv("XAI_MAX_CONNECTIONS", 100))
+    XAI_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("XAI_MAX_KEEPALIVE_CONNECTIONS", 20))
+    XAI_KEEPALIVE_EXPIRY: float = float(os.getenv("XAI_KEEPALIVE_EXPIRY", 60))
+    XAI_CONNECT_TIMEOUT: float = float(os.getenv("XAI_CONNECT_TIMEOUT", 10))
+    XAI_REQUEST_TIMEOUT: float = float(os.getenv("XAI_REQUEST_TIMEOUT", 90))
+
+    # Image budget: uploads are EXIF-rotated, downsized to what the model sees and recompressed
+    GROK_IMAGE_BUDGET: bool = os.getenv("GROK_IMAGE_BUDGET", "True").lower() == "true"
+    GROK_IMAGE_MAX_BYTES: int = int(os.getenv("GROK_IMAGE_MAX_BYTES", 750_000))
+    GROK_IMAGE_JPEG_QUALITY: int = int(os.getenv("GROK_IMAGE_JPEG_QUALITY", 85))
+    GROK_IMAGE_MAX_SIDE: int = int(os.getenv("GROK_IMAGE_MAX_SIDE", 2048))
+    GROK_IMAGE_SHORT_SIDE: int = int(os.getenv("GROK_IMAGE_SHORT_SIDE", 768))
+    GROK_IMAGE_LOW_DETAIL_SIDE: int = int(os.getenv("GROK_IMAGE_LOW_DETAIL_SIDE", 512))
+    # "auto" picks high detail for images with text, low for the rest; "low" or "high" forces one
+    GROK_IMAGE_DETAIL: str = os.getenv("GROK_IMAGE_DETAIL", "auto")
+    GROK_IMAGE_DETAIL_DENSITY: float = float(os.getenv("GROK_IMAGE_DETAIL_DENSITY", 0.02))
+
+    # Hedged requests: a second identical call when the first is slower than usual
+    GROK_HEDGING: bool = os.getenv("GROK_HEDGING", "False").lower() == "true"
+    GROK_HEDGE_PERCENTILE: float = float(os.getenv("GROK_HEDGE_PERCENTILE", 95))
+    GROK_HEDGE_MAX_RATE: float = float(os.getenv("GROK_HEDGE_MAX_RATE", 0.05)) # Extra calls per call at most
+    GROK_HEDGE_MIN_DELAY: float = float(os.getenv("GROK_HEDGE_MIN_DELAY", 0.5)) # Seconds
+    GROK_HEDGE_WINDOW: int = int(os.getenv("GROK_HEDGE_WINDOW", 200)) # Latencies the percentile is taken over
+    GROK_HEDGE_MIN_SAMPLES: int = int(os.getenv("GROK_HEDGE_MIN_SAMPLES", 20))
+
+    # Image sessions: an uploaded image kept encoded for follow-up chat turns
+    GROK_SESSION_TTL_SECONDS: int = int(os.getenv("GROK_SESSION_TTL_SECONDS", 1800)) # Extended by every turn
+    GROK_SESSION_MAX: int = int(os.getenv("GROK_SESSION_MAX", 100)) # Per worker, each holds up to ~1 MB
+    # Shared between workers, e.g. redis://redis:6379/2
+    GROK_SESSION_REDIS_URL: str | None = os.getenv("GROK_SESSION_REDIS_URL")
+
 @lru_cache()
 def get_settings():
     return Settings()
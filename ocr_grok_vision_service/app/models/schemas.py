@@ -6,6 +6,7 @@ class OCRResponse(BaseModel):
     content_type: str = Field(..., description="MIME type of the uploaded file.")
     extracted_text: str = Field(..., description="Text extracted from the image by the Grok model.")
     model_used: str = Field(..., description="The specific Grok model used for OCR.")
+    image_budget: dict | None = Field(None, description="Bytes and sizes of the uploaded and the sent image, the detail level chosen, and the time spent on the image and upstream.")
 
 class HealthResponse(BaseModel):
     status: str = Field("ok", description="Indicates the health status of the service.")
@@ -28,8 +29,20 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="The new message from the user.")
     history: list[ChatMessage] = Field([], description="Optional chat history.")
     model_name: str | None = Field(None, description="Optional Grok model override (e.g., 'grok-1.5-flash-latest').")
+    stream: bool = Field(False, description="Stream the response as server-sent events of chat.completion.chunk objects.")
+    session_id: str | None = Field(None, description="Image session to continue: the session's image and history are sent with the message.")
 
 class ChatResponse(BaseModel):
     """Response model for the Grok chat endpoint."""
     response_text: str = Field(..., description="The text response generated by the Grok model.")
-    model_used: str = Field(..., description="The specific Grok model used for the chat response.")
\ No newline at end of file
+    model_used: str = Field(..., description="The specific Grok model used for the chat response.")
+    session_id: str | None = Field(None, description="The image session the turn was added to.")
+
+class ImageSessionResponse(BaseModel):
+    """An uploaded image kept for follow-up questions through /chat/generate-text."""
+    session_id: str = Field(..., description="Pass as session_id in chat requests.")
+    model: str = Field(..., description="Grok vision model the session's turns use unless overridden.")
+    detail: str = Field(..., description="Detail level the image is sent at.")
+    expires_in: int = Field(..., description="Seconds until the session expires; every turn extends it.")
+    history: list[ChatMessage] = Field([], description="The conversation about the image so far.")
+    image_budget: dict | None = Field(None, description="Image budget report of the upload.")
@@ -0,0 +1,142 @@
+# app/services/hedging.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Hedge tokens a policy can save up, so a burst of slow calls after a quiet
+# period cannot fire more than this many hedges at once
+MAX_BUDGET_TOKENS = 10.0
+
+
+class HedgePolicy:
+    """
+    Hedged requests for one model: when a call has not answered within the
+    GROK_HEDGE_PERCENTILE of recent latencies, an identical second call is
+    sent and whichever answers first is used, the other one is cancelled.
+
+    Every call earns GROK_HEDGE_MAX_RATE hedge tokens and every hedge spends
+    one, so hedges stay below that share of the calls even when the upstream
+    is slow across the board and every call would cross the threshold.
+    """
+
+    def __init__(
+        self,
+        percentile: float | None = None,
+        max_rate: float | None = None,
+        min_delay: float | None = None,
+        window: int | None = None,
+        min_samples: int | None = None,
+    ):
+        self.percentile = percentile if percentile is not None else settings.GROK_HEDGE_PERCENTILE
+        self.max_rate = max_rate if max_rate is not None else settings.GROK_HEDGE_MAX_RATE
+        self.min_delay = min_delay if min_delay is not None else settings.GROK_HEDGE_MIN_DELAY
+        self.min_samples = min_samples if min_samples is not None else settings.GROK_HEDGE_MIN_SAMPLES
+        self.latencies: deque = deque(maxlen=window or settings.GROK_HEDGE_WINDOW)
+        self.tokens = 0.0
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.hedges_over_budget = 0
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def threshold(self) -> Optional[float]:
+        """
+        Seconds to wait before hedging, None until enough latencies are known
+        """
+        if len(self.latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latency_percentile(self.percentile))
+
+    def take_token(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        self.hedges_over_budget += 1
+        return False
+
+    async def run(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Calls send, and again once the threshold has passed without an answer.
+        An attempt that fails without a response leaves the other one running;
+        the call fails only when every attempt has.
+        """
+        self.requests += 1
+        self.tokens = min(MAX_BUDGET_TOKENS, self.tokens + self.max_rate)
+        threshold = self.threshold()
+        started = {asyncio.create_task(send()): time.perf_counter()}
+        primary = next(iter(started))
+        pending = set(started)
+        try:
+            if threshold is not None:
+                done, pending = await asyncio.wait(pending, timeout=threshold)
+                if not done and self.take_token():
+                    self.hedges_fired += 1
+                    hedge = asyncio.create_task(send())
+                    started[hedge] = time.perf_counter()
+                    pending.add(hedge)
+                pending |= done
+
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer an attempt that got a response over one that raised
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is None and pending:
+                    continue
+                winner = winner or next(iter(done))
+                if winner.exception() is None:
+                    # Measured from the primary's start even when the hedge won: that is
+                    # a lower bound of the slow primary's latency, leaving it out would
+                    # drop the tail from the window and pull the threshold down
+                    self.latencies.append(time.perf_counter() - started[primary])
+                    if winner is not primary:
+                        self.hedges_won += 1
+                return winner.result()
+        finally:
+            # The loser's connection is closed, which cancels the call upstream
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, float]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        return {
+            "requests": self.requests,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "hedges_over_budget": self.hedges_over_budget,
+            "hedge_rate": round(self.hedges_fired / self.requests, 4) if self.requests else 0.0,
+            "threshold_ms": ms(self.threshold()),
+            "p50_ms": ms(self.latency_percentile(50)),
+            "p99_ms": ms(self.latency_percentile(99)),
+        }
+
+
+# One policy per model, their latencies differ by an order of magnitude
+policies: Dict[str, HedgePolicy] = {}
+
+
+def get_policy(model: str) -> HedgePolicy:
+    if model not in policies:
+        policies[model] = HedgePolicy()
+    return policies[model]
+
+
+def hedging_stats() -> Dict[str, Dict[str, float]]:
+    return {model: policy.stats() for model, policy in policies.items()}
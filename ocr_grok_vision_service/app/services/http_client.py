@@ -0,0 +1,153 @@
+# app/services/http_client.py
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import httpcore
+import httpx
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+    Per-host counters of the shared upstream client. New TCP connections and
+    TLS handshakes are counted from httpcore's trace events, so the ratio of
+    requests to handshakes shows how well connections are reused.
+    """
+
+    def __init__(self):
+        self.hosts: Dict[str, Dict[str, float]] = defaultdict(lambda: {
+            "requests": 0,
+            "in_flight": 0,
+            "errors": 0,
+            "connections_opened": 0,
+            "tls_handshakes": 0,
+            "total_seconds": 0.0,
+        })
+        # The transport whose connection pool is reported, set by MeteredTransport
+        self.transport: Optional["MeteredTransport"] = None
+
+    def tracer(self, host: str):
+        async def trace(event_name: str, info: Dict[str, Any]):
+            if event_name == "connection.connect_tcp.complete":
+                self.hosts[host]["connections_opened"] += 1
+            elif event_name == "connection.start_tls.complete":
+                self.hosts[host]["tls_handshakes"] += 1
+        return trace
+
+
+class MeteredTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport recording PoolMetrics for every request it sends"""
+
+    def __init__(self, metrics: PoolMetrics, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+        metrics.transport = self
+        # Origin of every host requested, to match pooled connections to hosts
+        self.origins: Dict[str, httpcore.Origin] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host not in self.origins:
+            scheme = request.url.raw_scheme
+            port = request.url.port or (443 if scheme == b"https" else 80)
+            self.origins[host] = httpcore.Origin(scheme, request.url.raw_host, port)
+        counters = self.metrics.hosts[host]
+        request.extensions = {**request.extensions, "trace": self.metrics.tracer(host)}
+        counters["requests"] += 1
+        counters["in_flight"] += 1
+        start = time.perf_counter()
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            counters["errors"] += 1
+            raise
+        finally:
+            counters["in_flight"] -= 1
+            counters["total_seconds"] += time.perf_counter() - start
+
+    def pool_state(self) -> Dict[str, Dict[str, int]]:
+        """
+        Open connections per host in the pool, and how many are idle or HTTP/2.
+        Uses httpcore's public connection interface only; should a release
+        still change what it reports, the pool state is left out rather
+        than failing the health check.
+        """
+        state: Dict[str, Dict[str, int]] = defaultdict(lambda: {"open": 0, "idle": 0, "http2": 0})
+        try:
+            # The transport's connection pool is not exposed by httpx
+            for connection in getattr(getattr(self, "_pool", None), "connections", ()):
+                host = next((host for host, origin in self.origins.items() if connection.can_handle_request(origin)),
+                            "unknown")
+                state[host]["open"] += 1
+                state[host]["idle"] += connection.is_idle()
+                state[host]["http2"] += "HTTP/2" in connection.info()
+        except Exception as e:
+            logger.warning(f"Could not read the upstream connection pool state: {str(e)}")
+            return {}
+        return dict(state)
+
+
+def create_client(metrics: Optional[PoolMetrics] = None, **transport_options) -> httpx.AsyncClient:
+    """
+    Client for the xAI API: keep-alive connections shared by all requests,
+    HTTP/2 multiplexing when enabled
+    """
+    transport = MeteredTransport(
+        metrics or PoolMetrics(),
+        http2=settings.XAI_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.XAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.XAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.XAI_KEEPALIVE_EXPIRY,
+        ),
+        **transport_options,
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(settings.XAI_REQUEST_TIMEOUT, connect=settings.XAI_CONNECT_TIMEOUT),
+    )
+
+
+class UpstreamClient:
+    """
+    Process-wide holder of the xAI client, opened with the app and closed on shutdown
+    """
+
+    def __init__(self):
+        self.metrics = PoolMetrics()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self):
+        if self._client is None:
+            self._client = create_client(self.metrics)
+            logger.info(f"Opened xAI client (HTTP/2 {'on' if settings.XAI_HTTP2 else 'off'}, "
+                        f"{settings.XAI_MAX_CONNECTIONS} connections)")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("xAI client closed")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Started on first use outside the app too, e.g. in scripts
+        self.start()
+        return self._client
+
+    def stats(self) -> Dict[str, Any]:
+        transport = self.metrics.transport
+        pool = transport.pool_state() if self._client is not None and transport is not None else {}
+        return {
+            host: {**counters, "total_seconds": round(counters["total_seconds"], 3), "pool": pool.get(host, {})}
+            for host, counters in self.metrics.hosts.items()
+        }
+
+
+upstream = UpstreamClient()
@@ -0,0 +1,166 @@
+# app/services/image_budget.py
+import base64
+import io
+import time
+from dataclasses import asdict, dataclass
+
+from PIL import ExifTags, Image, ImageFilter, ImageOps, UnidentifiedImageError
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Longest side of the thumbnail the text density is measured on
+DENSITY_SAMPLE_SIDE = 256
+# Grey level change counted as an edge on the density thumbnail
+EDGE_THRESHOLD = 48
+# Lowest JPEG quality tried before the image is shrunk further to fit the byte budget
+MIN_JPEG_QUALITY = 50
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+class ImageBudgetError(ValueError):
+    """The upload is not an image Pillow can decode"""
+
+
+@dataclass
+class BudgetedImage:
+    data: bytes
+    mime_type: str
+    detail: str
+    original_bytes: int
+    sent_bytes: int
+    original_size: tuple[int, int]
+    sent_size: tuple[int, int]
+    text_density: float
+    budget_ms: float
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+    def report(self) -> dict:
+        report = asdict(self)
+        del report["data"]
+        report["bytes_saved"] = self.original_bytes - self.sent_bytes
+        return report
+
+
+def flatten_alpha(img: Image.Image) -> Image.Image:
+    """
+    Composites transparent images onto white, as viewers show them: dropping
+    the alpha channel would turn dark text on a transparent background into
+    a black image
+    """
+    if img.mode == "P" and "transparency" in img.info:
+        img = img.convert("RGBA")
+    if img.mode not in ("RGBA", "LA", "PA"):
+        return img
+    rgba = img.convert("RGBA")
+    background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+    return Image.alpha_composite(background, rgba).convert("L" if img.mode == "LA" else "RGB")
+
+
+def text_density(img: Image.Image) -> float:
+    """
+    Share of edge pixels on a small greyscale copy. Printed text is dense in
+    edges (receipts and documents score well above 0.05), photos with a few
+    words on them score close to 0.
+    """
+    sample = img.convert("L")
+    sample.thumbnail((DENSITY_SAMPLE_SIDE, DENSITY_SAMPLE_SIDE))
+    # The filter marks the one pixel frame around the image as edges
+    edges = sample.filter(ImageFilter.FIND_EDGES).crop((1, 1, sample.width - 1, sample.height - 1))
+    histogram = edges.histogram()
+    return sum(histogram[EDGE_THRESHOLD:]) / max(1, sum(histogram))
+
+
+def choose_detail(density: float, size: tuple[int, int]) -> str:
+    if settings.GROK_IMAGE_DETAIL in ("low", "high"):
+        return settings.GROK_IMAGE_DETAIL
+    # A small image loses nothing at low detail
+    if max(size) <= settings.GROK_IMAGE_LOW_DETAIL_SIDE:
+        return "low"
+    return "high" if density >= settings.GROK_IMAGE_DETAIL_DENSITY else "low"
+
+
+def effective_size(size: tuple[int, int], detail: str) -> tuple[int, int]:
+    """
+    Resolution the model sees: low detail fits the image in a square of
+    GROK_IMAGE_LOW_DETAIL_SIDE, high detail fits it in GROK_IMAGE_MAX_SIDE and
+    then brings the short side down to GROK_IMAGE_SHORT_SIDE. Pixels beyond
+    that are scaled away upstream, so there is no point in uploading them.
+    """
+    width, height = size
+    if detail == "low":
+        scale = min(1.0, settings.GROK_IMAGE_LOW_DETAIL_SIDE / max(width, height))
+    else:
+        scale = min(1.0, settings.GROK_IMAGE_MAX_SIDE / max(width, height))
+        scale *= min(1.0, settings.GROK_IMAGE_SHORT_SIDE / (min(width, height) * scale))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def encode_jpeg(img: Image.Image, max_bytes: int) -> bytes:
+    """
+    JPEG under max_bytes: lower quality first, then smaller images
+    """
+    while True:
+        for quality in range(settings.GROK_IMAGE_JPEG_QUALITY, MIN_JPEG_QUALITY - 1, -10):
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=quality, optimize=True)
+            if buffer.tell() <= max_bytes or max(img.size) <= 64:
+                return buffer.getvalue()
+        img = img.resize((max(1, int(img.width * 0.8)), max(1, int(img.height * 0.8))), Image.LANCZOS)
+
+
+def prepare_image(content: bytes, mime_type: str) -> BudgetedImage:
+    """
+    Decodes the upload, applies the EXIF orientation, downsizes it to the
+    model's effective resolution for the chosen detail level and recompresses
+    it under GROK_IMAGE_MAX_BYTES. Transparent images are composited onto
+    white. The upload is sent as it is when that would not make it smaller.
+    """
+    start = time.perf_counter()
+    try:
+        img = Image.open(io.BytesIO(content))
+        original_size = img.size
+        orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+        # JPEGs decode straight at a fraction of their size when that is still
+        # at least the largest size the model could see
+        width, height = effective_size(original_size, "high")
+        img.draft(img.mode, (height, width) if orientation in TRANSPOSED_ORIENTATIONS else (width, height))
+        img.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageBudgetError(f"Could not decode the image: {e}") from e
+
+    rotate = orientation != 1
+    oriented = ImageOps.exif_transpose(img) if rotate else img
+    rotated = flatten_alpha(oriented)
+    rewrite = rotate or rotated is not oriented
+    density = text_density(rotated)
+    detail = choose_detail(density, rotated.size)
+    target = effective_size(rotated.size, detail)
+
+    data, sent_mime_type, sent_size = content, mime_type, original_size
+    if rewrite or target != rotated.size or len(content) > settings.GROK_IMAGE_MAX_BYTES:
+        resized = rotated.convert("L" if rotated.mode in ("L", "LA", "I;16") else "RGB")
+        if target != resized.size:
+            resized = resized.resize(target, Image.LANCZOS)
+        recompressed = encode_jpeg(resized, settings.GROK_IMAGE_MAX_BYTES)
+        # Rotation and the white background must reach the model; otherwise only send what is smaller
+        if rewrite or len(recompressed) < len(content):
+            data, sent_mime_type = recompressed, "image/jpeg"
+            sent_size = Image.open(io.BytesIO(recompressed)).size
+
+    return BudgetedImage(
+        data=data,
+        mime_type=sent_mime_type,
+        detail=detail,
+        original_bytes=len(content),
+        sent_bytes=len(data),
+        original_size=original_size,
+        sent_size=sent_size,
+        text_density=round(density, 4),
+        budget_ms=round((time.perf_counter() - start) * 1000, 2),
+    )
@@ -0,0 +1,178 @@
+# app/services/image_sessions.py
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Longest a turn can hold its session, so a worker that died mid-turn does not lock it for good
+TURN_LOCK_SECONDS = 300
+# Deletes the turn lock only if this worker still holds it
+RELEASE_TURN_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class ImageSession:
+    """
+    An uploaded image, already budgeted and encoded as a data URL, and the
+    conversation about it so far as role/content messages
+    """
+    session_id: str
+    data_url: str
+    detail: str
+    model: str
+    history: list[dict] = field(default_factory=list)
+    image_budget: Optional[dict] = None
+    created_at: float = field(default_factory=time.time)
+
+    def messages(self, message: str) -> list[dict]:
+        """
+        Messages for the next turn: the image goes with the first user message
+        """
+        turns = self.history + [{"role": "user", "content": message}]
+        image_part = {"type": "image_url", "image_url": {"url": self.data_url, "detail": self.detail}}
+        first = {"role": "user", "content": [image_part, {"type": "text", "text": turns[0]["content"]}]}
+        return [first] + turns[1:]
+
+    def add_turn(self, message: str, response_text: str):
+        self.history += [{"role": "user", "content": message}, {"role": "assistant", "content": response_text}]
+
+
+class ImageSessionStore:
+    """
+    Image sessions with a sliding TTL: every turn extends the session's life.
+
+    Sessions live in an in-process LRU, or in Redis when a URL is given so
+    that all workers see them; Redis is then the source of truth, since a turn
+    on another worker may have extended the history.
+
+    A turn reads the history, waits for the model and writes the history
+    back, so one session takes one turn at a time: begin_turn takes a lock,
+    held in Redis when there is one, that concurrent turns fail to get.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: int, redis_url: Optional[str] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Tuple[float, ImageSession]]" = OrderedDict()
+        # session_id -> (lock expiry, lock token) of the turns this worker is taking
+        self._turns: Dict[str, Tuple[float, str]] = {}
+        self._redis = None
+        if redis_url:
+            from redis import asyncio as aioredis
+            self._redis = aioredis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+        self.counters = {"created": 0, "turns": 0, "expired": 0, "evicted": 0, "bytes_reused": 0, "turns_rejected": 0}
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, (expires_at, _) in self._sessions.items() if expires_at <= now]
+        for key in expired:
+            del self._sessions[key]
+        self.counters["expired"] += len(expired)
+
+    def _store_local(self, session: ImageSession):
+        self._sessions[session.session_id] = (time.monotonic() + self.ttl_seconds, session)
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.counters["evicted"] += 1
+
+    async def save(self, session: ImageSession):
+        self._store_local(session)
+        if self._redis is not None:
+            try:
+                await self._redis.setex(
+                    f"grok:session:{session.session_id}",
+                    self.ttl_seconds,
+                    json.dumps(asdict(session), ensure_ascii=False)
+                )
+            except Exception as e:
+                logger.error(f"Redis session store failed: {str(e)}")
+
+    async def create(self, data_url: str, detail: str, model: str, image_budget: Optional[dict] = None) -> ImageSession:
+        session = ImageSession(secrets.token_urlsafe(16), data_url, detail, model, image_budget=image_budget)
+        await self.save(session)
+        self.counters["created"] += 1
+        return session
+
+    async def get(self, session_id: str) -> Optional[ImageSession]:
+        self._evict_expired(time.monotonic())
+        if self._redis is not None:
+            try:
+                stored = await self._redis.get(f"grok:session:{session_id}")
+                if stored is None:
+                    self._sessions.pop(session_id, None)
+                    return None
+                session = ImageSession(**json.loads(stored))
+                self._store_local(session)
+                return session
+            except Exception as e:
+                logger.error(f"Redis session lookup failed: {str(e)}")
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        return entry[1]
+
+    async def delete(self, session_id: str) -> bool:
+        deleted = self._sessions.pop(session_id, None) is not None
+        if self._redis is not None:
+            try:
+                deleted = bool(await self._redis.delete(f"grok:session:{session_id}")) or deleted
+            except Exception as e:
+                logger.error(f"Redis session delete failed: {str(e)}")
+        return deleted
+
+    async def begin_turn(self, session_id: str) -> bool:
+        """
+        Takes the session's turn lock, False when another turn holds it
+        """
+        now = time.monotonic()
+        held = self._turns.get(session_id)
+        if held is not None and held[0] > now:
+            self.counters["turns_rejected"] += 1
+            return False
+        token = secrets.token_urlsafe(8)
+        if self._redis is not None:
+            try:
+                if not await self._redis.set(f"grok:session:{session_id}:turn", token, nx=True, ex=TURN_LOCK_SECONDS):
+                    self.counters["turns_rejected"] += 1
+                    return False
+            except Exception as e:
+                logger.error(f"Redis session turn lock failed: {str(e)}")
+        self._turns[session_id] = (now + TURN_LOCK_SECONDS, token)
+        return True
+
+    async def end_turn(self, session_id: str):
+        held = self._turns.pop(session_id, None)
+        if held is not None and self._redis is not None:
+            try:
+                await self._redis.eval(RELEASE_TURN_SCRIPT, 1, f"grok:session:{session_id}:turn", held[1])
+            except Exception as e:
+                logger.error(f"Redis session turn unlock failed: {str(e)}")
+
+    def record_turn(self, session: ImageSession):
+        # The image the client did not have to upload and the server did not have to encode again
+        self.counters["turns"] += 1
+        self.counters["bytes_reused"] += len(session.data_url)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sessions": len(self._sessions), "redis": self._redis is not None, **self.counters}
+
+
+image_sessions = ImageSessionStore(
+    max_sessions=settings.GROK_SESSION_MAX,
+    ttl_seconds=settings.GROK_SESSION_TTL_SECONDS,
+    redis_url=settings.GROK_SESSION_REDIS_URL,
+)
@@ -1,15 +1,29 @@
 # app/services/ocr_service.py
+import asyncio
 import httpx
 import base64
-from fastapi import HTTPException, status, UploadFile
+import json
+import logging
+import time
+import uuid
+from fastapi import HTTPException, Request, status, UploadFile
 from app.core.config import get_settings
 from app.models.schemas import ChatMessage # Import ChatMessage schema
+from app.services.hedging import get_policy
+from app.services.http_client import upstream
+from app.services.image_budget import ImageBudgetError, prepare_image
+from app.services.image_sessions import ImageSession, image_sessions
+from functools import lru_cache
+from typing import AsyncGenerator
 import mimetypes
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 class OCRService:
-    def __init__(self):
+    def __init__(self, client: httpx.AsyncClient | None = None):
+        # Shared keep-alive client unless one is given (e.g. a stub in benchmarks)
+        self._client = client
         self.api_endpoint = f"{settings.XAI_API_BASE_URL}/chat/completions"
         self.api_key = settings.XAI_API_KEY
         self.default_prompt = "Extract all visible text from this image. Returns only the text content."
@@ -17,59 +31,144 @@ class OCRService:
         if not self.api_key or "YOUR_XAI_API_KEY" in self.api_key:
             raise ValueError("OCR service is not configured: Missing or invalid XAI_API_KEY.")
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or upstream.client
+
+    async def post(self, payload: dict, headers: dict) -> httpx.Response:
+        """
+        Sends a completion request, hedged per model when GROK_HEDGING is on.
+        """
+        def send():
+            return self.client.post(self.api_endpoint, json=payload, headers=headers)
+
+        if not settings.GROK_HEDGING:
+            return await send()
+        return await get_policy(payload["model"]).run(send)
+
+    def api_error(self, response: httpx.Response, service_name: str, request_name: str) -> HTTPException:
+        """
+        Maps an error response of the Grok API to the HTTPException returned to the client.
+        """
+        status_code = response.status_code
+        error_detail = f"Grok API {request_name} failed (Status: {status_code})"
+        try:
+            error_data = response.json()
+            api_err_msg = error_data.get("error", {}).get("message") or error_data.get("detail")
+            if api_err_msg:
+                error_detail = f"Grok API Error: {api_err_msg}"
+                if "authentication" in api_err_msg.lower() or status_code == 401:
+                    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+                    error_detail = f"{service_name} service failed: Invalid API Key configured."
+                elif "rate limit" in api_err_msg.lower() or status_code == 429:
+                    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+                    error_detail = f"{service_name} service rate limited by Grok API. Please try again later."
+                elif "invalid input" in api_err_msg.lower() or status_code == 400:
+                    status_code = status.HTTP_400_BAD_REQUEST
+                    error_detail = f"Grok API rejected input: {api_err_msg}"
+                else:
+                    status_code = status.HTTP_502_BAD_GATEWAY # Default to bad gateway for other API errors
+        except Exception: # Failed to parse error JSON
+            if status_code == 401:
+                status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+                error_detail = f"{service_name} service failed: Invalid API Key configured."
+            elif status_code == 429:
+                status_code = status.HTTP_429_TOO_MANY_REQUESTS
+                error_detail = f"{service_name} service rate limited by Grok API."
+            elif status_code == 400:
+                status_code = status.HTTP_400_BAD_REQUEST
+                error_detail = "Grok API rejected input."
+            else:
+                status_code = status.HTTP_502_BAD_GATEWAY
+
+        return HTTPException(status_code=status_code, detail=error_detail)
+
+    async def encode_image(self, image_content: bytes, mime_type: str) -> tuple[str, str, dict | None]:
+        """
+        Data URL and detail level to send for an image, and the image budget
+        report (None when GROK_IMAGE_BUDGET is off and the upload is sent as is).
+        """
+        if not settings.GROK_IMAGE_BUDGET:
+            image_base64 = base64.b64encode(image_content).decode('utf-8')
+            return f"data:{mime_type};base64,{image_base64}", "high", None
+        try:
+            budgeted = await asyncio.to_thread(prepare_image, image_content, mime_type)
+        except ImageBudgetError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+        return budgeted.data_url, budgeted.detail, budgeted.report()
+
+    async def encode_upload(self, image_file: UploadFile) -> tuple[str, str, dict | None]:
+        """
+        encode_image for an uploaded JPEG or PNG file.
+        """
+        image_content = await image_file.read()
+        mime_type, _ = mimetypes.guess_type(image_file.filename or "image.bin")
+        if mime_type not in settings.ALLOWED_CONTENT_TYPES:
+            mime_type = image_file.content_type
+            if mime_type not in settings.ALLOWED_CONTENT_TYPES:
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail=f"Unsupported image type '{mime_type}'. Only JPEG and PNG are supported."
+                )
+
+        return await self.encode_image(image_content, mime_type)
+
+    async def vision_payload(
+        self,
+        image_file: UploadFile,
+        selected_model: str,
+        prompt: str | None = None
+    ) -> tuple[dict, dict | None]:
+        """
+        Chat completions payload asking the vision model to read the image, and the image budget report.
+        """
+        data_url, detail, budget = await self.encode_upload(image_file)
+
+        payload = {
+            "model": selected_model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": data_url, "detail": detail}
+                        },
+                        {"type": "text", "text": prompt or self.default_prompt}
+                    ]
+                }
+            ],
+            "max_tokens": 3000,
+            "temperature": 0.1,
+        }
+        return payload, budget
+
     async def extract_text_from_image(
         self,
         image_file: UploadFile,
         model_name: str | None = None,
         prompt: str | None = None,
         api_key: str | None = None
-    ) -> tuple[str, str]:
+    ) -> tuple[str, str, dict | None]:
         """
-        Sends the image to the Grok Vision API and returns extracted text.
+        Sends the image to the Grok Vision API and returns extracted text, the
+        model used and the image budget report with the upstream latency.
         """
         selected_model = model_name or settings.GROK_VISION_DEFAULT_MODEL # Use vision model default
         used_api_key = api_key or self.api_key
-        used_prompt = prompt or self.default_prompt
 
         try:
-            image_content = await image_file.read()
-            mime_type, _ = mimetypes.guess_type(image_file.filename or "image.bin")
-            if mime_type not in settings.ALLOWED_CONTENT_TYPES:
-                mime_type = image_file.content_type
-                if mime_type not in settings.ALLOWED_CONTENT_TYPES:
-                    raise HTTPException(
-                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-                        detail=f"Unsupported image type '{mime_type}'. Only JPEG and PNG are supported."
-                    )
-
-            image_base64 = base64.b64encode(image_content).decode('utf-8')
-            data_url = f"data:{mime_type};base64,{image_base64}"
-
-            payload = {
-                "model": selected_model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": data_url, "detail": "high"}
-                            },
-                            {"type": "text", "text": used_prompt}
-                        ]
-                    }
-                ],
-                "max_tokens": 3000,
-                "temperature": 0.1,
-            }
+            payload, budget = await self.vision_payload(image_file, selected_model, prompt)
             headers = {
                 "Authorization": f"Bearer {used_api_key}",
                 "Content-Type": "application/json",
                 "Accept": "application/json"
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(self.api_endpoint, json=payload, headers=headers, timeout=90.0)
+            upstream_start = time.perf_counter()
+            response = await self.post(payload, headers)
+            if budget is not None:
+                budget["upstream_ms"] = round((time.perf_counter() - upstream_start) * 1000, 2)
 
             try:
                 response.raise_for_status()
@@ -80,41 +179,10 @@ class OCRService:
                 if any(phrase in extracted_text.lower() for phrase in refusal_phrases):
                     extracted_text = "Model indicated it could not perform the OCR task on this image."
 
-                return extracted_text, selected_model
+                return extracted_text, selected_model, budget
 
             except httpx.HTTPStatusError as e:
-                status_code = e.response.status_code
-                error_detail = f"Grok API request failed (Status: {status_code})"
-                try:
-                    error_data = e.response.json()
-                    api_err_msg = error_data.get("error", {}).get("message") or error_data.get("detail")
-                    if api_err_msg:
-                        error_detail = f"Grok API Error: {api_err_msg}"
-                        if "authentication" in api_err_msg.lower() or status_code == 401:
-                            status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-                            error_detail = "OCR service failed: Invalid API Key configured."
-                        elif "rate limit" in api_err_msg.lower() or status_code == 429:
-                            status_code = status.HTTP_429_TOO_MANY_REQUESTS
-                            error_detail = "OCR service rate limited by Grok API. Please try again later."
-                        elif "invalid input" in api_err_msg.lower() or status_code == 400:
-                            status_code = status.HTTP_400_BAD_REQUEST
-                            error_detail = f"Grok API rejected input: {api_err_msg}"
-                        else:
-                            status_code = status.HTTP_502_BAD_GATEWAY
-                except Exception:
-                    if status_code == 401:
-                        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-                        error_detail = "OCR service failed: Invalid API Key configured."
-                    elif status_code == 429:
-                        status_code = status.HTTP_429_TOO_MANY_REQUESTS
-                        error_detail = "OCR service rate limited by Grok API."
-                    elif status_code == 400:
-                        status_code = status.HTTP_400_BAD_REQUEST
-                        error_detail = "Grok API rejected input."
-                    else:
-                        status_code = status.HTTP_502_BAD_GATEWAY
-
-                raise HTTPException(status_code=status_code, detail=error_detail) from e
+                raise self.api_error(e.response, "OCR", "request") from e
 
             except (KeyError, IndexError, TypeError) as parse_error:
                 raise HTTPException(
@@ -144,30 +212,104 @@ class OCRService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="An unexpected internal error occurred during OCR processing."
             ) from e
+    async def create_image_session(self, image_file: UploadFile, model_name: str | None = None) -> ImageSession:
+        """
+        Encodes the upload once and keeps it for the chat turns that reference the session.
+        """
+        data_url, detail, budget = await self.encode_upload(image_file)
+        return await image_sessions.create(data_url, detail, model_name or settings.GROK_VISION_DEFAULT_MODEL, budget)
+
+    async def get_image_session(self, session_id: str) -> ImageSession:
+        session = await image_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Image session '{session_id}' not found or expired."
+            )
+        return session
+
+    async def begin_turn(self, session_id: str) -> ImageSession:
+        """
+        Locks the session for one turn and reads its history; the caller ends
+        the turn with image_sessions.end_turn. A turn sent while the previous
+        one is still being answered is rejected, it would not see that turn
+        and one of the two would be lost from the history.
+        """
+        if not await image_sessions.begin_turn(session_id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Image session '{session_id}' is still answering the previous message, send this one after it."
+            )
+        try:
+            return await self.get_image_session(session_id)
+        except HTTPException:
+            await image_sessions.end_turn(session_id)
+            raise
+
+    async def save_turn(self, session: ImageSession, message: str, response_text: str):
+        session.add_turn(message, response_text)
+        await image_sessions.save(session)
+        image_sessions.record_turn(session)
+
+    def chat_payload(
+        self,
+        message: str,
+        history: list[ChatMessage],
+        selected_model: str,
+        session: ImageSession | None = None
+    ) -> dict:
+        if session is not None:
+            # The session's image and history, as stored when it was created
+            formatted_messages = session.messages(message)
+        else:
+            # Format messages for Grok API (list of role/content dicts)
+            formatted_messages = [{"role": msg.role, "content": msg.content} for msg in history]
+            # Add the new user message
+            formatted_messages.append({"role": "user", "content": message})
+
+        return {
+            "model": selected_model,
+            "messages": formatted_messages,
+            "max_tokens": 3000, # Consider making this configurable
+            "temperature": 0.3, # Adjust temperature for chat if needed
+        }
+
     async def generate_text_response(
         self,
         message: str,
         history: list[ChatMessage],
         model_name: str | None = None,
-        api_key: str | None = None
+        api_key: str | None = None,
+        session_id: str | None = None
     ) -> tuple[str, str]:
         """
         Sends the chat history and new message to the Grok API and returns the text response.
+        With a session_id, the session's image and history are sent instead and the turn is added to them.
         """
-        selected_model = model_name or settings.GROK_TEXT_DEFAULT_MODEL # Use text model default
-        used_api_key = api_key or self.api_key
+        if not session_id:
+            return await self.chat_completion(message, history, model_name, api_key)
+        session = await self.begin_turn(session_id)
+        try:
+            return await self.chat_completion(message, history, model_name, api_key, session)
+        finally:
+            await image_sessions.end_turn(session_id)
 
-        # Format messages for Grok API (list of role/content dicts)
-        formatted_messages = [{"role": msg.role, "content": msg.content} for msg in history]
-        # Add the new user message
-        formatted_messages.append({"role": "user", "content": message})
+    async def chat_completion(
+        self,
+        message: str,
+        history: list[ChatMessage],
+        model_name: str | None = None,
+        api_key: str | None = None,
+        session: ImageSession | None = None
+    ) -> tuple[str, str]:
+        """
+        generate_text_response once the session, if any, is locked and read
+        """
+        # Use text model default, or the session's vision model
+        selected_model = model_name or (session.model if session else settings.GROK_TEXT_DEFAULT_MODEL)
+        used_api_key = api_key or self.api_key
 
-        payload = {
-            "model": selected_model,
-            "messages": formatted_messages,
-            "max_tokens": 3000, # Consider making this configurable
-            "temperature": 0.3, # Adjust temperature for chat if needed
-        }
+        payload = self.chat_payload(message, history, selected_model, session)
         headers = {
             "Authorization": f"Bearer {used_api_key}",
             "Content-Type": "application/json",
@@ -175,8 +317,7 @@ class OCRService:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(self.api_endpoint, json=payload, headers=headers, timeout=90.0)
+            response = await self.post(payload, headers)
 
             # Reuse the error handling logic, slightly adapted for chat context
             try:
@@ -190,41 +331,12 @@ class OCRService:
                 # if any(phrase in response_text.lower() for phrase in refusal_phrases):
                 #     response_text = "Model indicated it could not fulfill the chat request."
 
+                if session is not None:
+                    await self.save_turn(session, message, response_text)
                 return response_text, selected_model
 
             except httpx.HTTPStatusError as e:
-                status_code = e.response.status_code
-                error_detail = f"Grok API chat request failed (Status: {status_code})"
-                try:
-                    error_data = e.response.json()
-                    api_err_msg = error_data.get("error", {}).get("message") or error_data.get("detail")
-                    if api_err_msg:
-                        error_detail = f"Grok API Error: {api_err_msg}"
-                        if "authentication" in api_err_msg.lower() or status_code == 401:
-                            status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-                            error_detail = "Chat service failed: Invalid API Key configured."
-                        elif "rate limit" in api_err_msg.lower() or status_code == 429:
-                            status_code = status.HTTP_429_TOO_MANY_REQUESTS
-                            error_detail = "Chat service rate limited by Grok API. Please try again later."
-                        elif "invalid input" in api_err_msg.lower() or status_code == 400:
-                             status_code = status.HTTP_400_BAD_REQUEST
-                             error_detail = f"Grok API rejected input: {api_err_msg}"
-                        else:
-                             status_code = status.HTTP_502_BAD_GATEWAY # Default to bad gateway for other API errors
-                except Exception: # Failed to parse error JSON
-                     if status_code == 401:
-                         status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-                         error_detail = "Chat service failed: Invalid API Key configured."
-                     elif status_code == 429:
-                         status_code = status.HTTP_429_TOO_MANY_REQUESTS
-                         error_detail = "Chat service rate limited by Grok API."
-                     elif status_code == 400:
-                         status_code = status.HTTP_400_BAD_REQUEST
-                         error_detail = "Grok API rejected input."
-                     else:
-                         status_code = status.HTTP_502_BAD_GATEWAY
-
-                raise HTTPException(status_code=status_code, detail=error_detail) from e
+                raise self.api_error(e.response, "Chat", "chat request") from e
 
             except (KeyError, IndexError, TypeError) as parse_error:
                 # Log parse_error details
@@ -257,3 +369,200 @@ class OCRService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="An unexpected internal error occurred during chat processing."
             ) from e
+
+    async def stream_text_response(
+        self,
+        message: str,
+        history: list[ChatMessage],
+        model_name: str | None = None,
+        api_key: str | None = None,
+        session_id: str | None = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Streaming variant of generate_text_response: returns the server-sent
+        events of the response once the Grok API has accepted the request.
+        """
+        session = await self.begin_turn(session_id) if session_id else None
+        selected_model = model_name or (session.model if session else settings.GROK_TEXT_DEFAULT_MODEL)
+        payload = self.chat_payload(message, history, selected_model, session)
+        try:
+            response = await self.open_stream(payload, api_key, "Chat", "chat request")
+        except BaseException:
+            if session is not None:
+                await image_sessions.end_turn(session_id)
+            raise
+        events = self.relay_stream(response, selected_model)
+        return self.record_streamed_turn(events, session, message) if session else events
+
+    async def record_streamed_turn(
+        self,
+        events: AsyncGenerator[str, None],
+        session: ImageSession,
+        message: str
+    ) -> AsyncGenerator[str, None]:
+        """
+        Relays the events and adds the turn to the session once the answer is
+        complete. Interrupted or failed answers are not added. Ends the turn
+        begun by stream_text_response.
+        """
+        parts, failed, ended = [], False, False
+        try:
+            async for event in events:
+                if event == "data: [DONE]\n\n":
+                    if not failed:
+                        # Before [DONE], so the client's next turn already sees this one
+                        await self.save_turn(session, message, "".join(parts).strip())
+                    # Once [DONE] is out the client may begin its next turn, whose lock must outlive this one
+                    ended = True
+                    await image_sessions.end_turn(session.session_id)
+                else:
+                    choice = json.loads(event[len("data: "):])["choices"][0]
+                    parts.append(choice["delta"].get("content") or "")
+                    failed = failed or choice["finish_reason"] == "error"
+                yield event
+        finally:
+            if not ended:
+                await image_sessions.end_turn(session.session_id)
+
+    async def stream_text_from_image(
+        self,
+        image_file: UploadFile,
+        model_name: str | None = None,
+        prompt: str | None = None,
+        api_key: str | None = None
+    ) -> tuple[AsyncGenerator[str, None], dict | None]:
+        """
+        Streaming variant of extract_text_from_image: the server-sent events of
+        the extracted text and the image budget report.
+        """
+        selected_model = model_name or settings.GROK_VISION_DEFAULT_MODEL
+        payload, budget = await self.vision_payload(image_file, selected_model, prompt)
+        response = await self.open_stream(payload, api_key, "OCR", "request")
+        return self.relay_stream(response, selected_model), budget
+
+    async def open_stream(self, payload: dict, api_key: str | None, service_name: str, request_name: str) -> httpx.Response:
+        """
+        Sends a streaming completion request and returns the response as soon as
+        its status is known, so that upstream errors still reach the client as
+        HTTP errors rather than inside an already started event stream.
+        """
+        headers = {
+            "Authorization": f"Bearer {api_key or self.api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+        request = self.client.build_request("POST", self.api_endpoint, json={**payload, "stream": True}, headers=headers)
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.TimeoutException as e:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Request to Grok API timed out."
+            ) from e
+        except httpx.RequestError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Could not connect to the backend Grok API."
+            ) from e
+
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            raise self.api_error(response, service_name, request_name)
+        return response
+
+    async def relay_stream(self, response: httpx.Response, model: str) -> AsyncGenerator[str, None]:
+        """
+        Relays the deltas of a streaming completion as OpenAI-style
+        chat.completion.chunk events ending with [DONE], the shape the GigaChat
+        service emits. The upstream response is closed when the generator is,
+        so a client that disconnects cancels the generation upstream.
+        """
+        request_id = f"chatcmpl-grok-{uuid.uuid4().hex}"
+        created_time = int(time.time())
+
+        def chunk(delta: dict, finish_reason: str | None = None, error: dict | None = None) -> str:
+            choice = {"index": 0, "delta": delta, "finish_reason": finish_reason}
+            if error is not None:
+                choice["error"] = error
+            openai_chunk = {
+                "id": request_id,
+                "object": "chat.completion.chunk",
+                "created": created_time,
+                "model": model,
+                "choices": [choice],
+            }
+            return f"data: {json.dumps(openai_chunk, ensure_ascii=False)}\n\n"
+
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue # Blank separators and keep-alive comments
+                chunk_data_str = line[len("data:"):].strip()
+                if chunk_data_str == "[DONE]":
+                    break
+                try:
+                    chunk_data = json.loads(chunk_data_str)
+                except json.JSONDecodeError:
+                    logger.warning(f"Received non-JSON data line from Grok stream: {line}")
+                    continue
+
+                if "error" in chunk_data:
+                    error = chunk_data["error"] if isinstance(chunk_data["error"], dict) else {"message": str(chunk_data["error"])}
+                    logger.error(f"Grok stream chunk contained an error: {error}")
+                    yield chunk({}, "error", {"message": error.get("message", "Unknown streaming error"),
+                                              "type": error.get("type", "api_error"), "code": error.get("code")})
+                    continue
+
+                choice = (chunk_data.get("choices") or [{}])[0]
+                delta = {key: value for key, value in (choice.get("delta") or {}).items()
+                         if key in ("role", "content") and value is not None}
+                if delta or choice.get("finish_reason"):
+                    yield chunk(delta, choice.get("finish_reason"))
+        except httpx.HTTPError as e:
+            # The status line is long gone, the error can only travel in the stream
+            logger.error(f"Grok stream broke off: {e!r}")
+            yield chunk({}, "error", {"message": "The Grok API stream was interrupted.", "type": "upstream_error"})
+        finally:
+            await response.aclose()
+        yield "data: [DONE]\n\n"
+
+
+async def until_disconnected(request: Request, events: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """
+    Relays events until the client disconnects, then closes the event
+    generator at once, even while it waits for the next upstream delta.
+    StreamingResponse alone only notices the disconnect on its next write.
+    """
+    async def wait_for_disconnect():
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    disconnected = asyncio.create_task(wait_for_disconnect())
+    next_event = None
+    try:
+        while True:
+            next_event = asyncio.ensure_future(anext(events))
+            await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                logger.info("Client disconnected, cancelling the Grok API stream")
+                break
+            try:
+                event = next_event.result()
+            except StopAsyncIteration:
+                break
+            yield event
+    finally:
+        disconnected.cancel()
+        if next_event is not None and not next_event.done():
+            # The generator is busy in that task: cancelling it runs the generator's cleanup there
+            next_event.cancel()
+        else:
+            await events.aclose()
+
+@lru_cache()
+def get_ocr_service() -> OCRService:
+    """
+    The process-wide OCRService. Raises ValueError while XAI_API_KEY is not configured.
+    """
+    return OCRService()
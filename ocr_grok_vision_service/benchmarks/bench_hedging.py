@@ -0,0 +1,96 @@
+"""
+Chat latency through OCRService with and without hedged requests
+(app/services/hedging.py), against a local stub upstream whose latency has a
+heavy tail: most calls answer after about --base-ms, --slow-share of them
+stall for --slow-ms, the way a busy upstream replica does.
+
+Run from the service directory:
+    python -m benchmarks.bench_hedging --requests 400 --concurrency 8
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import List
+
+from fastapi import FastAPI
+
+from app.core.config import get_settings
+from app.services import hedging
+from app.services.http_client import create_client
+from app.services.ocr_service import OCRService
+from benchmarks.bench_upstream import start_stub
+
+settings = get_settings()
+
+
+def stub_app(base_ms: float, slow_ms: float, slow_share: float, seed: int) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+
+    @app.post("/v1/chat/completions")
+    async def completions():
+        delay = slow_ms if rng.random() < slow_share else rng.uniform(0.7, 1.3) * base_ms
+        await asyncio.sleep(delay / 1000)
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": "OK"}}]}
+
+    return app
+
+
+async def run(service: OCRService, requests: int, concurrency: int) -> List[float]:
+    samples: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await service.generate_text_response("Итого?", [], model_name="grok-bench")
+            samples.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return samples
+
+
+def summarise(samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered):7.1f} ms   p99 {p99:7.1f} ms   max {ordered[-1]:7.1f} ms"
+
+
+async def bench(url: str, args) -> None:
+    async with create_client() as client:
+        service = OCRService(client)
+        service.api_endpoint = url
+        for name, hedged in (("no hedging", False), ("hedged", True)):
+            settings.GROK_HEDGING = hedged
+            hedging.policies.clear()
+            if hedged:
+                # Untimed calls to learn the latency distribution
+                await run(service, args.concurrency * 10, args.concurrency)
+                policy = hedging.get_policy("grok-bench")
+                policy.requests = policy.hedges_fired = policy.hedges_won = policy.hedges_over_budget = 0
+            samples = await run(service, args.requests, args.concurrency)
+            print(f"{name:<12}{summarise(samples)}")
+        print("hedging:", hedging.hedging_stats()["grok-bench"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--base-ms", type=float, default=100.0)
+    parser.add_argument("--slow-ms", type=float, default=1500.0)
+    parser.add_argument("--slow-share", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings.XAI_API_KEY = settings.XAI_API_KEY or "stub"
+    url = start_stub(stub_app(args.base_ms, args.slow_ms, args.slow_share, args.seed), None)
+    print(f"Stub upstream: {args.base_ms} ms typical, {args.slow_share:.0%} of calls at {args.slow_ms} ms; "
+          f"hedging at p{settings.GROK_HEDGE_PERCENTILE:g}, at most {settings.GROK_HEDGE_MAX_RATE:.0%} extra calls")
+    asyncio.run(bench(url, args))
+
+
+if __name__ == "__main__":
+    main()
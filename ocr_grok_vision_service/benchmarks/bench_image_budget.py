@@ -0,0 +1,121 @@
+"""
+End-to-end OCR latency and upload size with and without the image budget
+(app/services/image_budget.py), on synthetic phone photos of receipts.
+
+The upstream is a local stub that models the costs the budget changes: the
+upload of the request body over a link of --uplink-mbps, and image processing
+proportional to the 512 px tiles the model sees at the requested detail level.
+Budget time (decode, rotate, resize, recompress) is measured for real.
+
+Run from the service directory:
+    python -m benchmarks.bench_image_budget --images 8 --uplink-mbps 20
+"""
+import argparse
+import asyncio
+import base64
+import io
+import math
+import random
+import statistics
+import time
+from typing import List
+
+from fastapi import FastAPI, Request, UploadFile
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from starlette.datastructures import Headers
+
+from app.core.config import get_settings
+from app.services.http_client import create_client
+from app.services.ocr_service import OCRService
+from benchmarks.bench_upstream import start_stub
+
+settings = get_settings()
+
+TILE = 512
+
+
+def stub_app(uplink_mbps: float, tile_ms: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.body()
+        payload = await request.json()
+        image = payload["messages"][0]["content"][0]["image_url"]
+        size = Image.open(io.BytesIO(base64.b64decode(image["url"].split(",", 1)[1]))).size
+        tiles = 1 if image["detail"] == "low" else math.ceil(size[0] / TILE) * math.ceil(size[1] / TILE)
+        await asyncio.sleep(len(body) * 8 / (uplink_mbps * 1e6) + tiles * tile_ms / 1000)
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": "TOTAL 123.45"}}]}
+
+    return app
+
+
+def phone_photo(rng: random.Random) -> bytes:
+    """A 12 MP JPEG of a receipt on a table, some of them stored sideways with an EXIF orientation"""
+    paper = Image.new("L", (576, 40 + 40 * 30), 245)
+    draw = ImageDraw.Draw(paper)
+    font = ImageFont.load_default(size=22)
+    for i in range(40):
+        draw.text((16, 20 + i * 30), f"ITEM {rng.randint(100, 999)} {rng.randint(1, 5)} x {rng.uniform(10, 999):>8.2f}",
+                  font=font, fill=25)
+    photo = Image.new("L", (3024, 4032), 70)
+    photo.paste(paper.resize((1728, 3720)), (648, 156))
+    photo = photo.rotate(rng.uniform(-4, 4), fillcolor=70).filter(ImageFilter.GaussianBlur(1.5)).convert("RGB")
+    exif = Image.Exif()
+    if rng.random() < 0.5:
+        photo = photo.transpose(Image.Transpose.ROTATE_90)
+        exif[0x0112] = 6
+    buffer = io.BytesIO()
+    photo.save(buffer, format="JPEG", quality=92, exif=exif)
+    return buffer.getvalue()
+
+
+async def run(service: OCRService, photos: List[bytes], runs: int, budget: bool):
+    settings.GROK_IMAGE_BUDGET = budget
+    samples, sent = [], []
+    for _ in range(runs):
+        for photo in photos:
+            upload = UploadFile(io.BytesIO(photo), filename="photo.jpg", headers=Headers({"content-type": "image/jpeg"}))
+            start = time.perf_counter()
+            _, _, report = await service.extract_text_from_image(upload)
+            samples.append((time.perf_counter() - start) * 1000)
+            sent.append(report["sent_bytes"] if report else len(photo))
+    return samples, sent
+
+
+def summarise(samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered):8.1f} ms   p99 {p99:8.1f} ms"
+
+
+async def bench(url: str, photos: List[bytes], runs: int):
+    async with create_client() as client:
+        service = OCRService(client)
+        service.api_endpoint = url
+        await run(service, photos[:1], 1, True)
+        for name, budget in (("as uploaded", False), ("image budget", True)):
+            samples, sent = await run(service, photos, runs, budget)
+            print(f"{name:<14}{summarise(samples)}   {statistics.mean(sent) / 1024:8.0f} KiB sent on average")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--uplink-mbps", type=float, default=20.0, help="Modelled upload bandwidth to the API")
+    parser.add_argument("--tile-ms", type=float, default=15.0, help="Modelled upstream time per 512 px tile")
+    args = parser.parse_args()
+
+    settings.XAI_API_KEY = settings.XAI_API_KEY or "stub"
+    rng = random.Random(args.seed)
+    photos = [phone_photo(rng) for _ in range(args.images)]
+    url = start_stub(stub_app(args.uplink_mbps, args.tile_ms), None)
+    print(f"{len(photos)} photos of {statistics.mean(map(len, photos)) / 1024:.0f} KiB on average, "
+          f"{args.uplink_mbps} Mbit/s uplink, {args.tile_ms} ms per tile")
+    asyncio.run(bench(url, photos, args.runs))
+
+
+if __name__ == "__main__":
+    main()
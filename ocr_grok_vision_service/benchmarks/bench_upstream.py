@@ -0,0 +1,144 @@
+"""
+Latency of calls to the xAI API through a new client per call (a TCP and TLS
+handshake every time, as the service used to do) and through the shared
+keep-alive client of app/services/http_client.py.
+
+The upstream is a local stub answering /v1/chat/completions over TLS with a
+self-signed certificate (made with the openssl command line tool, plain HTTP
+when it is missing). The stub speaks HTTP/1.1 only, so the numbers show the
+handshake savings of keep-alive, not HTTP/2 multiplexing.
+
+Run from the service directory:
+    python -m benchmarks.bench_upstream --requests 300 --concurrency 8
+"""
+import argparse
+import asyncio
+import shutil
+import socket
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from app.services.http_client import PoolMetrics, create_client
+
+COMPLETION = {
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "model": "grok-2-vision-1212",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ИТОГО: 123.45"}, "finish_reason": "stop"}],
+}
+
+
+def stub_app(delay_ms: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions():
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+        return COMPLETION
+
+    return app
+
+
+def self_signed_cert(directory: Path) -> Optional[tuple]:
+    if shutil.which("openssl") is None:
+        return None
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1", "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def start_stub(app: FastAPI, cert: Optional[tuple]) -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    config = uvicorn.Config(
+        app, host="127.0.0.1", port=port, log_level="warning",
+        ssl_certfile=str(cert[0]) if cert else None, ssl_keyfile=str(cert[1]) if cert else None,
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"{'https' if cert else 'http'}://localhost:{port}/v1/chat/completions"
+
+
+async def run(send: Callable, requests: int, concurrency: int) -> List[float]:
+    samples: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await send()
+            response.raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return samples
+
+
+def summarise(samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered):7.2f} ms   p99 {p99:7.2f} ms"
+
+
+async def bench(url: str, verify, args) -> None:
+    payload = {"model": "grok-2-vision-1212", "messages": [{"role": "user", "content": "x" * args.payload_kb * 1024}]}
+
+    async def per_call():
+        async with httpx.AsyncClient(verify=verify) as client:
+            return await client.post(url, json=payload, timeout=90.0)
+
+    metrics = PoolMetrics()
+    shared = create_client(metrics, verify=verify)
+
+    async def pooled():
+        return await shared.post(url, json=payload)
+
+    # Untimed warm-up of both paths
+    await run(per_call, args.concurrency, args.concurrency)
+    await run(pooled, args.concurrency, args.concurrency)
+    for name, send in (("new client per call", per_call), ("shared client", pooled)):
+        samples = await run(send, args.requests, args.concurrency)
+        print(f"{name:<22}{summarise(samples)}")
+    counters = metrics.hosts["localhost"]
+    print(f"shared client: {counters['requests']} requests over {counters['connections_opened']} connections, "
+          f"{counters['tls_handshakes']} TLS handshakes")
+    await shared.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Stub processing time per request")
+    parser.add_argument("--payload-kb", type=int, default=64, help="Request body size, like a base64 image")
+    parser.add_argument("--no-tls", action="store_true", help="Plain HTTP stub")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert = None if args.no_tls else self_signed_cert(Path(directory))
+        url = start_stub(stub_app(args.delay_ms), cert)
+        verify = ssl.create_default_context(cafile=str(cert[0])) if cert else True
+        print(f"Stub upstream at {url}, {args.requests} requests, concurrency {args.concurrency}")
+        asyncio.run(bench(url, verify, args))
+
+
+if __name__ == "__main__":
+    main()
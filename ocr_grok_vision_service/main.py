@@ -1,14 +1,24 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.routes import ocr, health, chat # Import the new chat router
 from app.core.config import get_settings
+from app.services.http_client import upstream
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One keep-alive client to the xAI API for the whole process
+    upstream.start()
+    yield
+    await upstream.close()
+
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
     version=settings.APP_VERSION,
+    lifespan=lifespan,
     # docs_url="/docs", # Uncomment if needed
     # redoc_url="/redoc", # Uncomment if needed
 )
@@ -0,0 +1,130 @@
+# tests/test_hedging.py
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import hedging, ocr_service
+from app.services.hedging import HedgePolicy
+
+
+def policy(**kwargs):
+    options = {"percentile": 90, "max_rate": 1.0, "min_delay": 0.01, "window": 50, "min_samples": 5}
+    return HedgePolicy(**{**options, **kwargs})
+
+
+def warmed(latency=0.01, **kwargs):
+    hedge_policy = policy(**kwargs)
+    hedge_policy.latencies.extend([latency] * 10)
+    hedge_policy.tokens = 5.0
+    return hedge_policy
+
+
+def attempts(*delays):
+    """
+    send() whose n-th call answers after delays[n], or fails with
+    delays[n] = (delay, exception); records which calls were cancelled
+    """
+    calls, cancelled = [], []
+
+    async def send():
+        number = len(calls)
+        calls.append(number)
+        try:
+            delay, error = delays[number] if isinstance(delays[number], tuple) else (delays[number], None)
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            return httpx.Response(200, json={"attempt": number})
+        except asyncio.CancelledError:
+            cancelled.append(number)
+            raise
+
+    return send, calls, cancelled
+
+
+def test_no_hedging_before_latencies_are_known():
+    hedge_policy = policy()
+    send, calls, _ = attempts(0.05)
+    asyncio.run(hedge_policy.run(send))
+    assert calls == [0] and hedge_policy.threshold() is None
+
+
+def test_slow_call_is_hedged_and_the_loser_cancelled():
+    hedge_policy = warmed()
+    send, calls, cancelled = attempts(1.0, 0.01)
+    response = asyncio.run(hedge_policy.run(send))
+    assert response.json() == {"attempt": 1}
+    assert calls == [0, 1] and cancelled == [0]
+    assert (hedge_policy.hedges_fired, hedge_policy.hedges_won) == (1, 1)
+
+
+def test_won_hedge_records_latency_from_the_primary_start():
+    hedge_policy = warmed()
+    # Hedge sent at 10 ms answers at 60 ms: the caller waited 60 ms, not the hedge's 50 ms
+    send, _, _ = attempts(1.0, 0.05)
+    asyncio.run(hedge_policy.run(send))
+    assert hedge_policy.latencies[-1] >= 0.06
+
+
+def test_fast_call_is_not_hedged():
+    hedge_policy = warmed(latency=0.2)
+    send, calls, _ = attempts(0.01)
+    asyncio.run(hedge_policy.run(send))
+    assert calls == [0] and hedge_policy.hedges_fired == 0
+
+
+def test_failed_attempt_waits_for_the_other():
+    hedge_policy = warmed()
+    # The first call fails at 50 ms, after the hedge went out at 10 ms; the hedge answers at 80 ms
+    send, _, _ = attempts((0.05, httpx.ConnectError("reset")), 0.07)
+    assert asyncio.run(hedge_policy.run(send)).json() == {"attempt": 1}
+    assert hedge_policy.hedges_won == 1
+
+
+def test_every_attempt_failing_raises():
+    hedge_policy = warmed()
+    send, _, _ = attempts((0, httpx.ConnectError("reset")))
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(hedge_policy.run(send))
+
+
+def test_budget_caps_the_hedge_rate():
+    hedge_policy = warmed(max_rate=0.25)
+    hedge_policy.tokens = 0.0
+    # Every call is slow enough to cross the threshold
+    hedge_policy.threshold = lambda: 0.01
+
+    async def scenario():
+        for _ in range(20):
+            send, _, _ = attempts(0.03, 0.03)
+            await hedge_policy.run(send)
+
+    asyncio.run(scenario())
+    assert hedge_policy.hedges_fired == 5
+    assert hedge_policy.hedges_over_budget == 15
+    assert hedge_policy.stats()["hedge_rate"] == 0.25
+
+
+def test_threshold_follows_recent_latencies():
+    hedge_policy = policy(percentile=90, window=10)
+    hedge_policy.latencies.extend([0.1] * 9 + [2.0])
+    assert hedge_policy.threshold() == 2.0
+    hedge_policy.latencies.extend([0.1] * 10)
+    assert hedge_policy.threshold() == 0.1
+
+
+def test_service_hedges_per_model(monkeypatch):
+    monkeypatch.setattr(ocr_service.settings, "XAI_API_KEY", "test-key")
+    monkeypatch.setattr(ocr_service.settings, "GROK_HEDGING", True)
+    monkeypatch.setattr(hedging, "policies", {})
+
+    def handler(request):
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Привет"}}]})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await ocr_service.OCRService(client).generate_text_response("Привет", [], model_name="grok-test")
+
+    assert asyncio.run(scenario())[0] == "Привет"
+    assert hedging.hedging_stats()["grok-test"]["requests"] == 1
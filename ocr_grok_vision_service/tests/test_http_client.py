@@ -0,0 +1,121 @@
+# tests/test_http_client.py
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import ocr_service
+from app.services.http_client import MeteredTransport, PoolMetrics, UpstreamClient, upstream
+from main import app
+
+COMPLETION = {"choices": [{"index": 0, "message": {"role": "assistant", "content": " Привет "}}]}
+
+
+def test_client_lives_as_long_as_the_app():
+    with TestClient(app) as client:
+        shared = upstream.client
+        assert upstream.client is shared
+        assert "upstream_pool" in client.get("/health").json()
+    assert upstream._client is None
+
+
+def test_service_is_shared(monkeypatch):
+    monkeypatch.setattr(ocr_service.settings, "XAI_API_KEY", "test-key")
+    ocr_service.get_ocr_service.cache_clear()
+    try:
+        assert ocr_service.get_ocr_service() is ocr_service.get_ocr_service()
+    finally:
+        ocr_service.get_ocr_service.cache_clear()
+
+
+def test_unconfigured_service_is_unavailable(monkeypatch):
+    monkeypatch.setattr(ocr_service.settings, "XAI_API_KEY", None)
+    ocr_service.get_ocr_service.cache_clear()
+    response = TestClient(app).post("/chat/generate-text", json={"message": "Привет"})
+    assert response.status_code == 503
+
+
+def test_chat_goes_through_the_given_client(monkeypatch):
+    monkeypatch.setattr(ocr_service.settings, "XAI_API_KEY", "test-key")
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=COMPLETION)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await ocr_service.OCRService(client).generate_text_response("Привет", [])
+
+    assert asyncio.run(scenario()) == ("Привет", ocr_service.settings.GROK_TEXT_DEFAULT_MODEL)
+    assert requests[0].headers["Authorization"] == "Bearer test-key"
+
+
+def test_transport_counts_requests_per_host(monkeypatch):
+    async def handle(self, request):
+        if request.url.path == "/fail":
+            raise httpx.ConnectError("refused", request=request)
+        assert "trace" in request.extensions
+        return httpx.Response(200)
+
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", handle)
+    metrics = PoolMetrics()
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=MeteredTransport(metrics)) as client:
+            await client.get("https://api.x.ai/ok")
+            await client.get("https://api.x.ai/ok")
+            with pytest.raises(httpx.ConnectError):
+                await client.get("https://api.x.ai/fail")
+
+    asyncio.run(scenario())
+    counters = metrics.hosts["api.x.ai"]
+    assert (counters["requests"], counters["errors"], counters["in_flight"]) == (3, 1, 0)
+
+
+def test_trace_events_count_handshakes():
+    metrics = PoolMetrics()
+    trace = metrics.tracer("api.x.ai")
+    for event in ("connection.connect_tcp.complete", "connection.start_tls.complete", "http2.send_request_headers.started"):
+        asyncio.run(trace(event, {}))
+    assert metrics.hosts["api.x.ai"]["connections_opened"] == 1
+    assert metrics.hosts["api.x.ai"]["tls_handshakes"] == 1
+
+
+def test_stats_without_a_client():
+    assert UpstreamClient().stats() == {}
+
+
+def test_pool_state_matches_connections_to_hosts():
+    async def serve(reader, writer):
+        while await reader.readuntil(b"\r\n\r\n"):
+            writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: 2\r\n\r\nok")
+            await writer.drain()
+
+    async def scenario():
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        transport = MeteredTransport(PoolMetrics())
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(3):
+                await client.get(f"http://127.0.0.1:{port}/")
+            state = transport.pool_state()
+        server.close()
+        return state
+
+    assert asyncio.run(scenario()) == {"127.0.0.1": {"open": 1, "idle": 1, "http2": 0}}
+
+
+def test_pool_state_survives_httpcore_changes():
+    transport = MeteredTransport(PoolMetrics())
+    transport._pool = object()
+    assert transport.pool_state() == {}
+
+    class Connection:
+        def can_handle_request(self, origin):
+            raise AttributeError("changed in a patch release")
+
+    transport._pool = type("Pool", (), {"connections": [Connection()]})()
+    transport.origins["api.x.ai"] = None
+    assert transport.pool_state() == {}
@@ -0,0 +1,115 @@
+# tests/test_image_budget.py
+import asyncio
+import io
+
+import httpx
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageDraw
+from starlette.datastructures import Headers
+
+from app.services import image_budget, ocr_service
+from app.services.image_budget import ImageBudgetError, effective_size, prepare_image
+
+
+def jpeg(size, text=True, orientation=None, quality=95):
+    img = Image.new("RGB", size, "white")
+    if text:
+        draw = ImageDraw.Draw(img)
+        for y in range(10, size[1] - 20, 24):
+            draw.text((10, y), "ИТОГО 123.45 " * 40, fill="black")
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, exif=exif)
+    return buffer.getvalue()
+
+
+def test_effective_size():
+    assert effective_size((4032, 3024), "high") == (1024, 768)
+    assert effective_size((600, 3000), "high") == (410, 2048)
+    assert effective_size((4032, 3024), "low") == (512, 384)
+    assert effective_size((300, 200), "high") == (300, 200)
+
+
+def test_photo_of_text_is_downsized_at_high_detail():
+    content = jpeg((3024, 4032))
+    budgeted = prepare_image(content, "image/jpeg")
+    assert budgeted.detail == "high"
+    assert budgeted.sent_size == (768, 1024)
+    assert budgeted.sent_bytes < budgeted.original_bytes
+    assert budgeted.report()["bytes_saved"] == budgeted.original_bytes - budgeted.sent_bytes
+
+
+def test_image_without_text_goes_low_detail():
+    budgeted = prepare_image(jpeg((3000, 2000), text=False), "image/jpeg")
+    assert budgeted.detail == "low"
+    assert budgeted.sent_size == (512, 341)
+
+
+def test_exif_orientation_is_applied():
+    budgeted = prepare_image(jpeg((2000, 1000), orientation=6), "image/jpeg")
+    assert budgeted.sent_size[0] < budgeted.sent_size[1]
+    assert budgeted.mime_type == "image/jpeg"
+
+
+def test_transparent_png_is_composited_onto_white():
+    img = Image.new("RGBA", (3000, 1000), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    for y in range(10, 980, 24):
+        draw.text((10, y), "ИТОГО 123.45 " * 60, fill=(0, 0, 0, 255))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+
+    budgeted = prepare_image(buffer.getvalue(), "image/png")
+    sent = Image.open(io.BytesIO(budgeted.data)).convert("L")
+    assert budgeted.detail == "high"
+    assert budgeted.text_density > 0.05
+    # White paper with black text, not a black rectangle
+    assert sum(sent.histogram()[200:]) > sent.width * sent.height / 2
+
+
+def test_small_upload_is_sent_as_is():
+    content = jpeg((400, 300), quality=30)
+    budgeted = prepare_image(content, "image/jpeg")
+    assert budgeted.data == content and budgeted.detail == "low"
+
+
+def test_byte_budget(monkeypatch):
+    monkeypatch.setattr(image_budget.settings, "GROK_IMAGE_MAX_BYTES", 20_000)
+    assert prepare_image(jpeg((3024, 4032)), "image/jpeg").sent_bytes <= 20_000
+
+
+def test_forced_detail(monkeypatch):
+    monkeypatch.setattr(image_budget.settings, "GROK_IMAGE_DETAIL", "high")
+    assert prepare_image(jpeg((3000, 2000), text=False), "image/jpeg").detail == "high"
+
+
+def test_garbage_is_rejected():
+    with pytest.raises(ImageBudgetError):
+        prepare_image(b"not an image", "image/jpeg")
+
+
+def test_service_sends_the_budgeted_image(monkeypatch):
+    monkeypatch.setattr(ocr_service.settings, "XAI_API_KEY", "test-key")
+    payloads = []
+
+    def handler(request):
+        payloads.append(request.read())
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ИТОГО 123.45"}}]})
+
+    async def scenario(content):
+        upload = UploadFile(io.BytesIO(content), filename="photo.jpg", headers=Headers({"content-type": "image/jpeg"}))
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await ocr_service.OCRService(client).extract_text_from_image(upload)
+
+    text, _, report = asyncio.run(scenario(jpeg((3024, 4032))))
+    assert text == "ИТОГО 123.45"
+    assert report["detail"] == "high" and report["upstream_ms"] >= 0
+    assert len(payloads[0]) < report["original_bytes"]
+    assert b'"detail":"high"' in payloads[0]
+
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(scenario(b"not an image"))
+    assert rejected.value.status_code == 400
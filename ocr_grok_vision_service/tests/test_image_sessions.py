@@ -0,0 +1,182 @@
+# tests/test_image_sessions.py
+import asyncio
+import io
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.api.routes import chat, ocr
+from app.services import ocr_service
+from app.services.image_sessions import ImageSession, ImageSessionStore
+from app.services.ocr_service import OCRService
+from main import app
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_messages_attach_the_image_to_the_first_question():
+    session = ImageSession("s", "data:image/jpeg;base64,AAAA", "high", "grok-vision")
+    assert session.messages("Сколько?")[0]["content"][0]["image_url"] == {
+        "url": "data:image/jpeg;base64,AAAA", "detail": "high"
+    }
+    session.add_turn("Сколько?", "123.45")
+    messages = session.messages("А дата?")
+    assert [message["role"] for message in messages] == ["user", "assistant", "user"]
+    assert messages[0]["content"][1] == {"type": "text", "text": "Сколько?"}
+    assert messages[2] == {"role": "user", "content": "А дата?"}
+
+
+def test_store_expires_and_evicts():
+    async def scenario():
+        store = ImageSessionStore(max_sessions=2, ttl_seconds=60)
+        first = await store.create("data:,1", "low", "grok")
+        await store.create("data:,2", "low", "grok")
+        await store.create("data:,3", "low", "grok")
+        evicted = await store.get(first.session_id)
+
+        expiring = ImageSessionStore(max_sessions=2, ttl_seconds=0)
+        session = await expiring.create("data:,1", "low", "grok")
+        return evicted, await expiring.get(session.session_id), store.stats(), expiring.stats()
+
+    evicted, expired, stats, expiring_stats = asyncio.run(scenario())
+    assert evicted is None and expired is None
+    assert stats["evicted"] == 1 and expiring_stats["expired"] == 1
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(ocr_service.settings, "XAI_API_KEY", "test-key")
+    monkeypatch.setattr(ocr_service, "image_sessions", ImageSessionStore(max_sessions=10, ttl_seconds=60))
+    monkeypatch.setattr(ocr, "image_sessions", ocr_service.image_sessions)
+    sent = []
+
+    def handler(request):
+        payload = json.loads(request.read())
+        sent.append(payload)
+        if payload.get("stream"):
+            body = "".join(
+                f"data: {json.dumps({'choices': [{'index': 0, 'delta': {'content': part}, 'finish_reason': None}]})}\n\n"
+                for part in ("Ответ", f" {len(sent)}")
+            ) + "data: [DONE]\n\n"
+            return httpx.Response(200, content=body.encode())
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"Ответ {len(sent)}"}}]})
+
+    service = OCRService(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    app.dependency_overrides[chat.get_chat_configured_service] = lambda: service
+    app.dependency_overrides[ocr.get_ocr_service] = lambda: service
+    yield sent
+    app.dependency_overrides.clear()
+
+
+def test_conversation_about_an_image(upstream):
+    client = TestClient(app)
+    created = client.post("/vision/sessions", files={"file": ("receipt.png", png(), "image/png")})
+    assert created.status_code == 201
+    session_id = created.json()["session_id"]
+    assert created.json()["model"] == ocr_service.settings.GROK_VISION_DEFAULT_MODEL
+
+    first = client.post("/chat/generate-text", json={"message": "Какая сумма?", "session_id": session_id})
+    second = client.post("/chat/generate-text", json={"message": "А дата?", "session_id": session_id})
+    assert first.json() == {"response_text": "Ответ 1", "model_used": created.json()["model"], "session_id": session_id}
+    assert second.json()["response_text"] == "Ответ 2"
+
+    # The image is encoded once and sent with every turn, the history grows
+    image_urls = [payload["messages"][0]["content"][0]["image_url"]["url"] for payload in upstream]
+    assert image_urls[0] == image_urls[1] and image_urls[0].startswith("data:image/png;base64,")
+    assert [message["role"] for message in upstream[1]["messages"]] == ["user", "assistant", "user"]
+
+    history = client.get(f"/vision/sessions/{session_id}").json()["history"]
+    assert [message["content"] for message in history] == ["Какая сумма?", "Ответ 1", "А дата?", "Ответ 2"]
+
+    assert client.delete(f"/vision/sessions/{session_id}").status_code == 204
+    gone = client.post("/chat/generate-text", json={"message": "Ещё?", "session_id": session_id})
+    assert gone.status_code == 404
+
+
+def test_streamed_turn_is_added_to_the_session(upstream):
+    client = TestClient(app)
+    session_id = client.post("/vision/sessions", files={"file": ("receipt.png", png(), "image/png")}).json()["session_id"]
+    streamed = client.post("/chat/generate-text", json={"message": "Итого?", "session_id": session_id, "stream": True})
+    assert streamed.text.endswith("data: [DONE]\n\n")
+    history = client.get(f"/vision/sessions/{session_id}").json()["history"]
+    assert history[-1] == {"role": "assistant", "content": "Ответ 1"}
+
+
+def test_session_and_history_are_exclusive(upstream):
+    response = TestClient(app).post("/chat/generate-text", json={
+        "message": "Итого?", "session_id": "abc", "history": [{"role": "user", "content": "Привет"}]
+    })
+    assert response.status_code == 400
+
+
+def test_unknown_session(upstream):
+    assert TestClient(app).get("/vision/sessions/missing").status_code == 404
+    assert TestClient(app).delete("/vision/sessions/missing").status_code == 404
+
+
+def test_concurrent_turns_on_a_session_are_rejected(monkeypatch):
+    monkeypatch.setattr(ocr_service.settings, "XAI_API_KEY", "test-key")
+    store = ImageSessionStore(max_sessions=10, ttl_seconds=60)
+    monkeypatch.setattr(ocr_service, "image_sessions", store)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(request):
+            await release.wait()
+            if json.loads(request.read()).get("stream"):
+                return httpx.Response(200, content=b"data: [DONE]\n\n")
+            return httpx.Response(200, json={"choices": [{"message": {"content": "Ответ"}}]})
+
+        service = OCRService(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        session = await store.create("data:,1", "low", "grok")
+        first = asyncio.create_task(service.generate_text_response("Итого?", [], session_id=session.session_id))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as rejected:
+            await service.generate_text_response("А дата?", [], session_id=session.session_id)
+        release.set()
+        await first
+
+        # The turn is over, the session takes the next one; a streamed turn holds it until the stream ends
+        events = await service.stream_text_response("А дата?", [], session_id=session.session_id)
+        with pytest.raises(HTTPException):
+            await service.generate_text_response("Магазин?", [], session_id=session.session_id)
+        assert [event async for event in events][-1] == "data: [DONE]\n\n"
+        await service.generate_text_response("Магазин?", [], session_id=session.session_id)
+        return rejected.value.status_code, await store.get(session.session_id)
+
+    status_code, session = asyncio.run(scenario())
+    assert status_code == 409
+    assert [message["content"] for message in session.history if message["role"] == "user"] == \
+        ["Итого?", "А дата?", "Магазин?"]
+
+
+def test_stream_end_keeps_the_lock_of_the_next_turn(monkeypatch):
+    monkeypatch.setattr(ocr_service.settings, "XAI_API_KEY", "test-key")
+    store = ImageSessionStore(max_sessions=10, ttl_seconds=60)
+    monkeypatch.setattr(ocr_service, "image_sessions", store)
+
+    def handler(request):
+        return httpx.Response(200, content=b"data: [DONE]\n\n")
+
+    async def scenario():
+        service = OCRService(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        session = await store.create("data:,1", "low", "grok")
+        events = await service.stream_text_response("Итого?", [], session_id=session.session_id)
+        assert await events.__anext__() == "data: [DONE]\n\n"
+        # The client has its answer and begins the next turn before the stream is closed
+        assert await store.begin_turn(session.session_id)
+        with pytest.raises(StopAsyncIteration):
+            await events.__anext__()
+        return await store.begin_turn(session.session_id)
+
+    assert asyncio.run(scenario()) is False
+    assert store.counters["turns_rejected"] == 1
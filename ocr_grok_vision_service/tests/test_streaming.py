@@ -0,0 +1,117 @@
+# tests/test_streaming.py
+import asyncio
+import io
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.api.routes import chat, ocr
+from app.services import ocr_service
+from app.services.ocr_service import OCRService, until_disconnected
+from main import app
+
+
+def upstream_events(*contents, finish_reason="stop"):
+    lines = [{"choices": [{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}]}]
+    lines += [{"choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]} for content in contents]
+    lines += [{"choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]}]
+    return "".join(f"data: {json.dumps(line)}\n\n" for line in lines) + "data: [DONE]\n\n"
+
+
+def events(text):
+    return [line[len("data: "):] for line in text.split("\n\n") if line]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(ocr_service.settings, "XAI_API_KEY", "test-key")
+    sent = []
+
+    def handler(request):
+        sent.append(json.loads(request.read()))
+        if sent[-1]["messages"][-1]["content"] == "rate limit me":
+            return httpx.Response(429, json={"error": {"message": "Rate limit exceeded"}})
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"},
+                              content=upstream_events("Итого", ": 123.45").encode())
+
+    service = OCRService(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    app.dependency_overrides[chat.get_chat_configured_service] = lambda: service
+    app.dependency_overrides[ocr.get_ocr_service] = lambda: service
+    yield sent
+    app.dependency_overrides.clear()
+
+
+def test_chat_stream_relays_chunks(upstream):
+    response = TestClient(app).post("/chat/generate-text", json={"message": "Привет", "stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert upstream[0]["stream"] is True
+
+    *chunks, done = events(response.text)
+    assert done == "[DONE]"
+    chunks = [json.loads(chunk) for chunk in chunks]
+    assert {chunk["object"] for chunk in chunks} == {"chat.completion.chunk"}
+    assert len({chunk["id"] for chunk in chunks}) == 1 and chunks[0]["id"].startswith("chatcmpl-")
+    assert chunks[0]["choices"][0]["delta"] == {"role": "assistant"}
+    assert "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks) == "Итого: 123.45"
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+
+def test_chat_stream_upstream_error_is_an_http_error(upstream):
+    response = TestClient(app).post("/chat/generate-text", json={"message": "rate limit me", "stream": True})
+    assert response.status_code == 429
+
+
+def test_ocr_stream(upstream):
+    image = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(image, format="PNG")
+    response = TestClient(app).post(
+        "/vision/extract-text?stream=true", files={"file": ("receipt.png", image.getvalue(), "image/png")}
+    )
+    assert response.status_code == 200
+    assert "image_budget" in response.headers["server-timing"]
+    assert upstream[0]["stream"] is True
+    assert events(response.text)[-1] == "[DONE]"
+
+
+def test_upstream_error_chunk_is_relayed():
+    async def scenario():
+        body = 'data: {"error": {"message": "overloaded", "type": "server_error"}}\n\ndata: [DONE]\n\n'
+        response = httpx.Response(200, content=body.encode())
+        return [event async for event in OCRService.__new__(OCRService).relay_stream(response, "grok")]
+
+    first, done = asyncio.run(scenario())
+    choice = json.loads(first[len("data: "):])["choices"][0]
+    assert choice["finish_reason"] == "error" and choice["error"]["message"] == "overloaded"
+    assert done == "data: [DONE]\n\n"
+
+
+def test_disconnect_closes_the_upstream_stream():
+    closed = asyncio.Event()
+    client_gone = asyncio.Event()
+
+    async def generation():
+        try:
+            yield "data: first\n\n"
+            await asyncio.sleep(60) # The model is still thinking
+            yield "data: never\n\n"
+        finally:
+            closed.set()
+
+    class DisconnectingRequest:
+        async def receive(self):
+            await client_gone.wait()
+            return {"type": "http.disconnect"}
+
+    async def scenario():
+        received = []
+        async for event in until_disconnected(DisconnectingRequest(), generation()):
+            received.append(event)
+            client_gone.set()
+        return received
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 5)) == ["data: first\n\n"]
+    assert closed.is_set()
@@ -0,0 +1,17 @@
+# routers/health.py
+from fastapi import APIRouter
+from app.services.ocr_pool import ocr_executor
+from app.services.ocr_cache import receipt_cache
+
+router = APIRouter(tags=["Health"])
+
+@router.get("/health")
+async def health_check():
+    """
+    Liveness check, answered by the event loop without touching the OCR executor
+    """
+    return {
+        "status": "healthy",
+        "ocr_executor": ocr_executor.stats(),
+        "receipt_cache": receipt_cache.stats() if receipt_cache else None
+    }
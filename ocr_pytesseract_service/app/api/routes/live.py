@@ -0,0 +1,92 @@
+# routers/live.py
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+from app.core.config import settings
+from app.services.live_capture import FrameGate, FrameMailbox, ReceiptAccumulator
+from app.services.ocr_services import apply_fiscal_qr, parse_receipt_data, run_ocr_pipeline
+from app.services.ocr_tiers import OCR_TIERS
+from app.services.ocr_pool import OCRQueueFullError
+from typing import Optional
+import asyncio
+import json
+import logging
+
+router = APIRouter(
+    prefix="/ocr",
+    tags=["OCR"],
+)
+
+logger = logging.getLogger(__name__)
+
+@router.websocket("/live")
+async def live_capture(
+    websocket: WebSocket,
+    tier: Optional[str] = Query(None, description="Speed/accuracy profile: fast, balanced or best"),
+):
+    """
+    Live receipt capture. The client sends camera frames as binary messages
+    (JPEG or PNG) and {"type": "end"} when done. The server answers every frame
+    it looks at with {"type": "frame", "status"}, where status is "ocr" or why
+    the frame was skipped, sends {"type": "receipt"} with the firm and pending
+    fields whenever they change, and {"type": "final"} with the best receipt
+    before closing. Frames that arrive while the previous one is still being
+    processed replace each other; only the newest is looked at.
+    """
+    if tier is not None and tier not in OCR_TIERS:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=f"Unknown tier '{tier}'")
+        return
+    await websocket.accept()
+
+    mailbox = FrameMailbox()
+    gate = FrameGate()
+    accumulator = ReceiptAccumulator()
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    mailbox.put(message["bytes"])
+                elif json.loads(message.get("text") or "{}").get("type") == "end":
+                    break
+        except (WebSocketDisconnect, ValueError) as e:
+            logger.info(f"Live capture input ended: {str(e)}")
+        finally:
+            mailbox.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        snapshot = accumulator.snapshot()
+        while (frame := await mailbox.get()) is not None:
+            number, contents = frame
+            check = await asyncio.to_thread(gate.check, contents)
+            status_message = {
+                "type": "frame", "frame": number, "status": check.status,
+                "sharpness": check.sharpness, "dropped": mailbox.dropped,
+            }
+            if check.status == "ocr":
+                try:
+                    result = await run_ocr_pipeline(contents, settings.OCR_FISCAL_QR, tier)
+                    receipt_data = parse_receipt_data(result.text, words=result.words)
+                    if result.fiscal is not None:
+                        receipt_data = apply_fiscal_qr(receipt_data, result.fiscal)
+                    accumulator.add(receipt_data)
+                except OCRQueueFullError:
+                    # The service is saturated, a later frame gets its turn
+                    status_message["status"] = "busy"
+                except Exception as e:
+                    logger.error(f"Error processing live frame: {str(e)}")
+                    status_message["status"] = "error"
+            await websocket.send_json(status_message)
+
+            if accumulator.snapshot() != snapshot:
+                snapshot = accumulator.snapshot()
+                await websocket.send_json({"type": "receipt", "frame": number, **snapshot})
+
+        await websocket.send_json({"type": "final", "receipt": accumulator.receipt()})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("Live capture client disconnected")
+    finally:
+        receiver.cancel()
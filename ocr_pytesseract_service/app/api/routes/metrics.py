@@ -0,0 +1,18 @@
+# routers/metrics.py
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+from prometheus_client.exposition import choose_encoder
+
+from app.services.metrics import registry
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Prometheus metrics. Exemplars with image dimensions and byte size are only
+    included in the OpenMetrics format, which Prometheus requests when
+    exemplar storage is enabled.
+    """
+    encoder, content_type = choose_encoder(request.headers.get("accept"))
+    return Response(content=encoder(registry), media_type=content_type)
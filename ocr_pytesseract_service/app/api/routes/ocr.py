@@ -1,8 +1,16 @@
 # routers/ocr.py
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
-from app.services.ocr_services import extract_text_from_image, parse_receipt_data
-from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.config import settings
+from app.services.ocr_services import iter_document_results, process_receipt_bytes
+from app.services.documents import DocumentTooLargeError, detect_document_type
+from app.services.metrics import server_timing_header
+from app.services.ocr_tiers import OCR_TIERS
+from app.services.preprocessing import PreprocessingSpecError, parse_request_spec
+from app.services.ocr_pool import OCRQueueFullError
+from typing import Optional, List
+import asyncio
+import json
 import logging
 
 router = APIRouter(
@@ -13,25 +21,123 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
+def check_tier(tier: Optional[str]):
+    if tier is not None and tier not in OCR_TIERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown tier '{tier}', expected one of: {', '.join(OCR_TIERS)}"
+        )
+
+def check_preprocessing(preprocessing: Optional[str]):
+    if preprocessing is not None:
+        try:
+            parse_request_spec(preprocessing)
+        except PreprocessingSpecError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @router.post("/extract-text")
 async def process_receipt(
     file: UploadFile = File(...),
+    header_only: bool = Query(False, description="Only date and total: read from the fiscal QR code, skipping OCR when possible"),
+    tier: Optional[str] = Query(None, description="Speed/accuracy profile: fast, balanced or best"),
+    dpi: Optional[int] = Query(None, ge=72, le=600, description="Resolution PDF pages are rasterised at"),
+    stream: bool = Query(False, description="PDF/TIFF: stream one NDJSON line per page, then the merged receipt"),
+    preprocessing: Optional[str] = Query(None, description="Preprocessing pipeline, e.g. grey,region,threshold:sauvola:25:0.2, or a preset: minimal, standard, full"),
 ):
     """
-    Process a receipt image and extract the relevant information
+    Process a receipt image, PDF or multi-page TIFF and extract the relevant information
     """
+    check_tier(tier)
+    check_preprocessing(preprocessing)
     try:
-        # Extract text from image using OCR
-        extracted_text = await extract_text_from_image(file)
-        
-        # Parse the extracted text to get receipt data
-        receipt_data = parse_receipt_data(extracted_text)
-        
-        return receipt_data
-    
+        # Extract text from image using OCR and parse it into receipt data
+        contents = await file.read()
+
+        kind = detect_document_type(contents)
+        if stream and kind is not None:
+            return StreamingResponse(stream_document(contents, kind, tier, dpi, preprocessing), media_type="application/x-ndjson")
+
+        timings = {}
+        receipt_data = await process_receipt_bytes(
+            contents, timings, header_only=header_only, tier=tier, dpi=dpi, preprocessing=preprocessing
+        )
+
+        # Per-stage durations, shown in the browser devtools timing tab
+        return JSONResponse(content=receipt_data, headers={"Server-Timing": server_timing_header(timings)})
+
+    except DocumentTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except OCRQueueFullError as e:
+        logger.warning(f"Rejecting receipt, OCR queue is full: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error processing receipt: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process receipt: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+async def stream_document(contents: bytes, kind: str, tier: Optional[str], dpi: Optional[int],
+                          preprocessing: Optional[str] = None):
+    """
+    NDJSON lines of iter_document_results; a failure ends the stream with an error line
+    """
+    try:
+        async for line in iter_document_results(contents, kind, tier=tier, dpi=dpi, preprocessing=preprocessing):
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    except Exception as e:
+        logger.error(f"Error processing {kind} document: {str(e)}")
+        yield json.dumps({"error": f"Failed to process receipt: {str(e)}"}, ensure_ascii=False) + "\n"
+
+@router.post("/extract-text/batch")
+async def process_receipt_batch(
+    files: List[UploadFile] = File(...),
+    tier: Optional[str] = Query(None, description="Speed/accuracy profile: fast, balanced or best"),
+    preprocessing: Optional[str] = Query(None, description="Preprocessing pipeline, e.g. grey,region,threshold:sauvola:25:0.2, or a preset: minimal, standard, full"),
+):
+    """
+    Process several receipt images in one request.
+    Streams one NDJSON line per image in completion order; each line carries
+    the index of the image in the upload so clients can match results.
+    """
+    check_tier(tier)
+    check_preprocessing(preprocessing)
+    if len(files) > settings.OCR_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many files in batch: {len(files)} (max {settings.OCR_BATCH_MAX_FILES})"
+        )
+
+    # Upload files are closed once this handler returns, read them before streaming
+    uploads = [(file.filename, await file.read()) for file in files]
+    semaphore = asyncio.Semaphore(settings.OCR_BATCH_CONCURRENCY)
+
+    async def process_one(index: int, filename: Optional[str], contents: bytes) -> dict:
+        async with semaphore:
+            try:
+                receipt_data = await process_receipt_bytes(contents, tier=tier, preprocessing=preprocessing)
+                return {"index": index, "filename": filename, "result": receipt_data}
+            except Exception as e:
+                logger.error(f"Error processing receipt {filename} in batch: {str(e)}")
+                return {"index": index, "filename": filename, "error": f"Failed to process receipt: {str(e)}"}
+
+    async def stream_results():
+        tasks = [
+            asyncio.create_task(process_one(index, filename, contents))
+            for index, (filename, contents) in enumerate(uploads)
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield json.dumps(await next_result, ensure_ascii=False) + "\n"
+        finally:
+            # Client went away: do not keep OCR workers busy for nobody
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
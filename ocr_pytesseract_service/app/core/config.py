@@ -5,12 +5,93 @@ class Settings(BaseSettings):
     APP_NAME: str = "Russian Receipt OCR Service"
     PORT: int = int(os.getenv("PORT", 8000))
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
-    
+
     # OCR settings
     PYTESSERACT_PATH: str = os.getenv("PYTESSERACT_PATH", "/usr/bin/tesseract")
-    
-    
+    OCR_LANG: str = os.getenv("OCR_LANG", "rus")
+    # "tesserocr" keeps initialised Tesseract API handles per worker, "subprocess" runs the
+    # tesseract binary per image, "auto" uses tesserocr when it is installed
+    OCR_ENGINE: str = os.getenv("OCR_ENGINE", "auto")
+    TESSDATA_PATH: str | None = os.getenv("TESSDATA_PATH")
+    # Speed/accuracy profile used when a request does not choose one: "fast", "balanced" or "best"
+    OCR_DEFAULT_TIER: str = os.getenv("OCR_DEFAULT_TIER", "balanced")
+    # Directories with the tessdata_fast and tessdata_best models used by those tiers
+    OCR_TESSDATA_FAST_PATH: str | None = os.getenv("OCR_TESSDATA_FAST_PATH")
+    OCR_TESSDATA_BEST_PATH: str | None = os.getenv("OCR_TESSDATA_BEST_PATH")
+
+    # Decode settings
+    # Uploads are decoded in greyscale and downscaled to at most this many pixels
+    OCR_DECODE_MAX_PIXELS: int = int(os.getenv("OCR_DECODE_MAX_PIXELS", 4_000_000))
+    # Text line height in pixels images are scaled towards, 0 disables it
+    OCR_TARGET_LINE_HEIGHT: int = int(os.getenv("OCR_TARGET_LINE_HEIGHT", 40))
+
+    # Preprocessing settings
+    # Crop photos to the receipt outline and deskew them before thresholding
+    OCR_RECEIPT_CROP: bool = os.getenv("OCR_RECEIPT_CROP", "True").lower() == "true"
+    # Preprocessing pipeline for every request, e.g. "grey,region,threshold:sauvola:25:0.2",
+    # or a preset name (minimal, standard, full); unset uses the preset of the request's tier
+    OCR_PREPROCESSING: str | None = os.getenv("OCR_PREPROCESSING")
+    # Images taller than 1.5 strips are OCRed as horizontal strips in parallel, 0 disables it
+    OCR_STRIP_HEIGHT: int = int(os.getenv("OCR_STRIP_HEIGHT", 1600))
+    # Threads per OCR worker recognising the strips of one image
+    OCR_STRIP_WORKERS: int = int(os.getenv("OCR_STRIP_WORKERS", min(4, os.cpu_count() or 1)))
+
+    # Reject uploads that are clearly not receipts from a small preview, before OCR
+    OCR_PRECLASSIFY: bool = os.getenv("OCR_PRECLASSIFY", "True").lower() == "true"
+
+    # Receipt parsing settings
+    # Read date and total from the fiscal QR code when the receipt has one
+    OCR_FISCAL_QR: bool = os.getenv("OCR_FISCAL_QR", "True").lower() == "true"
+    # "text" parses items from the OCR text, "layout" from Tesseract word boxes
+    # (falling back to the text heuristics when no price column is found)
+    OCR_ITEM_EXTRACTION: str = os.getenv("OCR_ITEM_EXTRACTION", "text")
+    # Parse receipts of known chains with their layout templates, recognised from the header
+    OCR_RECEIPT_TEMPLATES: bool = os.getenv("OCR_RECEIPT_TEMPLATES", "True").lower() == "true"
+    # JSON file with additional templates, see receipt_templates.load_templates
+    OCR_RECEIPT_TEMPLATES_PATH: str | None = os.getenv("OCR_RECEIPT_TEMPLATES_PATH")
+    # Read price column cells again as digits-only single lines and merge the corrections
+    OCR_PRICE_REOCR: bool = os.getenv("OCR_PRICE_REOCR", "False").lower() == "true"
+    # Cells recognised with at least this confidence (0-100) are trusted as they are
+    OCR_PRICE_REOCR_CONFIDENCE: float = float(os.getenv("OCR_PRICE_REOCR_CONFIDENCE", 90))
+
+    # OCR execution settings
+    # "process" runs decode/preprocess/OCR in a process pool, "thread" in the default thread pool
+    OCR_EXECUTION_MODE: str = os.getenv("OCR_EXECUTION_MODE", "process")
+    OCR_POOL_WORKERS: int = int(os.getenv("OCR_POOL_WORKERS", os.cpu_count() or 1))
+    # Number of jobs allowed to wait for a free worker before requests are rejected
+    OCR_POOL_QUEUE_SIZE: int = int(os.getenv("OCR_POOL_QUEUE_SIZE", 16))
+
+    # Result cache settings
+    OCR_CACHE_ENABLED: bool = os.getenv("OCR_CACHE_ENABLED", "True").lower() == "true"
+    OCR_CACHE_MAX_ENTRIES: int = int(os.getenv("OCR_CACHE_MAX_ENTRIES", 1024))
+    OCR_CACHE_TTL_SECONDS: int = int(os.getenv("OCR_CACHE_TTL_SECONDS", 3600))
+    # Shared second layer, e.g. redis://redis:6379/1
+    OCR_CACHE_REDIS_URL: str | None = os.getenv("OCR_CACHE_REDIS_URL")
+    # Serve near-duplicate uploads (re-encoded/resized copies) from the cache.
+    # Off by default: receipts of the same store can look alike at hash resolution
+    OCR_CACHE_NEAR_DUPLICATES: bool = os.getenv("OCR_CACHE_NEAR_DUPLICATES", "False").lower() == "true"
+    OCR_CACHE_PHASH_DISTANCE: int = int(os.getenv("OCR_CACHE_PHASH_DISTANCE", 6))
+
+    # PDF and multi-page TIFF settings
+    OCR_DOCUMENT_MAX_PAGES: int = int(os.getenv("OCR_DOCUMENT_MAX_PAGES", 50))
+    # Resolution PDF pages are rasterised at, requests may choose another
+    OCR_DOCUMENT_DPI: int = int(os.getenv("OCR_DOCUMENT_DPI", 300))
+    # Pages of one document processed at the same time, at most OCR_POOL_WORKERS
+    OCR_DOCUMENT_CONCURRENCY: int = int(os.getenv("OCR_DOCUMENT_CONCURRENCY", os.cpu_count() or 1))
+
+    # Batch endpoint settings
+    OCR_BATCH_MAX_FILES: int = int(os.getenv("OCR_BATCH_MAX_FILES", 50))
+    # Images of one batch processed at the same time
+    OCR_BATCH_CONCURRENCY: int = int(os.getenv("OCR_BATCH_CONCURRENCY", 4))
+
+    # Live camera capture settings (/ocr/live WebSocket)
+    # Frames with a lower Laplacian variance (at 480 px width) are too blurry to OCR
+    OCR_LIVE_MIN_SHARPNESS: float = float(os.getenv("OCR_LIVE_MIN_SHARPNESS", 100))
+    # OCR results that have to agree on a field before it is reported as firm
+    OCR_LIVE_CONFIRMATIONS: int = int(os.getenv("OCR_LIVE_CONFIRMATIONS", 2))
+
+
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,195 @@
+import io
+import logging
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# OpenCV reduced-resolution flags, decoded by libjpeg at 1/2, 1/4 or 1/8 scale
+REDUCED_GRAYSCALE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+EXIF_ORIENTATION = 0x0112
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+# Columns sampled for the text line height estimate
+LINE_HEIGHT_SAMPLE_WIDTH = 800
+
+
+@dataclass
+class DecodeInfo:
+    """What the decode stage did with an upload"""
+    source_size: Tuple[int, int]
+    decoded_size: Tuple[int, int]
+    jpeg_reduction: int
+    text_scale: float
+    # Bytes the old full-resolution colour decode would have allocated
+    full_decode_bytes: int
+    decoded_bytes: int
+    decode_ms: float
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.full_decode_bytes - self.decoded_bytes
+
+    @property
+    def pixel_ratio(self) -> float:
+        source_pixels = self.source_size[0] * self.source_size[1]
+        return self.decoded_size[0] * self.decoded_size[1] / source_pixels if source_pixels else 1.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["bytes_saved"] = self.bytes_saved
+        data["pixel_ratio"] = round(self.pixel_ratio, 4)
+        return data
+
+
+def read_image_size(buffer: np.ndarray) -> Optional[Tuple[int, int]]:
+    """
+    Width and height from the image header, without decoding pixels, as
+    displayed: cv2.imdecode applies the EXIF orientation, so a portrait
+    photo stored sideways is reported portrait
+    """
+    try:
+        with Image.open(io.BytesIO(buffer)) as header:
+            width, height = header.size
+            if header.getexif().get(EXIF_ORIENTATION, 1) in TRANSPOSED_ORIENTATIONS:
+                return height, width
+            return width, height
+    except Exception:
+        return None
+
+
+def choose_jpeg_reduction(width: int, height: int, max_pixels: int) -> int:
+    """
+    Largest libjpeg reduction that still keeps the image above the pixel budget,
+    i.e. the cheapest decode from which resizing down to the budget loses nothing
+    """
+    reduction = 1
+    for factor in (2, 4, 8):
+        if (width // factor) * (height // factor) >= max_pixels:
+            reduction = factor
+    return reduction
+
+
+def estimate_line_height(gray: np.ndarray) -> Optional[float]:
+    """
+    Median height of text lines from the horizontal ink projection profile
+    """
+    # Only rows are measured: every few columns are enough for the profile
+    step = max(1, gray.shape[1] // LINE_HEIGHT_SAMPLE_WIDTH)
+    gray = np.ascontiguousarray(gray[:, ::step])
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    row_ink = ink.sum(axis=1, dtype=np.int64)
+    text_rows = row_ink > max(1, int(gray.shape[1] * 0.01))
+
+    # Lengths of consecutive runs of text rows
+    padded = np.concatenate(([False], text_rows, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    runs = edges[1::2] - edges[::2]
+    runs = runs[runs >= 4]
+    if len(runs) < 3:
+        return None
+    return float(np.median(runs))
+
+
+def decode_image(buffer: np.ndarray) -> Tuple[np.ndarray, DecodeInfo]:
+    """
+    Decode an upload straight to greyscale within the pixel budget and scale
+    it so text lines are close to the height Tesseract recognises best
+    """
+    start = time.perf_counter()
+    max_pixels = settings.OCR_DECODE_MAX_PIXELS
+    size = read_image_size(buffer)
+
+    reduction = 1
+    if size and bytes(buffer[:3]) == JPEG_MAGIC:
+        reduction = choose_jpeg_reduction(size[0], size[1], max_pixels)
+
+    img = cv2.imdecode(buffer, REDUCED_GRAYSCALE_FLAGS.get(reduction, cv2.IMREAD_GRAYSCALE))
+    if img is None:
+        raise ValueError("Could not decode image")
+    if size is None:
+        size = (img.shape[1], img.shape[0])
+    return scale_for_ocr(img, size, reduction, start)
+
+
+def scale_for_ocr(img: np.ndarray, size: Tuple[int, int], reduction: int = 1,
+                  start: Optional[float] = None) -> Tuple[np.ndarray, DecodeInfo]:
+    """
+    Fit a decoded greyscale image into the pixel budget and scale it so text
+    lines are close to the target height. size is the source image size.
+    """
+    start = time.perf_counter() if start is None else start
+    max_pixels = settings.OCR_DECODE_MAX_PIXELS
+
+    # Fit the pixel budget
+    pixels = img.shape[0] * img.shape[1]
+    budget_scale = (max_pixels / pixels) ** 0.5
+    scale = min(1.0, budget_scale)
+
+    # Normalise text line height, never growing the image past the budget
+    text_scale = 1.0
+    target = settings.OCR_TARGET_LINE_HEIGHT
+    if target > 0:
+        line_height = estimate_line_height(img)
+        if line_height:
+            wanted = min(max(target / (line_height * scale), 0.25), 2.0, budget_scale / scale)
+            # Small differences are not worth a resize pass
+            if abs(wanted - 1.0) > 0.15:
+                text_scale = wanted
+    scale *= text_scale
+
+    if scale != 1.0:
+        # Area averaging is needed against aliasing below half size only, and
+        # at fractional ratios it costs several times a bilinear resize
+        if scale < 0.5:
+            interpolation = cv2.INTER_AREA
+        else:
+            interpolation = cv2.INTER_LINEAR if scale < 1.0 else cv2.INTER_CUBIC
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=interpolation)
+
+    info = DecodeInfo(
+        source_size=size,
+        decoded_size=(img.shape[1], img.shape[0]),
+        jpeg_reduction=reduction,
+        text_scale=round(text_scale, 3),
+        full_decode_bytes=size[0] * size[1] * 3,
+        decoded_bytes=img.nbytes,
+        decode_ms=round((time.perf_counter() - start) * 1000, 2),
+    )
+    return img, info
+
+
+def decode_thumbnail(buffer: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Cheapest possible greyscale decode, for fingerprints and quick checks
+    """
+    flag = cv2.IMREAD_REDUCED_GRAYSCALE_8 if bytes(buffer[:3]) == JPEG_MAGIC else cv2.IMREAD_GRAYSCALE
+    return cv2.imdecode(buffer, flag)
+
+
+def perceptual_hash(gray: np.ndarray, hash_size: int = 16) -> int:
+    """
+    Difference hash: one bit per horizontally adjacent pixel pair of a tiny
+    downscaled copy, so re-encoded or slightly resized copies of an image
+    end up a few bits apart
+    """
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
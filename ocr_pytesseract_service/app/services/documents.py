@@ -0,0 +1,75 @@
+import io
+import logging
+import threading
+from typing import Optional
+
+import numpy as np
+import pypdfium2 as pdfium
+from PIL import Image
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b"%PDF"
+TIFF_MAGICS = (b"II*\x00", b"MM\x00*")
+PDF_POINTS_PER_INCH = 72
+
+# pdfium is not thread safe; in "thread" execution mode pages of several
+# documents may be rendered at the same time
+_pdfium_lock = threading.Lock()
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised for documents with more pages than OCR_DOCUMENT_MAX_PAGES."""
+
+
+def detect_document_type(contents: bytes) -> Optional[str]:
+    """
+    "pdf" or "tiff" for paged documents, None for other (single raster) images
+    """
+    if contents[:4] == PDF_MAGIC:
+        return "pdf"
+    if contents[:4] in TIFF_MAGICS:
+        return "tiff"
+    return None
+
+
+def page_count(contents: bytes, kind: str) -> int:
+    if kind == "pdf":
+        with _pdfium_lock:
+            document = pdfium.PdfDocument(contents)
+            try:
+                return len(document)
+            finally:
+                document.close()
+    with Image.open(io.BytesIO(contents)) as image:
+        return getattr(image, "n_frames", 1)
+
+
+def render_page(contents: bytes, kind: str, index: int, dpi: int) -> np.ndarray:
+    """
+    Rasterise one page to greyscale. Only this page is decoded, so a worker
+    holds one page bitmap at a time however long the document is. PDF pages
+    are rendered at dpi or at the largest scale within OCR_DECODE_MAX_PIXELS.
+    TIFF pages are stored as rasters and keep their own resolution.
+    """
+    if kind == "pdf":
+        with _pdfium_lock:
+            document = pdfium.PdfDocument(contents)
+            try:
+                page = document[index]
+                width, height = page.get_size()
+                # A page can be 200 inches a side, never allocate past the pixel budget
+                scale = min(dpi / PDF_POINTS_PER_INCH, (settings.OCR_DECODE_MAX_PIXELS / (width * height)) ** 0.5)
+                bitmap = page.render(scale=scale, grayscale=True)
+                # Copy out of pdfium's buffer before the document is closed
+                gray = np.array(bitmap.to_numpy(), copy=True)
+                page.close()
+            finally:
+                document.close()
+        return gray if gray.ndim == 2 else gray[:, :, 0]
+
+    with Image.open(io.BytesIO(contents)) as image:
+        image.seek(index)
+        return np.asarray(image.convert("L"))
@@ -0,0 +1,90 @@
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# QR detection first runs on a copy at most this many pixels on a side, several
+# times faster than the full frame, which is only tried when that fails
+FIRST_PASS_SIZE = 1000
+# t= is YYYYMMDDTHHMM or YYYYMMDDTHHMMSS, told apart by length
+QR_TIME_FORMATS = {13: "%Y%m%dT%H%M", 15: "%Y%m%dT%H%M%S"}
+
+
+@dataclass
+class FiscalQR:
+    """
+    Fields of the QR code printed on Russian fiscal receipts, e.g.
+    t=20240312T1422&s=224.80&fn=9289000100123456&i=12345&fp=1234567890&n=1
+    """
+    date_time: datetime
+    total_amount: float
+    fn: Optional[str] = None
+    fd: Optional[str] = None
+    fp: Optional[str] = None
+    operation: Optional[str] = None
+
+    @property
+    def bill_date(self) -> str:
+        return self.date_time.strftime("%Y-%m-%d")
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["date_time"] = self.date_time.isoformat()
+        return data
+
+
+def parse_fiscal_qr(payload: str) -> Optional[FiscalQR]:
+    """
+    Parse a fiscal QR payload; None unless it has a valid date (t) and total (s)
+    """
+    fields = {key: values[0] for key, values in parse_qs(payload.strip()).items()}
+    if "t" not in fields or "s" not in fields:
+        return None
+
+    time_format = QR_TIME_FORMATS.get(len(fields["t"]))
+    if time_format is None:
+        return None
+    try:
+        date_time = datetime.strptime(fields["t"], time_format)
+        total_amount = float(fields["s"].replace(",", "."))
+    except ValueError:
+        return None
+
+    return FiscalQR(
+        date_time=date_time,
+        total_amount=total_amount,
+        fn=fields.get("fn"),
+        fd=fields.get("i"),
+        fp=fields.get("fp"),
+        operation=fields.get("n"),
+    )
+
+
+def decode_fiscal_qr(gray: np.ndarray) -> Optional[FiscalQR]:
+    """
+    Find and decode the fiscal QR code in a greyscale image
+    """
+    detector = cv2.QRCodeDetector()
+    candidates = [gray]
+    ratio = FIRST_PASS_SIZE / max(gray.shape[:2])
+    if ratio < 1.0:
+        candidates.insert(0, cv2.resize(gray, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA))
+
+    for candidate in candidates:
+        try:
+            payload, _, _ = detector.detectAndDecode(candidate)
+        except cv2.error as e:
+            logger.debug(f"QR detection failed: {str(e)}")
+            continue
+        if payload:
+            fiscal = parse_fiscal_qr(payload)
+            if fiscal is not None:
+                return fiscal
+            logger.debug(f"QR code is not a fiscal receipt code: {payload[:80]}")
+    return None
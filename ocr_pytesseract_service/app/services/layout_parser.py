@@ -0,0 +1,156 @@
+import re
+import statistics
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.tesseract_engine import OCRWord
+
+# Whole-word tokens, matched after stripping decoration such as "=" or "*"
+NUMBER_TOKEN = re.compile(r'\d+(?:[.,]\d+)?')
+PRICE_TOKEN = re.compile(r'\d+[.,]\d{2}')
+QUANTITY_TOKEN = re.compile(r'(\d+(?:[.,]\d+)?)[xхХ*]')
+MULTIPLY_TOKENS = {"x", "х", "Х", "*"}
+TOKEN_DECORATION = "=*:"
+
+# Rows that carry an amount in the price column but are not items
+SUMMARY_ROW = re.compile(
+    r'(Всего|Итог|К оплате|НДС|VAT|Скидка|Discount|Сдача|Наличн|Безнал|Карт)',
+    re.IGNORECASE
+)
+
+
+def _token(word: OCRWord) -> str:
+    return word.text.strip(TOKEN_DECORATION)
+
+
+def _to_float(number: str) -> float:
+    return float(number.replace(',', '.'))
+
+
+def group_rows(words: List[OCRWord]) -> List[List[OCRWord]]:
+    """
+    Group words into visual rows by vertical centre, each row sorted left to right.
+    Tesseract's own line numbers are not used because it splits widely spaced
+    columns of one receipt row into separate blocks.
+    """
+    tolerance = statistics.median(word.height for word in words) / 2
+    rows: List[List[OCRWord]] = []
+    centers: List[float] = []
+    for word in sorted(words, key=lambda w: w.center_y):
+        if rows and abs(word.center_y - centers[-1]) <= tolerance:
+            rows[-1].append(word)
+            centers[-1] = sum(w.center_y for w in rows[-1]) / len(rows[-1])
+        else:
+            rows.append([word])
+            centers.append(word.center_y)
+    return [sorted(row, key=lambda w: w.left) for row in rows]
+
+
+def cluster_columns(edges: List[int], tolerance: float) -> List[Tuple[int, int, int]]:
+    """
+    1-D clustering of x coordinates: (low, high, member count) per column
+    """
+    columns = []
+    for edge in sorted(edges):
+        if columns and edge - columns[-1][1] <= tolerance:
+            low, _, count = columns[-1]
+            columns[-1] = (low, edge, count + 1)
+        else:
+            columns.append((edge, edge, 1))
+    return columns
+
+
+def find_price_column(words: List[OCRWord]) -> Optional[Tuple[float, float]]:
+    """
+    Right-edge range of the total price column: receipts right-align prices,
+    so it is the rightmost well-populated cluster of price right edges
+    """
+    prices = [word for word in words if PRICE_TOKEN.fullmatch(_token(word))]
+    if len(prices) < 2:
+        return None
+    tolerance = statistics.median(word.height for word in prices)
+    columns = cluster_columns([word.right for word in prices], tolerance)
+    best_support = max(count for _, _, count in columns)
+    if best_support < 2:
+        return None
+    low, high, _ = max(
+        (column for column in columns if column[2] * 2 >= best_support),
+        key=lambda column: column[1]
+    )
+    return low - tolerance, high + tolerance
+
+
+def items_from_words(words: List[OCRWord]) -> List[Dict[str, Any]]:
+    """
+    Assemble receipt items row by row from word boxes in a single pass:
+    the price in the price column is the total, numbers to its left are
+    quantity and unit price, the words before them the description. A row
+    with a price but no description takes the text of the row above.
+    """
+    words = [word for word in words if word.conf >= 0 and word.text.strip()]
+    if not words:
+        return []
+    price_column = find_price_column(words)
+    if price_column is None:
+        return []
+
+    items = []
+    pending_description = None
+    for row in group_rows(words):
+        price_index = None
+        for index in range(len(row) - 1, -1, -1):
+            word = row[index]
+            if price_column[0] <= word.right <= price_column[1] and PRICE_TOKEN.fullmatch(_token(word)):
+                price_index = index
+                break
+
+        if price_index is None:
+            # Text-only row: possibly the name of an item priced on the next row
+            if not any(NUMBER_TOKEN.fullmatch(_token(word)) for word in row):
+                pending_description = " ".join(word.text for word in row)
+            continue
+
+        description_words, numbers, quantity = [], [], None
+        for word in row[:price_index]:
+            token = _token(word)
+            quantity_match = QUANTITY_TOKEN.fullmatch(token)
+            if quantity_match:
+                quantity = _to_float(quantity_match.group(1))
+            elif NUMBER_TOKEN.fullmatch(token):
+                numbers.append((token, word))
+            elif token in MULTIPLY_TOKENS:
+                # "2 x 45.90": the number before the sign is the quantity
+                if numbers and quantity is None:
+                    quantity = _to_float(numbers.pop()[0])
+            elif not numbers:
+                description_words.append(word.text)
+
+        description = " ".join(description_words) or pending_description
+        pending_description = None
+        if not description or SUMMARY_ROW.match(description):
+            continue
+
+        try:
+            total_price = _to_float(_token(row[price_index]))
+            unit_price = None
+            if quantity is None and numbers:
+                first = numbers[0][0]
+                # An integer before the price is a count, a decimal amount a unit price
+                if len(numbers) >= 2 or not PRICE_TOKEN.fullmatch(first):
+                    quantity = _to_float(first)
+                    numbers = numbers[1:]
+            if numbers:
+                unit_price = _to_float(numbers[0][0])
+            if quantity is None:
+                quantity = round(total_price / unit_price, 3) if unit_price else 1.0
+            if unit_price is None:
+                unit_price = total_price / quantity
+
+            items.append({
+                "description": description,
+                "quantity": quantity,
+                "unit_price": round(unit_price, 2),
+                "total_price": total_price
+            })
+        except (ValueError, ZeroDivisionError):
+            continue
+    return items
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.decode import JPEG_MAGIC, hamming_distance, perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+# Frames are checked on a greyscale copy of this width, so that sharpness
+# does not depend on the camera resolution
+CHECK_WIDTH = 480
+# Consecutive frames within this many bits of each other (of 256) show the same view
+STABLE_DISTANCE = 12
+# Frames of the same view in a row before the camera counts as held still
+STABLE_FRAMES = 2
+# A frame this close to the last OCRed one is only OCRed again when it is sharper
+DUPLICATE_DISTANCE = 8
+SHARPER_FACTOR = 1.5
+
+# Scalar receipt fields that firm up over several OCR results
+FIELDS = ("bill_date", "total_amount", "tax_amount", "discount_amount")
+# Read from the fiscal QR code, authoritative from the first time they are seen
+FISCAL_FIELDS = ("bill_date", "total_amount")
+
+
+def decode_frame(contents: bytes) -> Optional[np.ndarray]:
+    """
+    Greyscale copy of a camera frame at CHECK_WIDTH, JPEGs decoded at half size
+    """
+    buffer = np.frombuffer(contents, np.uint8)
+    flag = cv2.IMREAD_REDUCED_GRAYSCALE_2 if bytes(buffer[:3]) == JPEG_MAGIC else cv2.IMREAD_GRAYSCALE
+    gray = cv2.imdecode(buffer, flag)
+    if gray is None:
+        return None
+    ratio = CHECK_WIDTH / gray.shape[1]
+    interpolation = cv2.INTER_AREA if ratio < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(gray, None, fx=ratio, fy=ratio, interpolation=interpolation)
+
+
+def sharpness(gray: np.ndarray) -> float:
+    """
+    Variance of the Laplacian: high for crisp edges, low for motion blur and defocus
+    """
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+@dataclass
+class FrameCheck:
+    # "ocr", or why the frame is skipped: "undecodable", "blurry", "unstable", "duplicate"
+    status: str
+    sharpness: float = 0.0
+    phash: Optional[int] = None
+
+
+class FrameGate:
+    """
+    Decides per camera frame whether it is worth OCRing: sharp, taken while
+    the camera is held still, and not a repeat of the last OCRed view
+    """
+
+    def __init__(self, min_sharpness: float = settings.OCR_LIVE_MIN_SHARPNESS):
+        self.min_sharpness = min_sharpness
+        self.previous_hash: Optional[int] = None
+        self.stable_frames = 0
+        self.last_ocr: Optional[Tuple[int, float]] = None
+
+    def check(self, contents: bytes) -> FrameCheck:
+        gray = decode_frame(contents)
+        if gray is None:
+            return FrameCheck("undecodable")
+        score = round(sharpness(gray), 1)
+        phash = perceptual_hash(gray)
+
+        if score < self.min_sharpness:
+            # Blur is mostly motion: the view is not settled
+            self.previous_hash, self.stable_frames = phash, 0
+            return FrameCheck("blurry", score, phash)
+
+        same_view = self.previous_hash is not None and hamming_distance(phash, self.previous_hash) <= STABLE_DISTANCE
+        self.stable_frames = self.stable_frames + 1 if same_view else 1
+        self.previous_hash = phash
+        if self.stable_frames < STABLE_FRAMES:
+            return FrameCheck("unstable", score, phash)
+
+        if self.last_ocr is not None:
+            last_hash, last_score = self.last_ocr
+            if hamming_distance(phash, last_hash) <= DUPLICATE_DISTANCE and score < last_score * SHARPER_FACTOR:
+                return FrameCheck("duplicate", score, phash)
+
+        self.last_ocr = (phash, score)
+        return FrameCheck("ocr", score, phash)
+
+
+class ReceiptAccumulator:
+    """
+    Votes over the receipts parsed from successive frames. A value is firm
+    once `confirmations` results agree on it; fiscal QR values are firm at once.
+    """
+
+    def __init__(self, confirmations: int = settings.OCR_LIVE_CONFIRMATIONS):
+        self.confirmations = max(1, confirmations)
+        self.votes: Dict[str, Counter] = {field: Counter() for field in FIELDS}
+        self.firm: Dict[str, Any] = {}
+        # Items keyed by (description, total price), in order of first sighting
+        self.item_votes: Dict[Tuple[str, float], int] = {}
+        self.items: Dict[Tuple[str, float], Dict[str, Any]] = {}
+        self.fiscal: Optional[Dict[str, Any]] = None
+        self.results = 0
+
+    def add(self, receipt: Dict[str, Any]):
+        self.results += 1
+        if receipt.get("fiscal") and self.fiscal is None:
+            self.fiscal = receipt["fiscal"]
+            for field in FISCAL_FIELDS:
+                self.firm[field] = receipt[field]
+
+        for field in FIELDS:
+            value = receipt.get(field)
+            # None and 0.0 are what the parser returns for fields it did not find
+            if not value or (field in FISCAL_FIELDS and self.fiscal is not None):
+                continue
+            self.votes[field][value] += 1
+            if self.votes[field][value] >= self.confirmations:
+                self.firm[field] = self.votes[field].most_common(1)[0][0]
+
+        for item in receipt.get("items", []):
+            key = (item["description"], item["total_price"])
+            self.item_votes[key] = self.item_votes.get(key, 0) + 1
+            self.items.setdefault(key, item)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Firm fields and items, and the leading candidate of the fields still pending
+        """
+        return {
+            "firm": dict(self.firm),
+            "pending": {
+                field: votes.most_common(1)[0][0]
+                for field, votes in self.votes.items() if votes and field not in self.firm
+            },
+            "items": self.firm_items(),
+        }
+
+    def firm_items(self) -> List[Dict[str, Any]]:
+        return [self.items[key] for key, count in self.item_votes.items() if count >= self.confirmations]
+
+    def receipt(self) -> Dict[str, Any]:
+        """
+        Best receipt so far in parse_receipt_data's format: firm values, else the leading candidates
+        """
+        snapshot = self.snapshot()
+        items = snapshot["items"]
+        if not items and self.item_votes:
+            # Nothing confirmed: the items seen most often
+            most_seen = max(self.item_votes.values())
+            items = [self.items[key] for key, count in self.item_votes.items() if count == most_seen]
+        receipt = {
+            "is_receipt": False,
+            "bill_date": None,
+            "tax_amount": 0.00,
+            "discount_amount": 0.00,
+            "total_amount": 0.00,
+            "items": items,
+        }
+        receipt.update(snapshot["pending"])
+        receipt.update(snapshot["firm"])
+        receipt["is_receipt"] = bool(receipt["items"]) or receipt["total_amount"] > 0
+        if self.fiscal is not None:
+            receipt["fiscal"] = self.fiscal
+        return receipt
+
+
+class FrameMailbox:
+    """
+    Holds only the newest frame not yet taken. A frame arriving while another
+    one waits replaces it, so a slow OCR never builds up a queue of stale frames.
+    """
+
+    def __init__(self):
+        self._frame: Optional[Tuple[int, bytes]] = None
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, contents: bytes):
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = (self.received, contents)
+        self._ready.set()
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[Tuple[int, bytes]]:
+        """
+        (frame number, contents) of the newest frame, None once closed and drained
+        """
+        while self._frame is None:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        frame, self._frame = self._frame, None
+        return frame
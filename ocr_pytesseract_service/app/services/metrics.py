@@ -0,0 +1,78 @@
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Histogram
+
+# Own registry, so /metrics only exposes what this service records
+registry = CollectorRegistry(auto_describe=True)
+
+# OCR stages take from a millisecond (cache) to tens of seconds (long receipts)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Input size classes used as labels, upper bounds in megapixels and megabytes
+MEGAPIXEL_CLASSES = ((1, "<1MP"), (4, "1-4MP"), (12, "4-12MP"))
+MEGABYTE_CLASSES = ((0.25, "<256KB"), (1, "256KB-1MB"), (4, "1-4MB"))
+
+stage_duration = Histogram(
+    "ocr_stage_duration_seconds",
+    "Time spent in each stage of the receipt OCR pipeline",
+    ["stage", "pixels", "upload"],
+    buckets=STAGE_BUCKETS,
+    registry=registry,
+)
+upload_bytes = Histogram(
+    "ocr_upload_bytes",
+    "Size of uploaded receipt images",
+    buckets=(64e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6),
+    registry=registry,
+)
+image_megapixels = Histogram(
+    "ocr_image_megapixels",
+    "Resolution of uploaded receipt images before decode downscaling",
+    buckets=(0.5, 1, 2, 4, 8, 12, 16, 24, 48),
+    registry=registry,
+)
+receipts = Counter(
+    "ocr_receipts_total",
+    "Receipts processed, by how the result was produced (ocr, cache, qr, rejected)",
+    ["source"],
+    registry=registry,
+)
+
+
+def size_class(value: float, classes: Tuple[Tuple[float, str], ...], largest: str) -> str:
+    for bound, name in classes:
+        if value < bound:
+            return name
+    return largest
+
+
+def record_receipt(timings: Dict[str, float], contents_size: int,
+                   image_size: Optional[Tuple[int, int]] = None, source: str = "ocr"):
+    """
+    Observe per-stage durations (milliseconds, as collected by the pipeline).
+    Stage histograms are labelled with coarse input size classes; the exact
+    dimensions and byte size are attached as exemplars.
+    """
+    megapixels = image_size[0] * image_size[1] / 1e6 if image_size else None
+    labels = {
+        "pixels": size_class(megapixels, MEGAPIXEL_CLASSES, ">12MP") if megapixels is not None else "unknown",
+        "upload": size_class(contents_size / 1e6, MEGABYTE_CLASSES, ">4MB"),
+    }
+    exemplar = {"bytes": str(contents_size)}
+    if image_size:
+        exemplar.update(width=str(image_size[0]), height=str(image_size[1]))
+
+    for stage, ms in timings.items():
+        stage_duration.labels(stage=stage, **labels).observe(ms / 1000, exemplar=exemplar)
+
+    receipts.labels(source=source).inc()
+    upload_bytes.observe(contents_size)
+    if megapixels is not None:
+        image_megapixels.observe(megapixels)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """
+    Server-Timing header value, e.g. "decode;dur=12.5, ocr;dur=840.1"
+    """
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
@@ -0,0 +1,135 @@
+import copy
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.decode import hamming_distance
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    expires_at: float
+    value: Dict[str, Any]
+    fingerprint: str
+    phash: Optional[int] = None
+
+
+class ReceiptCache:
+    """
+    Cache of parsed receipts keyed by a hash of the upload bytes and the OCR config.
+
+    Lookups go through an in-process LRU first, then an optional Redis layer
+    shared between workers. With near-duplicate matching enabled, an exact
+    miss can still hit an in-process entry whose perceptual hash is within
+    a few bits of the upload's.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: int,
+        redis_url: Optional[str] = None,
+        near_duplicate_distance: Optional[int] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.near_duplicate_distance = near_duplicate_distance
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._redis = None
+        if redis_url:
+            from redis import asyncio as aioredis
+            self._redis = aioredis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+        self.counters = {"hits": 0, "near_hits": 0, "redis_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(contents: bytes, fingerprint: str) -> str:
+        digest = hashlib.sha256(fingerprint.encode())
+        digest.update(b"\0")
+        digest.update(contents)
+        return digest.hexdigest()
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        self.counters["evictions"] += len(expired)
+
+    def _find_near_duplicate(self, fingerprint: str, phash: int) -> Optional[Tuple[str, CacheEntry]]:
+        best = None
+        for key, entry in self._entries.items():
+            if entry.phash is None or entry.fingerprint != fingerprint:
+                continue
+            distance = hamming_distance(phash, entry.phash)
+            if distance <= self.near_duplicate_distance and (best is None or distance < best[0]):
+                best = (distance, key, entry)
+        return best[1:] if best else None
+
+    async def get(self, key: str, fingerprint: str, phash: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return copy.deepcopy(entry.value)
+
+        if self._redis is not None:
+            try:
+                cached = await self._redis.get(f"ocr:receipt:{key}")
+            except Exception as e:
+                logger.error(f"Redis cache lookup failed: {str(e)}")
+                cached = None
+            if cached:
+                value = json.loads(cached)
+                self._store(key, value, fingerprint, phash, now)
+                self.counters["redis_hits"] += 1
+                return value
+
+        if phash is not None and self.near_duplicate_distance is not None:
+            match = self._find_near_duplicate(fingerprint, phash)
+            if match:
+                near_key, near_entry = match
+                self._entries.move_to_end(near_key)
+                self.counters["near_hits"] += 1
+                return copy.deepcopy(near_entry.value)
+
+        self.counters["misses"] += 1
+        return None
+
+    def _store(self, key: str, value: Dict[str, Any], fingerprint: str, phash: Optional[int], now: float):
+        self._entries[key] = CacheEntry(now + self.ttl_seconds, copy.deepcopy(value), fingerprint, phash)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    async def set(self, key: str, value: Dict[str, Any], fingerprint: str, phash: Optional[int] = None):
+        self._store(key, value, fingerprint, phash, time.monotonic())
+        if self._redis is not None:
+            try:
+                await self._redis.setex(
+                    f"ocr:receipt:{key}",
+                    self.ttl_seconds,
+                    json.dumps(value, ensure_ascii=False)
+                )
+            except Exception as e:
+                logger.error(f"Redis cache store failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "redis": self._redis is not None, **self.counters}
+
+
+receipt_cache = ReceiptCache(
+    max_entries=settings.OCR_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.OCR_CACHE_TTL_SECONDS,
+    redis_url=settings.OCR_CACHE_REDIS_URL,
+    near_duplicate_distance=settings.OCR_CACHE_PHASH_DISTANCE if settings.OCR_CACHE_NEAR_DUPLICATES else None,
+) if settings.OCR_CACHE_ENABLED else None
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import multiprocessing
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import tesseract_engine
+
+logger = logging.getLogger(__name__)
+
+# (shared memory name, array shape, numpy dtype string)
+SharedArrayDescriptor = Tuple[str, Tuple[int, ...], str]
+
+
+class OCRQueueFullError(RuntimeError):
+    """Raised when the OCR executor cannot accept more jobs."""
+
+
+class SharedArray:
+    """
+    Copy of a numpy array placed in a shared memory block so that pool
+    workers can map it by name instead of receiving a pickled copy
+    """
+
+    def __init__(self, array: np.ndarray):
+        array = np.ascontiguousarray(array)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf)
+        view[...] = array
+        del view
+        self.descriptor: SharedArrayDescriptor = (self._shm.name, array.shape, array.dtype.str)
+
+    def release(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def call_with_shared_array(descriptor: SharedArrayDescriptor, func: Callable, *args) -> Any:
+    """
+    Attach to a shared array inside a worker and call func(array, *args)
+    """
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    try:
+        return func(array, *args)
+    except BaseException as e:
+        # Frames in the traceback still reference the shared buffer,
+        # which would make closing the mapping fail
+        traceback.clear_frames(e.__traceback__)
+        raise
+    finally:
+        del array
+        shm.close()
+
+
+class OCRExecutor:
+    """
+    Bounded executor for the CPU-bound part of the OCR pipeline.
+
+    In "process" mode jobs run in a process pool and image buffers are handed
+    over through shared memory; in "thread" mode they run in the event loop's
+    default thread pool. At most workers + queue_size jobs are accepted at a
+    time, further jobs fail fast with OCRQueueFullError.
+
+    Requests made of several jobs (document pages) are admitted once with
+    admit(); their jobs are then submitted with wait=True and queue for a
+    slot instead of failing. Waiting jobs get freed slots before new ones.
+    """
+
+    def __init__(self, mode: str, workers: int, queue_size: int, initializer: Optional[Callable] = None):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unsupported OCR execution mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.initializer = initializer
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        # Jobs submitted with wait=True while every slot was taken, oldest first
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    def start(self):
+        if self.mode == "process" and self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+            )
+            logger.info(f"Started OCR process pool with {self.workers} workers")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            logger.info("OCR process pool stopped")
+
+    def admit(self):
+        """
+        Fail fast, like a single job, for a request whose jobs will wait for slots
+        """
+        if self._pending >= self.capacity:
+            raise OCRQueueFullError(
+                f"OCR queue is full ({self._pending} jobs in progress), try again later"
+            )
+
+    def _acquire(self):
+        self.admit()
+        self._pending += 1
+
+    async def _acquire_waiting(self):
+        if self._pending < self.capacity:
+            self._pending += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Cancelled right after a slot was handed over, pass it on
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def _release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot goes straight to the oldest waiting job
+                waiter.set_result(None)
+                return
+        self._pending -= 1
+
+    async def _submit(self, func: Callable, *args) -> Any:
+        self.start()
+        pool = self._pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM kill); drop the pool so the next job gets a fresh one.
+            # Other jobs on the same pool fail too, only the first one replaces it.
+            if self._pool is pool:
+                logger.error("OCR process pool is broken, it will be recreated")
+                self._pool = None
+                # Stops its management thread and releases its queues without waiting for dead workers
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def run(self, func: Callable, *args, wait: bool = False) -> Any:
+        """
+        Run func(*args) on the executor, arguments are pickled in process mode.
+        With wait the job queues for a slot instead of failing when all are taken.
+        """
+        if wait:
+            await self._acquire_waiting()
+        else:
+            self._acquire()
+        try:
+            if self.mode == "thread":
+                return await asyncio.to_thread(func, *args)
+            return await self._submit(func, *args)
+        finally:
+            self._release()
+
+    async def run_with_buffer(self, func: Callable, data, *args, wait: bool = False) -> Any:
+        """
+        Run func(array, *args) on the executor where array is data as a numpy
+        array; in process mode it is passed through shared memory
+        """
+        array = data if isinstance(data, np.ndarray) else np.frombuffer(data, np.uint8)
+        if self.mode == "thread":
+            return await self.run(func, array, *args, wait=wait)
+
+        if wait:
+            await self._acquire_waiting()
+        else:
+            self._acquire()
+        try:
+            with SharedArray(array) as shared:
+                return await self._submit(call_with_shared_array, shared.descriptor, func, *args)
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_progress": self._pending,
+            "waiting": sum(not waiter.done() for waiter in self._waiters),
+        }
+
+
+ocr_executor = OCRExecutor(
+    mode=settings.OCR_EXECUTION_MODE,
+    workers=settings.OCR_POOL_WORKERS,
+    queue_size=settings.OCR_POOL_QUEUE_SIZE,
+    initializer=tesseract_engine.warm_up,
+)
@@ -6,277 +6,418 @@ import re
 from PIL import Image
 from fastapi import UploadFile
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator, Dict, List, Any, Optional
 from app.core.config import settings
+from app.services.ocr_pool import ocr_executor
+from app.services import tesseract_engine
+from app.services.decode import DecodeInfo, decode_image, decode_thumbnail, perceptual_hash, scale_for_ocr
+from app.services.documents import DocumentTooLargeError, detect_document_type, page_count, render_page
+from app.services.ocr_cache import receipt_cache
+from app.services.fiscal_qr import FiscalQR, decode_fiscal_qr
+from app.services.metrics import record_receipt
+from app.services.ocr_tiers import get_tier
+from app.services.preprocessing import run_pipeline, resolve_spec
+from app.services.receipt_classifier import classify_upload
+from app.services.receipt_region import RegionInfo
+from app.services.price_reocr import reocr_price_column
+from app.services.strip_ocr import STRIP_BLOCK_OFFSET, find_strip_bounds, ocr_strips
+from app.services.receipt_parser import parse_receipt_data
+from app.services.tesseract_engine import OCRWord, text_from_words
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-# Configure pytesseract path
-pytesseract.pytesseract.tesseract_cmd = settings.PYTESSERACT_PATH
-
 async def extract_text_from_image(image: UploadFile) -> str:
     """
     Extract text from an image using pytesseract
     """
+    # Read the image file
+    contents = await image.read()
+    return await extract_text_from_bytes(contents)
+
+async def process_receipt_bytes(
+    contents: bytes,
+    timings: Optional[Dict[str, float]] = None,
+    header_only: bool = False,
+    tier: Optional[str] = None,
+    dpi: Optional[int] = None,
+    preprocessing: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    OCR and parse an uploaded receipt, reusing the cached result for uploads seen before.
+    Milliseconds spent per stage are added to `timings` when given and recorded as metrics.
+    With header_only, date and total come from the fiscal QR code without OCR when
+    the receipt has one; items are then left empty. tier selects a speed/accuracy
+    profile from OCR_TIERS, the configured default when omitted. PDF and TIFF
+    documents are OCRed page by page, PDFs rasterised at dpi. preprocessing
+    overrides the preprocessing pipeline (a spec or preset name) of the tier.
+    """
+    timings = {} if timings is None else timings
+    profile = get_tier(tier)
+    tier = profile.name
+    preprocessing = resolve_spec(preprocessing, profile.preprocessing)
+
+    kind = detect_document_type(contents)
+    if kind is not None:
+        # PDFs and TIFFs: the last item of the document stream is the whole receipt
+        async for line in iter_document_results(contents, kind, timings, tier, dpi, preprocessing):
+            receipt_data = line.get("result")
+        return receipt_data
+
+    key = fingerprint = phash = None
+    if receipt_cache is not None:
+        start = time.perf_counter()
+        fingerprint = f"{ocr_config_fingerprint()}|{tier}|{preprocessing}" + ("|header" if header_only else "")
+        key = receipt_cache.make_key(contents, fingerprint)
+        if receipt_cache.near_duplicate_distance is not None:
+            phash = await asyncio.to_thread(upload_perceptual_hash, contents)
+
+        cached = await receipt_cache.get(key, fingerprint, phash)
+        timings["cache"] = _elapsed_ms(start)
+        if cached is not None:
+            logger.info(f"Receipt cache hit for {key[:12]}")
+            record_receipt(timings, len(contents), source="cache")
+            return cached
+
+    receipt_data = None
+    detect_qr = settings.OCR_FISCAL_QR
+    # A fiscal QR code found before OCR, which then does not look for it again
+    fiscal = None
+
+    # Header-only requests may be close-ups of the QR code, which has no text lines
+    if settings.OCR_PRECLASSIFY and not header_only:
+        start = time.perf_counter()
+        classification = await asyncio.to_thread(classify_upload, contents)
+        timings["classify"] = _elapsed_ms(start)
+        if classification is not None and not classification.is_receipt_like and detect_qr:
+            # A receipt photographed for its QR code has few text lines; only
+            # uploads about to be rejected pay for this check
+            header = await ocr_executor.run_with_buffer(fiscal_qr_buffer, contents)
+            timings["qr"] = header.timings["qr"]
+            fiscal = header.fiscal
+            if fiscal is not None:
+                logger.info(f"Upload kept for OCR despite {classification.reason}: it has a fiscal QR code")
+                detect_qr = False
+        if classification is not None and not classification.is_receipt_like and fiscal is None:
+            logger.info(f"Upload rejected without OCR: {classification.reason}")
+            receipt_data = parse_receipt_data("")
+            record_receipt(timings, len(contents), source="rejected")
+
+    if receipt_data is None and header_only and detect_qr:
+        header = await ocr_executor.run_with_buffer(fiscal_qr_buffer, contents)
+        timings.update(header.timings)
+        if header.fiscal is not None:
+            receipt_data = apply_fiscal_qr(parse_receipt_data(""), header.fiscal)
+            record_receipt(timings, len(contents), image_size=header.decode.source_size, source="qr")
+        else:
+            # No readable QR code: the header fields have to come from the text
+            logger.info("No fiscal QR code found, running full OCR for header fields")
+            detect_qr = False
+
+    if receipt_data is None:
+        result = await run_ocr_pipeline(contents, detect_qr, tier, preprocessing)
+        timings.update(result.timings)
+
+        start = time.perf_counter()
+        receipt_data = parse_receipt_data(result.text, words=result.words)
+        fiscal = result.fiscal or fiscal
+        if fiscal is not None:
+            receipt_data = apply_fiscal_qr(receipt_data, fiscal)
+        timings["parse"] = _elapsed_ms(start)
+        record_receipt(timings, len(contents), image_size=result.decode.source_size)
+
+    if receipt_cache is not None:
+        await receipt_cache.set(key, receipt_data, fingerprint, phash)
+    return receipt_data
+
+async def iter_document_results(
+    contents: bytes,
+    kind: str,
+    timings: Optional[Dict[str, float]] = None,
+    tier: Optional[str] = None,
+    dpi: Optional[int] = None,
+    preprocessing: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    OCR the pages of a PDF or TIFF document in parallel. Yields {"page", "result"}
+    for every page as soon as it is done, then {"result"} with the text of all
+    pages, in page order, parsed as one receipt. Pages are rasterised one by one
+    in the workers and only their text is kept here.
+    """
+    timings = {} if timings is None else timings
+    profile = get_tier(tier)
+    tier = profile.name
+    preprocessing = resolve_spec(preprocessing, profile.preprocessing)
+    dpi = dpi or settings.OCR_DOCUMENT_DPI
+    document_start = time.perf_counter()
+
+    key = fingerprint = None
+    if receipt_cache is not None:
+        start = time.perf_counter()
+        fingerprint = f"{ocr_config_fingerprint()}|{tier}|{preprocessing}|{kind}@{dpi}"
+        key = receipt_cache.make_key(contents, fingerprint)
+        cached = await receipt_cache.get(key, fingerprint)
+        timings["cache"] = _elapsed_ms(start)
+        if cached is not None:
+            logger.info(f"Receipt cache hit for {key[:12]}")
+            record_receipt(timings, len(contents), source="cache")
+            yield {"result": cached}
+            return
+
+    pages = await asyncio.to_thread(page_count, contents, kind)
+    if pages > settings.OCR_DOCUMENT_MAX_PAGES:
+        raise DocumentTooLargeError(f"Document has {pages} pages (max {settings.OCR_DOCUMENT_MAX_PAGES})")
+
+    # The document is admitted or rejected as a whole, its pages then queue for workers.
+    # No more pages in flight than workers, so the queue slots stay free for other requests.
+    ocr_executor.admit()
+    semaphore = asyncio.Semaphore(max(1, min(settings.OCR_DOCUMENT_CONCURRENCY, ocr_executor.workers)))
+
+    async def ocr_page(index: int):
+        async with semaphore:
+            return index, await ocr_executor.run_with_buffer(
+                ocr_document_page, contents, kind, index, dpi, settings.OCR_FISCAL_QR, tier, preprocessing, wait=True
+            )
+
+    tasks = [asyncio.create_task(ocr_page(index)) for index in range(pages)]
+    page_results: Dict[int, OCRResult] = {}
     try:
-        # Read the image file
-        contents = await image.read()
-        image_array = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-        
-        # Preprocess the image
-        img = preprocess_image(img)
-        
-        # Extract text using pytesseract with Russian language
-        text = pytesseract.image_to_string(img, lang='rus')
-        
-        logger.debug(f"Extracted text: {text}")
-        return text
-    
+        for next_page in asyncio.as_completed(tasks):
+            index, result = await next_page
+            # Summed over pages: CPU time per stage rather than wall time
+            for stage, ms in result.timings.items():
+                timings[stage] = round(timings.get(stage, 0.0) + ms, 2)
+            page_results[index] = result
+            yield {"page": index, "result": parse_receipt_data(result.text, words=result.words)}
+    finally:
+        # Client went away or a page failed: stop the remaining pages
+        for task in tasks:
+            task.cancel()
+
+    start = time.perf_counter()
+    ordered = [page_results[index] for index in range(pages)]
+    words = None
+    if all(result.words is not None for result in ordered):
+        words, offset = [], 0
+        for index, result in enumerate(ordered):
+            # Pages stacked top to bottom, block numbers kept apart per page
+            words.extend(
+                replace(word, top=word.top + offset, block=word.block + index * STRIP_BLOCK_OFFSET)
+                for word in result.words
+            )
+            offset += result.decode.decoded_size[1]
+    receipt_data = parse_receipt_data("\n".join(result.text for result in ordered), words=words)
+    fiscal = next((result.fiscal for result in ordered if result.fiscal is not None), None)
+    if fiscal is not None:
+        receipt_data = apply_fiscal_qr(receipt_data, fiscal)
+    receipt_data["pages"] = pages
+    timings["parse"] = _elapsed_ms(start)
+    timings["document"] = _elapsed_ms(document_start)
+    record_receipt(timings, len(contents), image_size=ordered[0].decode.source_size if ordered else None)
+
+    if receipt_cache is not None:
+        await receipt_cache.set(key, receipt_data, fingerprint)
+    yield {"result": receipt_data}
+
+def apply_fiscal_qr(receipt_data: Dict[str, Any], fiscal: FiscalQR) -> Dict[str, Any]:
+    """
+    The QR code is authoritative for date and total, OCR can only misread them
+    """
+    receipt_data["bill_date"] = fiscal.bill_date
+    receipt_data["total_amount"] = fiscal.total_amount
+    receipt_data["is_receipt"] = True
+    receipt_data["fiscal"] = fiscal.as_dict()
+    return receipt_data
+
+def ocr_config_fingerprint() -> str:
+    """
+    Settings that change the OCR output, part of every cache key
+    """
+    return "|".join(str(value) for value in (
+        settings.OCR_LANG,
+        settings.OCR_DECODE_MAX_PIXELS,
+        settings.OCR_TARGET_LINE_HEIGHT,
+        settings.OCR_RECEIPT_CROP,
+        settings.OCR_STRIP_HEIGHT,
+        settings.OCR_ITEM_EXTRACTION,
+        settings.OCR_RECEIPT_TEMPLATES,
+        settings.OCR_RECEIPT_TEMPLATES_PATH,
+        settings.OCR_PRICE_REOCR,
+        settings.OCR_PRICE_REOCR_CONFIDENCE,
+        settings.OCR_FISCAL_QR,
+        settings.OCR_PRECLASSIFY,
+    ))
+
+def upload_perceptual_hash(contents: bytes) -> Optional[int]:
+    thumbnail = decode_thumbnail(np.frombuffer(contents, np.uint8))
+    return perceptual_hash(thumbnail) if thumbnail is not None else None
+
+async def extract_text_from_bytes(contents: bytes) -> str:
+    """
+    Extract text from the raw bytes of an uploaded image
+    """
+    result = await run_ocr_pipeline(contents)
+    return result.text
+
+async def run_ocr_pipeline(contents: bytes, detect_qr: bool = False, tier: Optional[str] = None,
+                           preprocessing: Optional[str] = None) -> "OCRResult":
+    """
+    Decode, preprocess and OCR an upload, returning the text and, in layout mode, the word boxes
+    """
+    try:
+        # Decode, preprocess and OCR off the event loop
+        result = await ocr_executor.run_with_buffer(ocr_image_buffer, contents, detect_qr, tier, preprocessing)
+
+        decode = result.decode
+        logger.info(
+            f"Decoded {decode.source_size[0]}x{decode.source_size[1]} upload to "
+            f"{decode.decoded_size[0]}x{decode.decoded_size[1]} grey in {decode.decode_ms} ms "
+            f"(jpeg reduction {decode.jpeg_reduction}, text scale {decode.text_scale}, "
+            f"{decode.bytes_saved / 2**20:.1f} MB less than a full colour decode, "
+            f"{decode.pixel_ratio:.0%} of the pixels left for OCR)"
+        )
+        if result.region is not None:
+            region = result.region
+            logger.info(
+                f"Receipt region {'found' if region.found else 'not found'}: "
+                f"{region.input_size[0]}x{region.input_size[1]} -> "
+                f"{region.output_size[0]}x{region.output_size[1]}, skew {region.skew_degrees} deg"
+            )
+        if result.skipped:
+            logger.info(f"Preprocessing stages with nothing to do: {', '.join(result.skipped)}")
+        if result.strips > 1:
+            logger.info(f"OCRed {decode.decoded_size[1]} px tall image as {result.strips} parallel strips")
+        logger.debug("OCR stage timings: " + ", ".join(f"{stage} {ms} ms" for stage, ms in result.timings.items()))
+        logger.debug(f"Extracted text: {result.text}")
+        return result
+
     except Exception as e:
         logger.error(f"Error extracting text from image: {str(e)}")
         raise
 
-def preprocess_image(img):
+@dataclass
+class OCRResult:
+    """Output of the OCR pipeline for one image, returned from the executor"""
+    text: str
+    decode: DecodeInfo
+    # Word boxes, only collected when OCR_ITEM_EXTRACTION is "layout"
+    words: Optional[List[OCRWord]] = None
+    region: Optional[RegionInfo] = None
+    strips: int = 1
+    fiscal: Optional[FiscalQR] = None
+    # Preprocessing stages that ran without changing the image
+    skipped: List[str] = field(default_factory=list)
+    # Milliseconds spent in each stage, in pipeline order
+    timings: Dict[str, float] = field(default_factory=dict)
+
+@dataclass
+class HeaderResult:
+    """Output of the fiscal QR fast path"""
+    fiscal: Optional[FiscalQR]
+    decode: DecodeInfo
+    timings: Dict[str, float] = field(default_factory=dict)
+
+def fiscal_qr_buffer(image_array: np.ndarray) -> HeaderResult:
     """
-    Preprocess the image to improve OCR accuracy
+    Decode an encoded image buffer and read its fiscal QR code, without OCR.
+    Runs inside the OCR executor.
     """
-    # Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
-    # Apply thresholding
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-    
-    # Noise removal
-    kernel = np.ones((1, 1), np.uint8)
-    opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
-    
-    return opening
-
-def parse_receipt_data(text: str) -> Dict[str, Any]:
+    img, decode_info = decode_image(image_array)
+    start = time.perf_counter()
+    fiscal = decode_fiscal_qr(img)
+    return HeaderResult(fiscal=fiscal, decode=decode_info, timings={"decode": decode_info.decode_ms, "qr": _elapsed_ms(start)})
+
+def ocr_image_buffer(image_array: np.ndarray, detect_qr: bool = False, tier: Optional[str] = None,
+                     preprocessing: Optional[str] = None) -> OCRResult:
     """
-    Parse the extracted text to get receipt information
+    Decode an encoded image buffer, preprocess it and run OCR on it.
+    Runs inside the OCR executor, so it must stay a module level function.
     """
-    result = {
-        "is_receipt": False,
-        "bill_date": None,
-        "tax_amount": 0.00,
-        "discount_amount": 0.00,
-        "total_amount": 0.00,
-        "items": []
-    }
-    
-    # Check if it's a valid receipt by looking for key elements
-    if not text or len(text) < 10:
-        return result
-    
-    lines = text.split('\n')
-    clean_lines = [line.strip() for line in lines if line.strip()]
-    
-    # Extract date
-    date_pattern = r'(\d{2}[./-]\d{2}[./-]\d{4})'
-    date_matches = re.findall(date_pattern, text)
-    if date_matches:
-        # Convert date to YYYY-MM-DD format
-        try:
-            date_str = date_matches[0]
-            # Handle different date formats (DD.MM.YYYY, DD/MM/YYYY)
-            if '.' in date_str:
-                day, month, year = date_str.split('.')
-            elif '/' in date_str:
-                day, month, year = date_str.split('/')
-            elif '-' in date_str:
-                day, month, year = date_str.split('-')
-            
-            result["bill_date"] = f"{year}-{month}-{day}"
-        except Exception as e:
-            logger.error(f"Error parsing date: {str(e)}")
-    
-    # Extract total amount
-    total_patterns = [
-        r'Всего:?\s*(\d+[.,]\d+)',
-        r'Итого к оплате:?\s*(\d+[.,]\d+)',
-        r'К оплате:?\s*(\d+[.,]\d+)',
-        r'ИТОГО:?\s*(\d+[.,]\d+)'
-    ]
-    
-    for pattern in total_patterns:
-        total_matches = re.findall(pattern, text, re.IGNORECASE)
-        if total_matches:
-            try:
-                total_amount = float(total_matches[0].replace(',', '.'))
-                result["total_amount"] = total_amount
-                break
-            except ValueError:
-                continue
-    
-    # Extract tax amount if available
-    tax_patterns = [
-        r'НДС:?\s*(\d+[.,]\d+)',
-        r'VAT:?\s*(\d+[.,]\d+)'
-    ]
-    
-    for pattern in tax_patterns:
-        tax_matches = re.findall(pattern, text, re.IGNORECASE)
-        if tax_matches:
-            try:
-                tax_amount = float(tax_matches[0].replace(',', '.'))
-                result["tax_amount"] = tax_amount
-                break
-            except ValueError:
-                continue
-    
-    # Extract discount amount if available
-    discount_patterns = [
-        r'Скидка:?\s*(\d+[.,]\d+)',
-        r'Discount:?\s*(\d+[.,]\d+)'
-    ]
-    
-    for pattern in discount_patterns:
-        discount_matches = re.findall(pattern, text, re.IGNORECASE)
-        if discount_matches:
-            try:
-                discount_amount = float(discount_matches[0].replace(',', '.'))
-                result["discount_amount"] = discount_amount
-                break
-            except ValueError:
-                continue
-    
-    # Extract items
-    current_item = None
-    items = []
-    
-    # Regular expression patterns for item extraction
-    item_pattern = r'([А-Яа-яA-Za-z\s\./\-]+)\s+(\d+[.,]?\d*)\s+(\d+[.,]?\d*)'
-    price_pattern = r'(\d+[.,]\d+)'
-    
-    # Extract items from receipt text
-    for i, line in enumerate(clean_lines):
-        # Skip header lines
-        if i < 5:
-            continue
-        
-        # Try to match item pattern
-        item_matches = re.search(item_pattern, line)
-        if item_matches:
-            item_name = item_matches.group(1).strip()
-            try:
-                quantity = float(item_matches.group(2).replace(',', '.'))
-                total_price = float(item_matches.group(3).replace(',', '.'))
-                unit_price = total_price / quantity if quantity else 0
-                
-                items.append({
-                    "description": item_name,
-                    "quantity": quantity,
-                    "unit_price": round(unit_price, 2),
-                    "total_price": total_price
-                })
-            except (ValueError, ZeroDivisionError):
-                continue
-        
-        # Alternative approach: Look for lines with price pattern and check previous lines for item name
-        elif re.search(price_pattern, line) and i > 0:
-            price_matches = re.findall(price_pattern, line)
-            if len(price_matches) >= 2:
-                try:
-                    # If we find at least two prices, assume they are unit price and total price
-                    unit_price = float(price_matches[0].replace(',', '.'))
-                    total_price = float(price_matches[1].replace(',', '.'))
-                    
-                    # Estimate quantity based on unit and total price
-                    quantity = round(total_price / unit_price, 2) if unit_price else 1
-                    
-                    # Check previous line for potential item name
-                    prev_line = clean_lines[i-1].strip()
-                    if not re.search(price_pattern, prev_line):
-                        items.append({
-                            "description": prev_line,
-                            "quantity": quantity,
-                            "unit_price": unit_price,
-                            "total_price": total_price
-                        })
-                except (ValueError, ZeroDivisionError, IndexError):
-                    continue
-    
-    # Special case: Try to extract items using column-based approach
-    # This works when receipt items are organized in columns
-    if not items:
-        # Look for patterns where items, quantities, and prices are in separate columns
-        for i in range(len(clean_lines) - 2):
-            line = clean_lines[i]
-            if not re.search(price_pattern, line):
-                # This might be an item description
-                next_line = clean_lines[i+1]
-                # Check if next line contains numbers that could be quantity/price
-                if re.search(r'\d+[.,]?\d*', next_line):
-                    try:
-                        numbers = re.findall(r'\d+[.,]?\d*', next_line)
-                        if len(numbers) >= 2:
-                            quantity = float(numbers[0].replace(',', '.'))
-                            total_price = float(numbers[-1].replace(',', '.'))
-                            unit_price = total_price / quantity if quantity else 0
-                            
-                            items.append({
-                                "description": line.strip(),
-                                "quantity": quantity,
-                                "unit_price": round(unit_price, 2),
-                                "total_price": total_price
-                            })
-                    except (ValueError, ZeroDivisionError):
-                        continue
-    
-    # Second approach - try to find items by finding price column position and working backwards
-    if not items:
-        # Find the position of price columns
-        price_positions = []
-        for line in clean_lines:
-            price_matches = re.finditer(r'\d+[.,]\d+', line)
-            for match in price_matches:
-                price_positions.append(match.start())
-        
-        # If we have consistent price positions, use them to extract items
-        if price_positions:
-            avg_price_pos = sum(price_positions) // len(price_positions)
-            
-            for line in clean_lines:
-                if len(line) > avg_price_pos:
-                    # Split line at average price position
-                    item_part = line[:avg_price_pos].strip()
-                    price_part = line[avg_price_pos:].strip()
-                    
-                    if item_part and price_part:
-                        price_matches = re.findall(price_pattern, price_part)
-                        if price_matches:
-                            try:
-                                total_price = float(price_matches[0].replace(',', '.'))
-                                # Default quantity to 1 if not specified
-                                quantity = 1.0
-                                
-                                # Try to extract quantity from item part
-                                qty_match = re.search(r'(\d+[.,]?\d*)\s*[xхХ]', item_part)
-                                if qty_match:
-                                    quantity = float(qty_match.group(1).replace(',', '.'))
-                                    # Remove quantity from item description
-                                    item_part = re.sub(r'\d+[.,]?\d*\s*[xхХ]', '', item_part).strip()
-                                
-                                unit_price = total_price / quantity
-                                
-                                items.append({
-                                    "description": item_part,
-                                    "quantity": quantity,
-                                    "unit_price": round(unit_price, 2),
-                                    "total_price": total_price
-                                })
-                            except (ValueError, ZeroDivisionError):
-                                continue
-    
-    # If we found items and at least one has a positive price and quantity,
-    # or total amount is positive, mark as a valid receipt
-    if items and any(item["quantity"] > 0 and item["total_price"] > 0 for item in items):
-        result["is_receipt"] = True
-    elif result["total_amount"] > 0:
-        result["is_receipt"] = True
-    
-    result["items"] = items
-    return result
\ No newline at end of file
+    img, decode_info = decode_image(image_array)
+    return ocr_decoded_image(img, decode_info, detect_qr, tier, preprocessing)
+
+def ocr_document_page(document: np.ndarray, kind: str, index: int, dpi: int,
+                      detect_qr: bool = False, tier: Optional[str] = None,
+                      preprocessing: Optional[str] = None) -> OCRResult:
+    """
+    Rasterise one page of a PDF or TIFF document and run OCR on it.
+    Runs inside the OCR executor; the worker only ever holds this page's bitmap.
+    """
+    start = time.perf_counter()
+    page = render_page(document.tobytes(), kind, index, dpi)
+    img, decode_info = scale_for_ocr(page, (page.shape[1], page.shape[0]), start=start)
+    del page
+    return ocr_decoded_image(img, decode_info, detect_qr, tier, preprocessing)
+
+def ocr_decoded_image(img: np.ndarray, decode_info: DecodeInfo, detect_qr: bool = False,
+                      tier: Optional[str] = None, preprocessing: Optional[str] = None) -> OCRResult:
+    """
+    Everything after decode: QR code, preprocessing (receipt region included) and OCR.
+    img is preprocessed in place where the stages allow it.
+    """
+    profile = get_tier(tier)
+    timings = {"decode": decode_info.decode_ms}
+
+    fiscal = None
+    if detect_qr:
+        start = time.perf_counter()
+        fiscal = decode_fiscal_qr(img)
+        timings["qr"] = _elapsed_ms(start)
+
+    # Cropping to the receipt is part of preprocessing, OCR time scales with the pixels left
+    start = time.perf_counter()
+    preprocessed = run_pipeline(img, resolve_spec(preprocessing, profile.preprocessing))
+    img = preprocessed.image
+    timings.update(preprocessed.timings)
+    timings["preprocess"] = _elapsed_ms(start)
+
+    # Extract text with the configured Tesseract backend (Russian by default)
+    start = time.perf_counter()
+    words = None
+    layout = settings.OCR_ITEM_EXTRACTION == "layout"
+    # Word boxes are needed to find the price column cells
+    with_words = layout or settings.OCR_PRICE_REOCR
+    # Tesseract recognises a page on one core, tall receipts are split to use several
+    overlap = 2 * (settings.OCR_TARGET_LINE_HEIGHT or 40)
+    bounds = find_strip_bounds(img, settings.OCR_STRIP_HEIGHT, overlap)
+    if len(bounds) > 1:
+        text, words = ocr_strips(img, bounds, settings.OCR_LANG, with_words=with_words, options=profile.page)
+    elif with_words:
+        # Text and word boxes come from the same recognition pass
+        text, words = tesseract_engine.image_to_data(img, lang=settings.OCR_LANG, options=profile.page)
+    else:
+        text = tesseract_engine.image_to_string(img, lang=settings.OCR_LANG, options=profile.page)
+    timings["ocr"] = _elapsed_ms(start)
+
+    # Second pass over the price cells only, much cheaper than OCRing the page again
+    if settings.OCR_PRICE_REOCR and words:
+        start = time.perf_counter()
+        words, corrected = reocr_price_column(img, words, settings.OCR_LANG, options=profile.numeric)
+        if corrected:
+            text = text_from_words(words)
+        timings["price_reocr"] = _elapsed_ms(start)
+
+    return OCRResult(
+        text=text,
+        decode=decode_info,
+        words=words if layout else None,
+        region=preprocessed.region,
+        strips=len(bounds),
+        fiscal=fiscal,
+        skipped=preprocessed.skipped,
+        timings=timings
+    )
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+def preprocess_image(img, denoise: bool = False):
+    """
+    Preprocess the image to improve OCR accuracy, without cropping to the receipt
+    """
+    # Speckle from thermal paper and sensor noise would survive thresholding as dots
+    spec = "grey,denoise:median:3,threshold:otsu" if denoise else "grey,threshold:otsu"
+    return run_pipeline(img, spec).image
@@ -0,0 +1,76 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.services.tesseract_engine import TesseractOptions
+
+logger = logging.getLogger(__name__)
+
+# Tesseract engine modes and page segmentation modes used by the tiers
+OEM_LSTM_ONLY = 1
+PSM_SINGLE_COLUMN = 4
+PSM_SINGLE_BLOCK = 6
+PSM_SINGLE_LINE = 7
+
+NUMERIC_WHITELIST = "0123456789.,-"
+
+
+@dataclass(frozen=True)
+class OCRTier:
+    """A speed/accuracy profile for the OCR pipeline"""
+    name: str
+    # Options for the full page
+    page: TesseractOptions
+    # Options for numeric zones such as the price column
+    numeric: TesseractOptions
+    # Preprocessing preset (see preprocessing.PRESETS): "minimal" only thresholds,
+    # "standard" crops and deskews the receipt first, "full" also removes speckle
+    # noise before thresholding
+    preprocessing: str
+
+
+def _tessdata(path: Optional[str], variant: str) -> Optional[str]:
+    if not path:
+        logger.info(f"No {variant} traineddata directory configured, using the default models")
+    return path or None
+
+
+def build_tiers() -> Dict[str, OCRTier]:
+    fast_path = _tessdata(settings.OCR_TESSDATA_FAST_PATH, "fast")
+    best_path = _tessdata(settings.OCR_TESSDATA_BEST_PATH, "best")
+    return {
+        # Small integer LSTM models, receipt treated as one uniform text block
+        "fast": OCRTier(
+            name="fast",
+            page=TesseractOptions(oem=OEM_LSTM_ONLY, psm=PSM_SINGLE_BLOCK, tessdata_path=fast_path),
+            numeric=TesseractOptions(oem=OEM_LSTM_ONLY, psm=PSM_SINGLE_LINE, whitelist=NUMERIC_WHITELIST,
+                                     tessdata_path=fast_path),
+            preprocessing="minimal",
+        ),
+        # The installed models with Tesseract's defaults
+        "balanced": OCRTier(
+            name="balanced",
+            page=TesseractOptions(),
+            numeric=TesseractOptions(psm=PSM_SINGLE_LINE, whitelist=NUMERIC_WHITELIST),
+            preprocessing="standard",
+        ),
+        # Large float LSTM models, single column of text of variable sizes
+        "best": OCRTier(
+            name="best",
+            page=TesseractOptions(oem=OEM_LSTM_ONLY, psm=PSM_SINGLE_COLUMN, tessdata_path=best_path),
+            numeric=TesseractOptions(oem=OEM_LSTM_ONLY, psm=PSM_SINGLE_LINE, whitelist=NUMERIC_WHITELIST,
+                                     tessdata_path=best_path),
+            preprocessing="full",
+        ),
+    }
+
+
+OCR_TIERS = build_tiers()
+
+if settings.OCR_DEFAULT_TIER not in OCR_TIERS:
+    raise ValueError(f"Unsupported OCR tier: {settings.OCR_DEFAULT_TIER}")
+
+
+def get_tier(name: Optional[str] = None) -> OCRTier:
+    return OCR_TIERS[name or settings.OCR_DEFAULT_TIER]
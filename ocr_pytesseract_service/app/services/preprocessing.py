@@ -0,0 +1,283 @@
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.receipt_region import RegionInfo, MIN_SKEW_DEGREES, estimate_skew, extract_receipt_region, rotate
+
+logger = logging.getLogger(__name__)
+
+# Named pipelines, selected by OCR tiers or by name in OCR_PREPROCESSING / per request
+PRESETS = {
+    "minimal": "grey,threshold:otsu",
+    "standard": "grey,region,threshold:otsu",
+    "full": "grey,region,denoise:median:3,threshold:otsu",
+}
+
+# Limits on pipelines supplied per request; OCR_PREPROCESSING is trusted as configured
+MAX_REQUEST_STAGES = 8
+# Product of all resize factors of a request pipeline
+MAX_REQUEST_RESIZE = 4.0
+MIN_REQUEST_RESIZE = 0.1
+# Denoise, morphology and threshold window sizes of a request pipeline
+MAX_REQUEST_KERNEL = 51
+# Smallest factor of a single resize stage
+MIN_RESIZE = 0.05
+
+
+class PreprocessingSpecError(ValueError):
+    """Raised for pipeline specs with unknown stages or invalid parameters."""
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    params: Tuple[str, ...] = ()
+
+    def __str__(self) -> str:
+        return ":".join((self.name,) + self.params)
+
+
+@dataclass
+class PreprocessResult:
+    image: np.ndarray
+    # Milliseconds per executed stage, in pipeline order
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Stages that ran but found nothing to do (e.g. grey on a grey image)
+    skipped: List[str] = field(default_factory=list)
+    region: Optional[RegionInfo] = None
+
+
+# Stage implementations take the image and the stage parameters and return the
+# new image, or None when they left it untouched. They may modify the image in
+# place: the pipeline owns its input.
+
+def _grey(img: np.ndarray, params: Tuple[str, ...], result: PreprocessResult) -> Optional[np.ndarray]:
+    if img.ndim == 2:
+        return None
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def _resize(img: np.ndarray, params: Tuple[str, ...], result: PreprocessResult) -> Optional[np.ndarray]:
+    factor = float(params[0])
+    if factor > 1.0:
+        # Never grow the image past the decode pixel budget
+        budget = (settings.OCR_DECODE_MAX_PIXELS / (img.shape[0] * img.shape[1])) ** 0.5
+        factor = min(factor, max(1.0, budget))
+        if factor == 1.0:
+            return None
+    # Keep at least one pixel a side
+    factor = max(factor, 1.0 / min(img.shape[:2]))
+    interpolation = cv2.INTER_AREA if factor < 1.0 else cv2.INTER_CUBIC
+    return cv2.resize(img, None, fx=factor, fy=factor, interpolation=interpolation)
+
+
+def _region(img: np.ndarray, params: Tuple[str, ...], result: PreprocessResult) -> Optional[np.ndarray]:
+    img, result.region = extract_receipt_region(img)
+    return img
+
+
+def _deskew(img: np.ndarray, params: Tuple[str, ...], result: PreprocessResult) -> Optional[np.ndarray]:
+    skew = estimate_skew(img)
+    if abs(skew) < MIN_SKEW_DEGREES:
+        return None
+    return rotate(img, skew)
+
+
+def _denoise(img: np.ndarray, params: Tuple[str, ...], result: PreprocessResult) -> Optional[np.ndarray]:
+    method, size = params[0], int(params[1])
+    if method == "median":
+        return cv2.medianBlur(img, size)
+    if method == "gaussian":
+        return cv2.GaussianBlur(img, (size, size), 0, dst=img)
+    # Non-local means, size is the filter strength; by far the slowest option
+    return cv2.fastNlMeansDenoising(img, None, h=size)
+
+
+def _sauvola(img: np.ndarray, window: int, k: float) -> np.ndarray:
+    """
+    Sauvola threshold: T = mean * (1 + k * (std / 128 - 1)) over a window,
+    which keeps faint print on unevenly lit thermal paper
+    """
+    source = img.astype(np.float32)
+    mean = cv2.boxFilter(source, -1, (window, window))
+    mean_sq = cv2.boxFilter(source * source, -1, (window, window))
+    std = np.sqrt(np.maximum(mean_sq - mean * mean, 0))
+    threshold = mean * (1 + k * (std / 128 - 1))
+    np.greater(source, threshold, out=source)
+    return source.astype(np.uint8) * 255
+
+
+def _threshold(img: np.ndarray, params: Tuple[str, ...], result: PreprocessResult) -> Optional[np.ndarray]:
+    method = params[0]
+    if method == "otsu":
+        cv2.threshold(img, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=img)
+        return img
+    if method == "adaptive":
+        block, offset = int(params[1]), float(params[2])
+        return cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, offset)
+    return _sauvola(img, int(params[1]), float(params[2]))
+
+
+MORPHOLOGY_OPERATIONS = {
+    "open": cv2.MORPH_OPEN,
+    "close": cv2.MORPH_CLOSE,
+    "erode": cv2.MORPH_ERODE,
+    "dilate": cv2.MORPH_DILATE,
+}
+
+
+def _morphology(img: np.ndarray, params: Tuple[str, ...], result: PreprocessResult) -> Optional[np.ndarray]:
+    size = int(params[1])
+    kernel = np.ones((size, size), np.uint8)
+    return cv2.morphologyEx(img, MORPHOLOGY_OPERATIONS[params[0]], kernel, dst=img)
+
+
+# name -> (implementation, default parameters, parameter validator)
+STAGES: Dict[str, Tuple[Callable, Tuple[str, ...], Callable[[Tuple[str, ...]], bool]]] = {
+    "grey": (_grey, (), lambda p: not p),
+    "resize": (_resize, ("1.0",), lambda p: len(p) == 1 and MIN_RESIZE <= float(p[0]) <= 4),
+    "region": (_region, (), lambda p: not p),
+    "deskew": (_deskew, (), lambda p: not p),
+    "denoise": (_denoise, ("median", "3"), lambda p: len(p) == 2 and p[0] in ("median", "gaussian", "nlmeans")
+                and int(p[1]) >= 0 and (p[0] == "nlmeans" or int(p[1]) % 2 == 1 or int(p[1]) == 0)),
+    "threshold": (_threshold, ("otsu",), lambda p: (p == ("otsu",))
+                  or (len(p) == 3 and p[0] in ("adaptive", "sauvola") and int(p[1]) >= 3 and int(p[1]) % 2 == 1
+                      and math.isfinite(float(p[2])))),
+    "morphology": (_morphology, ("open", "1"), lambda p: len(p) == 2 and p[0] in MORPHOLOGY_OPERATIONS
+                   and int(p[1]) >= 1),
+}
+
+
+def parse_spec(spec: str) -> List[Stage]:
+    """
+    "grey,region,threshold:sauvola:25:0.2" -> stages; a preset name is expanded
+    """
+    spec = PRESETS.get(spec.strip(), spec)
+    stages = []
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        name, *params = part.split(":")
+        if name not in STAGES:
+            raise PreprocessingSpecError(f"Unknown preprocessing stage '{name}', expected one of: {', '.join(STAGES)}")
+        _, defaults, valid = STAGES[name]
+        params = tuple(params) or defaults
+        try:
+            ok = valid(params)
+        except ValueError:
+            ok = False
+        if not ok:
+            raise PreprocessingSpecError(f"Invalid parameters for preprocessing stage: '{part}'")
+        stages.append(Stage(name, params))
+    return stages
+
+
+def parse_request_spec(spec: str) -> List[Stage]:
+    """
+    parse_spec for pipelines supplied by clients: at most MAX_REQUEST_STAGES
+    stages, resize factors multiplying to between MIN_REQUEST_RESIZE and
+    MAX_REQUEST_RESIZE, windows of at most MAX_REQUEST_KERNEL pixels and no
+    non-local means denoising, which takes seconds on a full receipt
+    """
+    stages = parse_spec(spec)
+    if len(stages) > MAX_REQUEST_STAGES:
+        raise PreprocessingSpecError(f"Too many preprocessing stages: {len(stages)} (max {MAX_REQUEST_STAGES})")
+    resize = 1.0
+    for stage in stages:
+        if stage.name == "denoise" and stage.params[0] == "nlmeans":
+            raise PreprocessingSpecError("denoise:nlmeans is only available through OCR_PREPROCESSING")
+        if stage.name == "resize":
+            resize *= float(stage.params[0])
+            if resize > MAX_REQUEST_RESIZE:
+                raise PreprocessingSpecError(f"Resize stages enlarge the image more than {MAX_REQUEST_RESIZE:g}x")
+            if resize < MIN_REQUEST_RESIZE:
+                raise PreprocessingSpecError(f"Resize stages shrink the image below {MIN_REQUEST_RESIZE:g}x")
+        # morphology:<op>:<size>, denoise:<method>:<size>, threshold:<method>:<window>:<k>
+        if stage.name in ("morphology", "denoise", "threshold") and len(stage.params) > 1 \
+                and int(stage.params[1]) > MAX_REQUEST_KERNEL:
+            raise PreprocessingSpecError(f"Preprocessing window larger than {MAX_REQUEST_KERNEL} pixels: '{stage}'")
+    return stages
+
+
+def keeps_binary(stage: Stage) -> bool:
+    """
+    Stages whose output is binary again when their input is
+    """
+    if stage.name in ("grey", "morphology"):
+        return True
+    # The median of black and white pixels is black or white
+    return stage.name == "denoise" and stage.params[0] == "median"
+
+
+def is_noop(stage: Stage, previous: List[Stage], receipt_crop: bool = True) -> bool:
+    """
+    Stages that cannot change the output of the pipeline before them
+    """
+    if stage.name == "morphology" and stage.params[1] == "1":
+        # A 1x1 structuring element maps every pixel to itself
+        return True
+    if stage.name == "resize" and float(stage.params[0]) == 1.0:
+        return True
+    if stage.name == "denoise" and int(stage.params[1]) <= (0 if stage.params[0] == "nlmeans" else 1):
+        return True
+    if stage.name == "grey" and any(s.name == "grey" for s in previous):
+        return True
+    if stage.name == "deskew" and previous and previous[-1].name in ("region", "deskew"):
+        # The region stage deskews its crop already
+        return True
+    if stage.name == "threshold" and stage.params == ("otsu",):
+        # Otsu on a binary image reproduces it
+        for earlier in reversed(previous):
+            if earlier.name == "threshold":
+                return True
+            if not keeps_binary(earlier):
+                break
+    if stage.name == "region" and not receipt_crop:
+        return True
+    return False
+
+
+@lru_cache(maxsize=64)
+def compile_pipeline(spec: str, receipt_crop: bool = True) -> Tuple[Stage, ...]:
+    """
+    Parse a spec and drop the stages that cannot change the output.
+    Without receipt_crop (OCR_RECEIPT_CROP) region stages are dropped too.
+    """
+    stages: List[Stage] = []
+    for stage in parse_spec(spec):
+        if is_noop(stage, stages, receipt_crop):
+            logger.debug(f"Preprocessing stage '{stage}' cannot change the image, dropped")
+            continue
+        stages.append(stage)
+    return tuple(stages)
+
+
+def resolve_spec(requested: Optional[str], tier_preset: str) -> str:
+    """
+    The pipeline of a request: its own spec, else OCR_PREPROCESSING, else the tier's preset
+    """
+    return requested or settings.OCR_PREPROCESSING or tier_preset
+
+
+def run_pipeline(img: np.ndarray, spec: str) -> PreprocessResult:
+    """
+    Run a preprocessing pipeline over an image it may modify in place
+    """
+    if not img.flags.writeable:
+        # Decoded TIFF pages are read-only views of PIL's buffer
+        img = img.copy()
+    result = PreprocessResult(image=img)
+    for stage in compile_pipeline(spec, settings.OCR_RECEIPT_CROP):
+        start = time.perf_counter()
+        output = STAGES[stage.name][0](result.image, stage.params, result)
+        result.timings[stage.name] = round(result.timings.get(stage.name, 0.0) + (time.perf_counter() - start) * 1000, 2)
+        if output is None:
+            result.skipped.append(str(stage))
+        else:
+            result.image = output
+    return result
@@ -0,0 +1,93 @@
+import logging
+import re
+from dataclasses import replace
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services import tesseract_engine
+from app.services.layout_parser import PRICE_TOKEN, find_price_column
+from app.services.strip_ocr import get_ocr_thread_pool
+from app.services.tesseract_engine import DEFAULT_OPTIONS, OCRWord, TesseractOptions
+
+logger = logging.getLogger(__name__)
+
+# Padding around a cell, as a fraction of its height, and the white margin
+# Tesseract needs around a single line of text
+CELL_PADDING = 0.25
+CELL_MARGIN = 10
+# Discount and return rows print negative amounts
+SIGNED_PRICE = re.compile(r"-?" + PRICE_TOKEN.pattern)
+
+
+def crop_cell(binary: np.ndarray, word: OCRWord) -> np.ndarray:
+    pad = int(round(word.height * CELL_PADDING))
+    top, bottom = max(0, word.top - pad), min(binary.shape[0], word.top + word.height + pad)
+    left, right = max(0, word.left - pad), min(binary.shape[1], word.right + pad)
+    cell = binary[top:bottom, left:right]
+    return cv2.copyMakeBorder(cell, CELL_MARGIN, CELL_MARGIN, CELL_MARGIN, CELL_MARGIN,
+                              cv2.BORDER_CONSTANT, value=255)
+
+
+def price_cells(words: List[OCRWord], max_confidence: float) -> List[int]:
+    """
+    Indexes of the words in the price column worth reading again: anything
+    with a digit that was recognised with low confidence or is not a clean price
+    """
+    column = find_price_column(words)
+    if column is None:
+        return []
+    return [
+        index for index, word in enumerate(words)
+        if column[0] <= word.right <= column[1]
+        and any(char.isdigit() for char in word.text)
+        and (word.conf < max_confidence or not SIGNED_PRICE.fullmatch(word.text))
+    ]
+
+
+def normalise_price(text: str) -> Optional[str]:
+    """
+    A price read from a cell, or None when the cell did not read as one;
+    a leading minus is kept, dashes from dot leaders are not
+    """
+    candidate = "".join(text.split())
+    sign = "-" if candidate.startswith("-") else ""
+    candidate = sign + candidate.strip("-")
+    return candidate if SIGNED_PRICE.fullmatch(candidate) else None
+
+
+def reocr_price_column(binary: np.ndarray, words: List[OCRWord], lang: str = settings.OCR_LANG,
+                       options: TesseractOptions = DEFAULT_OPTIONS,
+                       max_confidence: float = settings.OCR_PRICE_REOCR_CONFIDENCE) -> Tuple[List[OCRWord], int]:
+    """
+    Read doubtful price column cells again as single lines restricted to
+    digits and separators, all cells in parallel, and merge the readings that
+    form a valid price back into the words. Returns the words and the number
+    of corrected cells.
+    """
+    indexes = price_cells(words, max_confidence)
+    if not indexes:
+        return words, 0
+
+    cells = [crop_cell(binary, words[index]) for index in indexes]
+    readings = get_ocr_thread_pool().map(
+        lambda cell: tesseract_engine.image_to_string(cell, lang=lang, options=options), cells
+    )
+
+    words = list(words)
+    corrected = 0
+    for index, reading in zip(indexes, readings):
+        price = normalise_price(reading)
+        if price is None:
+            continue
+        if words[index].text.startswith("-") and not price.startswith("-"):
+            # The re-read corrects the digits, a faint minus it missed stays
+            price = "-" + price
+        if price == words[index].text:
+            continue
+        logger.debug(f"Price cell re-read: {words[index].text!r} -> {price!r}")
+        words[index] = replace(words[index], text=price)
+        corrected += 1
+    return words, corrected
@@ -0,0 +1,120 @@
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+from app.services.decode import JPEG_MAGIC, read_image_size
+
+logger = logging.getLogger(__name__)
+
+# Features are computed on a colour copy at most this many pixels on a side
+PREVIEW_SIZE = 800
+REDUCED_COLOR_FLAGS = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+# Rejection thresholds, deliberately loose: only uploads that are clearly not
+# a receipt are rejected, borderline ones still get OCR
+MIN_TEXT_LINES = 4
+# Colourful, busy or unaligned images need more text before they count as a receipt
+MIN_TEXT_LINES_UNUSUAL = 10
+COLOURFUL_SATURATION = 0.35
+BUSY_EDGE_DENSITY = 0.2
+MIN_ALIGNED_FRACTION = 0.3
+
+
+@dataclass
+class ReceiptFeatures:
+    """Cheap image statistics that separate receipts from other uploads"""
+    # Line-shaped blobs of dark strokes, i.e. probable lines of text
+    text_lines: int
+    # Mean HSV saturation, 0-1: receipts are black on white
+    saturation: float
+    # Fraction of pixels on an edge
+    edge_density: float
+    # Fraction of text line blobs aligned into a column sharing a left edge
+    aligned_fraction: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class Classification:
+    is_receipt_like: bool
+    reason: Optional[str]
+    features: ReceiptFeatures
+
+
+def decode_preview(buffer: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Colour decode downscaled to PREVIEW_SIZE, using libjpeg's reduced decode when it can
+    """
+    size = read_image_size(buffer)
+    reduction = 1
+    if size and bytes(buffer[:3]) == JPEG_MAGIC:
+        reduction = next((factor for factor in (8, 4, 2) if max(size) // factor >= PREVIEW_SIZE), 1)
+    img = cv2.imdecode(buffer, REDUCED_COLOR_FLAGS.get(reduction, cv2.IMREAD_COLOR))
+    if img is None:
+        return None
+    ratio = PREVIEW_SIZE / max(img.shape[:2])
+    if ratio < 1.0:
+        img = cv2.resize(img, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def receipt_features(img: np.ndarray) -> ReceiptFeatures:
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    saturation = float(cv2.cvtColor(img, cv2.COLOR_BGR2HSV)[:, :, 1].mean() / 255)
+
+    # Dark strokes relative to their surroundings, merged horizontally into line blobs
+    ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 12)
+    # Long vertical strokes (paper edges, table lines) would chain all text lines together
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, 25)))
+    ink = cv2.subtract(ink, vertical)
+    lines = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=4)
+    height = gray.shape[0]
+    text_lines = [
+        (x, w, h) for x, _, w, h, _ in stats[1:]
+        if 3 <= h <= height / 20 and w >= 3 * h
+    ]
+
+    aligned = 0
+    if text_lines:
+        lefts = np.array([x for x, _, _ in text_lines])
+        tolerance = max(3, int(np.median([h for _, _, h in text_lines])))
+        aligned = max(int((np.abs(lefts - left) <= tolerance).sum()) for left in np.unique(lefts))
+
+    edges = cv2.Canny(gray, 80, 160)
+    return ReceiptFeatures(
+        text_lines=len(text_lines),
+        saturation=round(saturation, 3),
+        edge_density=round(float(np.count_nonzero(edges)) / edges.size, 4),
+        aligned_fraction=round(aligned / len(text_lines), 3) if text_lines else 0.0,
+    )
+
+
+def classify_features(features: ReceiptFeatures) -> Classification:
+    reason = None
+    if features.text_lines < MIN_TEXT_LINES:
+        reason = f"only {features.text_lines} text lines"
+    elif features.text_lines < MIN_TEXT_LINES_UNUSUAL:
+        if features.saturation > COLOURFUL_SATURATION:
+            reason = f"colourful image (saturation {features.saturation}) with {features.text_lines} text lines"
+        elif features.edge_density > BUSY_EDGE_DENSITY:
+            reason = f"textured image (edge density {features.edge_density}) with {features.text_lines} text lines"
+        elif features.aligned_fraction < MIN_ALIGNED_FRACTION:
+            reason = f"{features.text_lines} text lines without a common left margin"
+    return Classification(is_receipt_like=reason is None, reason=reason, features=features)
+
+
+def classify_upload(contents: bytes) -> Optional[Classification]:
+    """
+    Decide from a small preview whether an upload can be a receipt.
+    None when the preview cannot be decoded; OCR then reports the decode error.
+    """
+    img = decode_preview(np.frombuffer(contents, np.uint8))
+    if img is None:
+        return None
+    return classify_features(receipt_features(img))
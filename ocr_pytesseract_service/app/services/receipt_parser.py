@@ -0,0 +1,276 @@
+import re
+import logging
+from typing import Dict, List, Any, Optional
+
+from app.services import receipt_templates
+from app.services.layout_parser import items_from_words
+from app.services.tesseract_engine import OCRWord
+
+logger = logging.getLogger(__name__)
+
+# Patterns are compiled once at import; parse_receipt_data only runs them
+DATE_PATTERN = re.compile(r'(\d{2}[./-]\d{2}[./-]\d{4})')
+PRICE_PATTERN = re.compile(r'\d+[.,]\d+')
+NUMBER_PATTERN = re.compile(r'\d+[.,]?\d*')
+ITEM_PATTERN = re.compile(r'([А-Яа-яA-Za-z\s\./\-]+)\s+(\d+[.,]?\d*)\s+(\d+[.,]?\d*)')
+QUANTITY_PATTERN = re.compile(r'(\d+[.,]?\d*)\s*[xхХ]')
+# ITEM_PATTERN needs two numbers that each follow whitespace. Checking for
+# that first avoids its slow backtracking on the many lines that cannot match.
+SPACED_NUMBER_PATTERN = re.compile(r'\s\d')
+
+# Amount labels per field in priority order: the first label found anywhere wins
+AMOUNT_LABELS = {
+    "total_amount": ["Всего", "Итого к оплате", "К оплате", "ИТОГО"],
+    "tax_amount": ["НДС", "VAT"],
+    "discount_amount": ["Скидка", "Discount"],
+}
+
+# All amount labels in one alternation, each number captured in a group named
+# <field>__<priority>. Labels may be followed by the amount on the next line,
+# so the scanner runs over the whole text rather than line by line. The only
+# labels that can start inside another label's match are "К оплате" within
+# "Итого к оплате", and then the outer, higher priority label wins anyway.
+# The leading lookahead on the labels' first letters changes nothing about
+# what matches, but lets the regex engine skip most positions cheaply.
+AMOUNT_SCANNER = re.compile(
+    "(?=[%s])(?:%s)" % (
+        "".join(sorted({label[0] for labels in AMOUNT_LABELS.values() for label in labels})),
+        "|".join(
+            rf'{label}:?\s*(?P<{field}__{priority}>\d+[.,]\d+)'
+            for field, labels in AMOUNT_LABELS.items()
+            for priority, label in enumerate(labels)
+        ),
+    ),
+    re.IGNORECASE
+)
+
+# Item rows start after the shop header
+HEADER_LINES = 5
+
+
+def parse_receipt_data(text: str, words: Optional[List[OCRWord]] = None) -> Dict[str, Any]:
+    """
+    Parse the extracted text to get receipt information.
+    Receipts of known chains are parsed with their template. Otherwise, with
+    word boxes from the same OCR pass, items are assembled from the layout.
+    """
+    result = {
+        "is_receipt": False,
+        "bill_date": None,
+        "tax_amount": 0.00,
+        "discount_amount": 0.00,
+        "total_amount": 0.00,
+        "items": []
+    }
+
+    # Check if it's a valid receipt by looking for key elements
+    if not text or len(text) < 10:
+        return result
+
+    clean_lines = [line for line in (raw.strip() for raw in text.split('\n')) if line]
+
+    # Extract date
+    date_match = DATE_PATTERN.search(text)
+    if date_match:
+        result["bill_date"] = _format_date(date_match.group(1))
+
+    # Extract total, tax and discount amounts in one scan
+    first_amounts = {}
+    for match in AMOUNT_SCANNER.finditer(text):
+        first_amounts.setdefault(match.lastgroup, match.group(match.lastgroup))
+
+    for field, labels in AMOUNT_LABELS.items():
+        for priority in range(len(labels)):
+            amount = first_amounts.get(f"{field}__{priority}")
+            if amount is None:
+                continue
+            try:
+                result[field] = float(amount.replace(',', '.'))
+                break
+            except ValueError:
+                continue
+
+    # Known layouts: the chain's own extractor, the generic strategies only if it finds nothing
+    items = []
+    registry = receipt_templates.template_registry
+    template = registry.match(clean_lines) if registry is not None else None
+    if template is not None:
+        body = "\n".join(clean_lines)
+        items = template.extract_items(body)
+        total = template.extract_total(body)
+        if total is not None:
+            result["total_amount"] = total
+        logger.debug(f"Receipt matched template '{template.name}', {len(items)} items")
+
+    if not items and words:
+        items = items_from_words(words)
+
+    # Tokenise every line once, the item strategies below share the tokens
+    line_prices = [PRICE_PATTERN.findall(line) for line in clean_lines] if not items else []
+
+    if not items:
+        items = _items_from_rows(clean_lines, line_prices)
+
+    # Special case: items, quantities and prices in separate columns
+    if not items:
+        items = _items_from_columns(clean_lines, line_prices)
+
+    # Second approach - find the price column position and work backwards
+    if not items:
+        items = _items_from_price_column(clean_lines, line_prices)
+
+    # If we found items and at least one has a positive price and quantity,
+    # or total amount is positive, mark as a valid receipt
+    if items and any(item["quantity"] > 0 and item["total_price"] > 0 for item in items):
+        result["is_receipt"] = True
+    elif result["total_amount"] > 0:
+        result["is_receipt"] = True
+
+    result["items"] = items
+    return result
+
+
+def _format_date(date_str: str) -> Optional[str]:
+    """
+    Convert DD.MM.YYYY, DD/MM/YYYY or DD-MM-YYYY to YYYY-MM-DD
+    """
+    try:
+        if '.' in date_str:
+            day, month, year = date_str.split('.')
+        elif '/' in date_str:
+            day, month, year = date_str.split('/')
+        elif '-' in date_str:
+            day, month, year = date_str.split('-')
+
+        return f"{year}-{month}-{day}"
+    except Exception as e:
+        logger.error(f"Error parsing date: {str(e)}")
+        return None
+
+
+def _to_float(number: str) -> float:
+    return float(number.replace(',', '.'))
+
+
+def _items_from_rows(clean_lines: List[str], line_prices: List[List[str]]) -> List[Dict[str, Any]]:
+    """
+    "name quantity total" rows, or a row of unit and total price under the item name
+    """
+    items = []
+    for i in range(HEADER_LINES, len(clean_lines)):
+        line = clean_lines[i]
+
+        item_match = None
+        if len(SPACED_NUMBER_PATTERN.findall(line)) >= 2:
+            item_match = ITEM_PATTERN.search(line)
+        if item_match:
+            try:
+                quantity = _to_float(item_match.group(2))
+                total_price = _to_float(item_match.group(3))
+                unit_price = total_price / quantity if quantity else 0
+
+                items.append({
+                    "description": item_match.group(1).strip(),
+                    "quantity": quantity,
+                    "unit_price": round(unit_price, 2),
+                    "total_price": total_price
+                })
+            except (ValueError, ZeroDivisionError):
+                continue
+
+        # At least two prices: unit price and total price, name on the previous line
+        elif len(line_prices[i]) >= 2:
+            prices = line_prices[i]
+            try:
+                unit_price = _to_float(prices[0])
+                total_price = _to_float(prices[1])
+
+                # Estimate quantity based on unit and total price
+                quantity = round(total_price / unit_price, 2) if unit_price else 1
+
+                if not line_prices[i - 1]:
+                    items.append({
+                        "description": clean_lines[i - 1],
+                        "quantity": quantity,
+                        "unit_price": unit_price,
+                        "total_price": total_price
+                    })
+            except (ValueError, ZeroDivisionError):
+                continue
+    return items
+
+
+def _items_from_columns(clean_lines: List[str], line_prices: List[List[str]]) -> List[Dict[str, Any]]:
+    """
+    A line without prices followed by a line of numbers: quantity first, total last
+    """
+    items = []
+    for i in range(len(clean_lines) - 2):
+        if line_prices[i]:
+            continue
+        numbers = NUMBER_PATTERN.findall(clean_lines[i + 1])
+        if len(numbers) >= 2:
+            try:
+                quantity = _to_float(numbers[0])
+                total_price = _to_float(numbers[-1])
+                unit_price = total_price / quantity if quantity else 0
+
+                items.append({
+                    "description": clean_lines[i],
+                    "quantity": quantity,
+                    "unit_price": round(unit_price, 2),
+                    "total_price": total_price
+                })
+            except (ValueError, ZeroDivisionError):
+                continue
+    return items
+
+
+def _items_from_price_column(clean_lines: List[str], line_prices: List[List[str]]) -> List[Dict[str, Any]]:
+    """
+    Split every line at the average character offset of the prices
+    """
+    price_positions = [
+        match.start()
+        for line, prices in zip(clean_lines, line_prices) if prices
+        for match in PRICE_PATTERN.finditer(line)
+    ]
+    if not price_positions:
+        return []
+
+    items = []
+    avg_price_pos = sum(price_positions) // len(price_positions)
+    for line in clean_lines:
+        if len(line) <= avg_price_pos:
+            continue
+        item_part = line[:avg_price_pos].strip()
+        price_part = line[avg_price_pos:].strip()
+        if not (item_part and price_part):
+            continue
+
+        price_match = PRICE_PATTERN.search(price_part)
+        if not price_match:
+            continue
+        try:
+            total_price = _to_float(price_match.group())
+            # Default quantity to 1 if not specified
+            quantity = 1.0
+
+            # Try to extract quantity from item part
+            qty_match = QUANTITY_PATTERN.search(item_part)
+            if qty_match:
+                quantity = _to_float(qty_match.group(1))
+                # Remove quantity from item description
+                item_part = QUANTITY_PATTERN.sub('', item_part).strip()
+
+            unit_price = total_price / quantity
+
+            items.append({
+                "description": item_part,
+                "quantity": quantity,
+                "unit_price": round(unit_price, 2),
+                "total_price": total_price
+            })
+        except (ValueError, ZeroDivisionError):
+            continue
+    return items
@@ -0,0 +1,157 @@
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Region detection and skew estimation run on a copy at most this many pixels on a side
+ANALYSIS_SIZE = 600
+# Contours covering less of the frame are noise, more means the receipt already fills it
+MIN_REGION_FRACTION = 0.15
+MAX_REGION_FRACTION = 0.92
+MAX_SKEW_DEGREES = 10.0
+MIN_SKEW_DEGREES = 0.3
+
+
+@dataclass
+class RegionInfo:
+    """What the region stage did with a decoded image"""
+    found: bool
+    quadrilateral: bool
+    region_fraction: float
+    skew_degrees: float
+    input_size: Tuple[int, int]
+    output_size: Tuple[int, int]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _analysis_copy(gray: np.ndarray) -> Tuple[np.ndarray, float]:
+    ratio = min(1.0, ANALYSIS_SIZE / max(gray.shape[:2]))
+    if ratio == 1.0:
+        return gray, ratio
+    return cv2.resize(gray, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA), ratio
+
+
+def order_corners(points: np.ndarray) -> np.ndarray:
+    """
+    Top-left, top-right, bottom-right, bottom-left
+    """
+    points = points.reshape(4, 2).astype(np.float32)
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)],
+    ], dtype=np.float32)
+
+
+def find_receipt_corners(gray: np.ndarray) -> Optional[Tuple[np.ndarray, bool, float]]:
+    """
+    Corners of the receipt in full resolution coordinates, whether they come
+    from a quadrilateral contour (rather than a rotated bounding box), and the
+    fraction of the frame the receipt covers. Receipt paper is the largest
+    bright blob once the printed text is closed over.
+    """
+    small, ratio = _analysis_copy(gray)
+    blurred = cv2.GaussianBlur(small, (5, 5), 0)
+    _, paper = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
+    paper = cv2.morphologyEx(paper, cv2.MORPH_CLOSE, kernel)
+
+    contours, _ = cv2.findContours(paper, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    contour = max(contours, key=cv2.contourArea)
+    fraction = cv2.contourArea(contour) / float(small.shape[0] * small.shape[1])
+    if not MIN_REGION_FRACTION <= fraction <= MAX_REGION_FRACTION:
+        return None
+
+    approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+    quadrilateral = len(approx) == 4 and cv2.isContourConvex(approx)
+    corners = approx if quadrilateral else cv2.boxPoints(cv2.minAreaRect(contour))
+    return order_corners(corners) / ratio, quadrilateral, fraction
+
+
+def warp_region(gray: np.ndarray, corners: np.ndarray) -> np.ndarray:
+    """
+    Perspective warp of the quadrilateral to an upright rectangle
+    """
+    tl, tr, br, bl = corners
+    width = int(round(max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))))
+    height = int(round(max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))))
+    if width < 2 or height < 2:
+        return gray
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(corners, target)
+    return cv2.warpPerspective(gray, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_REPLICATE)
+
+
+def _profile_score(ink: np.ndarray, angle: float) -> float:
+    height, width = ink.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    rotated = cv2.warpAffine(ink, matrix, (width, height), flags=cv2.INTER_NEAREST)
+    # Aligned text lines give a spiky row profile, i.e. a large variance
+    return float(np.var(rotated.sum(axis=1, dtype=np.int64)))
+
+
+def estimate_skew(gray: np.ndarray) -> float:
+    """
+    Text skew in degrees from the row projection profile of a downscaled copy,
+    searched coarse to fine within +-MAX_SKEW_DEGREES
+    """
+    small, _ = _analysis_copy(gray)
+    _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    if not ink.any():
+        return 0.0
+
+    best = 0.0
+    for step, span in ((1.0, MAX_SKEW_DEGREES), (0.2, 1.0)):
+        angles = np.arange(best - span, best + span + step / 2, step)
+        best = max(angles, key=lambda angle: _profile_score(ink, angle))
+    return float(round(best, 2))
+
+
+def rotate(gray: np.ndarray, angle: float) -> np.ndarray:
+    height, width = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_REPLICATE)
+
+
+def extract_receipt_region(gray: np.ndarray) -> Tuple[np.ndarray, RegionInfo]:
+    """
+    Crop a greyscale photo to the receipt and straighten it, so thresholding
+    and OCR only see receipt pixels. Images where no receipt outline is found
+    (scans, receipts filling the frame) are only deskewed.
+    """
+    input_size = (gray.shape[1], gray.shape[0])
+    found = quadrilateral = False
+    fraction = 1.0
+
+    corners = find_receipt_corners(gray)
+    if corners is not None:
+        points, quadrilateral, fraction = corners
+        gray = warp_region(gray, points)
+        found = True
+
+    skew = estimate_skew(gray)
+    if abs(skew) >= MIN_SKEW_DEGREES:
+        gray = rotate(gray, skew)
+
+    info = RegionInfo(
+        found=found,
+        quadrilateral=quadrilateral,
+        region_fraction=round(fraction, 3),
+        skew_degrees=skew,
+        input_size=input_size,
+        output_size=(gray.shape[1], gray.shape[0]),
+    )
+    return gray, info
@@ -0,0 +1,170 @@
+import json
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# The chain name and legal entity are printed within the first lines
+TEMPLATE_HEADER_LINES = 8
+
+# Latin letters Tesseract returns for look-alike Cyrillic ones in Russian headers
+LATIN_TO_CYRILLIC = str.maketrans("ABCEHKMOPTXY", "АВСЕНКМОРТХУ")
+TOKEN_PATTERN = re.compile(r"\w{3,}")
+
+# Item lines of 54-FZ fiscal receipts: "<quantity> x <unit price> = <total>",
+# after the name on the same line or below it
+_AMOUNT = r"\d+[.,]\d{2}"
+_QUANTITY = r"\d+(?:[.,]\d+)?"
+_TIMES = r"\s*[xXхХ*]\s*"
+
+
+@dataclass(frozen=True)
+class ReceiptTemplate:
+    """A known receipt layout: header tokens that identify it and its compiled extractors"""
+    name: str
+    # Tokens from the header of the chain's receipts, in any case and script
+    tokens: frozenset
+    # Matches one item per match over the receipt lines, with named groups
+    # description, quantity, total_price and optionally unit_price
+    items: re.Pattern
+    # Matches the receipt total as group total, the generic labels are used when unset
+    total: Optional[re.Pattern] = None
+    # Header tokens that have to be found before the template is used
+    min_tokens: int = 1
+
+    def extract_items(self, text: str) -> List[Dict[str, Any]]:
+        items = []
+        for match in self.items.finditer(text):
+            try:
+                quantity = _to_float(match.group("quantity"))
+                total_price = _to_float(match.group("total_price"))
+                unit_price = match.groupdict().get("unit_price")
+                unit_price = _to_float(unit_price) if unit_price else total_price / quantity
+            except (ValueError, ZeroDivisionError):
+                continue
+            items.append({
+                "description": " ".join(match.group("description").split()),
+                "quantity": quantity,
+                "unit_price": round(unit_price, 2),
+                "total_price": total_price,
+            })
+        return items
+
+    def extract_total(self, text: str) -> Optional[float]:
+        match = self.total.search(text) if self.total is not None else None
+        return _to_float(match.group("total")) if match else None
+
+
+def _to_float(number: str) -> float:
+    return float(number.replace(',', '.'))
+
+
+def normalise_token(token: str) -> str:
+    return token.upper().replace("Ё", "Е").translate(LATIN_TO_CYRILLIC)
+
+
+def header_tokens(lines: Iterable[str]) -> List[str]:
+    return [normalise_token(token) for line in lines for token in TOKEN_PATTERN.findall(line)]
+
+
+def build_template(name: str, tokens: Iterable[str], items: str, total: Optional[str] = None,
+                   min_tokens: int = 1) -> ReceiptTemplate:
+    return ReceiptTemplate(
+        name=name,
+        tokens=frozenset(normalise_token(token) for token in tokens),
+        items=re.compile(items, re.MULTILINE),
+        total=re.compile(total, re.MULTILINE | re.IGNORECASE) if total else None,
+        min_tokens=min_tokens,
+    )
+
+
+BUILTIN_TEMPLATES = [
+    # X5 Retail: name on its own line, "1 X 89.99 =89.99" below it, "ИТОГ =..." at the end
+    build_template(
+        "x5",
+        ["Пятерочка", "Перекресток", "Агроторг"],
+        items=rf"^(?P<description>[^\n]*[^\W\d_][^\n]*)\n(?P<quantity>{_QUANTITY}){_TIMES}(?P<unit_price>{_AMOUNT})\s*=\s*(?P<total_price>{_AMOUNT})",
+        total=rf"^ИТОГ\s*=\s*(?P<total>{_AMOUNT})",
+    ),
+    # Magnit: one line per item, "name 2 * 45.90 = 91.80"
+    build_template(
+        "magnit",
+        ["Магнит", "Тандер"],
+        items=rf"^(?P<description>[^\n]*?[^\W\d_][^\n]*?)\s+(?P<quantity>{_QUANTITY}){_TIMES}(?P<unit_price>{_AMOUNT})\s*=\s*(?P<total_price>{_AMOUNT})\s*$",
+        total=rf"^ИТОГО?\s*[:=]?\s*(?P<total>{_AMOUNT})",
+    ),
+    # VkusVill: numbered items, "1. name" then "quantity x unit price total"
+    build_template(
+        "vkusvill",
+        ["ВкусВилл"],
+        items=rf"^\d+\.\s*(?P<description>[^\n]+)\n(?P<quantity>{_QUANTITY}){_TIMES}(?P<unit_price>{_AMOUNT})\s+(?P<total_price>{_AMOUNT})\s*$",
+    ),
+]
+
+
+class TemplateRegistry:
+    """
+    Known receipt layouts looked up by header token. Every token maps to one
+    template in a dict, so matching costs one hash lookup per header token
+    however many templates are registered.
+    """
+
+    def __init__(self, templates: Iterable[ReceiptTemplate] = ()):
+        self.templates: Dict[str, ReceiptTemplate] = {}
+        self._by_token: Dict[str, str] = {}
+        for template in templates:
+            self.register(template)
+
+    def register(self, template: ReceiptTemplate):
+        for token in template.tokens:
+            owner = self._by_token.get(token)
+            if owner is not None and owner != template.name:
+                raise ValueError(f"Header token '{token}' of template '{template.name}' already identifies '{owner}'")
+        # A template registered again under the same name replaces the previous one
+        previous = self.templates.pop(template.name, None)
+        if previous is not None:
+            for token in previous.tokens:
+                self._by_token.pop(token, None)
+        self.templates[template.name] = template
+        self._by_token.update((token, template.name) for token in template.tokens)
+
+    def match(self, lines: List[str]) -> Optional[ReceiptTemplate]:
+        """
+        The template whose header tokens appear most often in the first lines, if any
+        """
+        hits = Counter(
+            self._by_token[token] for token in header_tokens(lines[:TEMPLATE_HEADER_LINES])
+            if token in self._by_token
+        )
+        for name, count in hits.most_common():
+            template = self.templates[name]
+            if count >= template.min_tokens:
+                return template
+        return None
+
+
+def load_templates(path: str) -> List[ReceiptTemplate]:
+    """
+    Templates from a JSON list of {"name", "tokens", "items", "total", "min_tokens"}
+    """
+    with open(path, encoding="utf-8") as file:
+        return [build_template(**entry) for entry in json.load(file)]
+
+
+def build_registry() -> Optional[TemplateRegistry]:
+    if not settings.OCR_RECEIPT_TEMPLATES:
+        return None
+    registry = TemplateRegistry(BUILTIN_TEMPLATES)
+    if settings.OCR_RECEIPT_TEMPLATES_PATH:
+        for template in load_templates(settings.OCR_RECEIPT_TEMPLATES_PATH):
+            registry.register(template)
+    logger.info(f"Receipt templates: {', '.join(registry.templates)}")
+    return registry
+
+
+template_registry = build_registry()
@@ -0,0 +1,141 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import tesseract_engine
+from app.services.tesseract_engine import DEFAULT_OPTIONS, OCRWord, TesseractOptions
+
+logger = logging.getLogger(__name__)
+
+# Longest run of overlapping lines looked for when stitching strips cut through text
+MAX_OVERLAP_LINES = 4
+# Block numbers of later strips are shifted so blocks stay unique across strips
+STRIP_BLOCK_OFFSET = 1000
+
+_strip_pool: Optional[ThreadPoolExecutor] = None
+_strip_pool_lock = threading.Lock()
+
+
+def get_ocr_thread_pool() -> ThreadPoolExecutor:
+    """
+    Threads of this worker process that OCR parts of one image (strips, price
+    cells). Both backends release the GIL while Tesseract runs (tesserocr
+    natively, pytesseract in a subprocess), so the parts are recognised on
+    several cores at once.
+    """
+    global _strip_pool
+    with _strip_pool_lock:
+        if _strip_pool is None:
+            _strip_pool = ThreadPoolExecutor(
+                max_workers=max(1, settings.OCR_STRIP_WORKERS),
+                thread_name_prefix="ocr-strip"
+            )
+        return _strip_pool
+
+
+def _blank_runs(blank: np.ndarray, offset: int) -> List[Tuple[int, int]]:
+    padded = np.concatenate(([False], blank, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return [(offset + start, offset + end) for start, end in zip(edges[::2], edges[1::2])]
+
+
+def find_strip_bounds(binary: np.ndarray, strip_height: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    (top, bottom) rows of horizontal strips about strip_height tall. Strips are
+    cut in the middle of the blank gap between text lines closest to each
+    target height; where there is no gap nearby the cut goes through the text
+    and neighbouring strips overlap by `overlap` rows on both sides.
+    """
+    height = binary.shape[0]
+    if strip_height <= 0 or height <= strip_height * 1.5:
+        return [(0, height)]
+
+    # Dark pixels per row, binary images have black text on white
+    ink = (binary < 128).sum(axis=1)
+    blank = ink <= max(1, binary.shape[1] // 500)
+
+    cuts = []
+    target = strip_height
+    search = strip_height // 4
+    while height - target > strip_height // 2:
+        low, high = target - search, min(height, target + search)
+        runs = [run for run in _blank_runs(blank[low:high], low) if run[1] - run[0] >= 2]
+        if runs:
+            start, end = min(runs, key=lambda run: abs((run[0] + run[1]) // 2 - target))
+            cuts.append(((start + end) // 2, 0))
+        else:
+            cuts.append((target, overlap))
+        target = cuts[-1][0] + strip_height
+
+    bounds = []
+    top, top_overlap = 0, 0
+    for cut, cut_overlap in cuts:
+        bounds.append((max(0, top - top_overlap), min(height, cut + cut_overlap)))
+        top, top_overlap = cut, cut_overlap
+    bounds.append((max(0, top - top_overlap), height))
+    return bounds
+
+
+def stitch_text(texts: List[str], bounds: List[Tuple[int, int]]) -> str:
+    """
+    Join the text of consecutive strips. Where a strip overlaps the previous
+    one (the cut went through text), lines at its start that repeat the end
+    of the previous strip are dropped; strips cut in a blank gap share no
+    rows, so identical lines on both sides are distinct receipt lines.
+    """
+    lines: List[str] = []
+    for index, text in enumerate(texts):
+        # pytesseract output ends with a form feed
+        strip_lines = text.rstrip().split("\n") if text.strip() else []
+        overlaps = index > 0 and bounds[index][0] < bounds[index - 1][1]
+        content = [line.strip() for line in lines if line.strip()] if overlaps else []
+        head = [line.strip() for line in strip_lines if line.strip()]
+        for size in range(min(MAX_OVERLAP_LINES, len(content), len(head)), 0, -1):
+            if head[:size] == content[-size:]:
+                # Skip the repeated lines, blank ones included
+                seen = 0
+                while seen < size:
+                    if strip_lines.pop(0).strip():
+                        seen += 1
+                break
+        if lines and strip_lines:
+            lines.append("")
+        lines.extend(strip_lines)
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def stitch_words(strip_words: List[List[OCRWord]], bounds: List[Tuple[int, int]]) -> List[OCRWord]:
+    """
+    Shift strip word boxes to page coordinates; words in an overlap are kept
+    from the strip in which they lie above (or below) the overlap's middle
+    """
+    words = []
+    for index, (strip, (top, bottom)) in enumerate(zip(strip_words, bounds)):
+        upper = (top + bounds[index - 1][1]) / 2 if index > 0 else float("-inf")
+        lower = (bounds[index + 1][0] + bottom) / 2 if index + 1 < len(bounds) else float("inf")
+        for word in strip:
+            shifted = replace(word, top=word.top + top, block=word.block + index * STRIP_BLOCK_OFFSET)
+            if upper <= shifted.center_y < lower:
+                words.append(shifted)
+    return words
+
+
+def ocr_strips(img: np.ndarray, bounds: List[Tuple[int, int]], lang: str, with_words: bool = False,
+               options: TesseractOptions = DEFAULT_OPTIONS) -> Tuple[str, Optional[List[OCRWord]]]:
+    """
+    OCR each strip of a preprocessed image in parallel and stitch the results
+    """
+    pool = get_ocr_thread_pool()
+    strips = [np.ascontiguousarray(img[top:bottom]) for top, bottom in bounds]
+    if with_words:
+        results = list(pool.map(lambda strip: tesseract_engine.image_to_data(strip, lang=lang, options=options), strips))
+        texts = [text for text, _ in results]
+        return stitch_text(texts, bounds), stitch_words([words for _, words in results], bounds)
+
+    texts = list(pool.map(lambda strip: tesseract_engine.image_to_string(strip, lang=lang, options=options), strips))
+    return stitch_text(texts, bounds), None
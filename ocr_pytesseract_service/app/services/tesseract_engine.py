@@ -0,0 +1,310 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import pytesseract
+
+from app.core.config import settings
+
+try:
+    import tesserocr
+except ImportError:  # optional dependency, the subprocess backend is used instead
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+# Configure pytesseract path
+pytesseract.pytesseract.tesseract_cmd = settings.PYTESSERACT_PATH
+
+
+@dataclass
+class OCRWord:
+    """A recognised word with its bounding box, as reported by Tesseract"""
+    text: str
+    left: int
+    top: int
+    width: int
+    height: int
+    conf: float
+    block: int
+    par: int
+    line: int
+
+    @property
+    def right(self) -> int:
+        return self.left + self.width
+
+    @property
+    def center_y(self) -> float:
+        return self.top + self.height / 2
+
+
+@dataclass(frozen=True)
+class TesseractOptions:
+    """
+    Per-call Tesseract parameters; None leaves Tesseract's default
+    (or, for tessdata_path, the configured TESSDATA_PATH)
+    """
+    oem: Optional[int] = None
+    psm: Optional[int] = None
+    whitelist: Optional[str] = None
+    tessdata_path: Optional[str] = None
+
+    def config_string(self) -> str:
+        """
+        Command line options for the tesseract binary (pytesseract config)
+        """
+        parts = []
+        if self.tessdata_path:
+            parts.append(f'--tessdata-dir "{self.tessdata_path}"')
+        if self.oem is not None:
+            parts.append(f"--oem {self.oem}")
+        if self.psm is not None:
+            parts.append(f"--psm {self.psm}")
+        if self.whitelist:
+            parts.append(f"-c tessedit_char_whitelist={self.whitelist}")
+        return " ".join(parts)
+
+
+DEFAULT_OPTIONS = TesseractOptions()
+
+
+class EngineInitError(RuntimeError):
+    """Raised when a Tesseract API handle cannot be initialised."""
+
+
+class TesseractEnginePool:
+    """
+    Pool of initialised tesserocr API handles, one queue per language,
+    traineddata directory and engine mode.
+
+    Language data is loaded when a handle is created and handles are reused
+    across requests, so each worker process pays the traineddata load once
+    instead of once per image. Page segmentation mode and whitelist are set
+    per call and reset when a handle is returned.
+
+    A key whose handle cannot be initialised (missing traineddata, a wrong
+    tessdata directory) is remembered as unavailable and fails fast from
+    then on; the other keys keep working.
+    """
+
+    def __init__(self, tessdata_path: Optional[str] = None):
+        self.tessdata_path = tessdata_path
+        self._handles: Dict[Tuple[str, Optional[str], Optional[int]], "queue.LifoQueue"] = {}
+        self._unavailable: Dict[Tuple[str, Optional[str], Optional[int]], str] = {}
+        self._lock = threading.Lock()
+
+    def _create_handle(self, lang: str, tessdata_path: Optional[str], oem: Optional[int]):
+        kwargs = {"lang": lang}
+        if tessdata_path:
+            kwargs["path"] = tessdata_path
+        if oem is not None:
+            kwargs["oem"] = tesserocr.OEM(oem)
+        try:
+            return tesserocr.PyTessBaseAPI(**kwargs)
+        except RuntimeError as e:
+            # tesserocr raises RuntimeError when the language data cannot be loaded
+            raise EngineInitError(str(e)) from e
+
+    @contextmanager
+    def acquire(self, lang: str, options: TesseractOptions = DEFAULT_OPTIONS):
+        tessdata_path = options.tessdata_path or self.tessdata_path
+        key = (lang, tessdata_path, options.oem)
+        with self._lock:
+            if key in self._unavailable:
+                raise EngineInitError(self._unavailable[key])
+            free = self._handles.setdefault(key, queue.LifoQueue())
+        try:
+            api = free.get_nowait()
+        except queue.Empty:
+            try:
+                api = self._create_handle(lang, tessdata_path, options.oem)
+            except EngineInitError as e:
+                with self._lock:
+                    self._unavailable[key] = str(e)
+                logger.error(
+                    f"Tesseract engine for '{lang}' (tessdata {tessdata_path or 'default'}, oem {options.oem}) "
+                    f"unavailable, falling back to subprocess for it: {str(e)}"
+                )
+                raise
+            logger.info(f"Initialised Tesseract engine for '{lang}' (tessdata {tessdata_path or 'default'}, oem {options.oem})")
+        if options.psm is not None:
+            api.SetPageSegMode(tesserocr.PSM(options.psm))
+        if options.whitelist:
+            api.SetVariable("tessedit_char_whitelist", options.whitelist)
+        try:
+            yield api
+        finally:
+            api.Clear()
+            if options.psm is not None:
+                api.SetPageSegMode(tesserocr.PSM.AUTO)
+            if options.whitelist:
+                api.SetVariable("tessedit_char_whitelist", "")
+            free.put(api)
+
+    def warm_up(self, lang: str, options: TesseractOptions = DEFAULT_OPTIONS):
+        with self.acquire(lang, options):
+            pass
+
+    def image_to_string(self, img: np.ndarray, lang: str, options: TesseractOptions = DEFAULT_OPTIONS) -> str:
+        with self.acquire(lang, options) as api:
+            _set_image(api, img)
+            return api.GetUTF8Text()
+
+    def image_to_data(self, img: np.ndarray, lang: str,
+                      options: TesseractOptions = DEFAULT_OPTIONS) -> Tuple[str, List[OCRWord]]:
+        with self.acquire(lang, options) as api:
+            _set_image(api, img)
+            api.Recognize()
+            # Reads the results of the recognition above, nothing is recognised twice
+            text = api.GetUTF8Text()
+            return text, _iterate_words(api)
+
+    def close(self):
+        with self._lock:
+            for free in self._handles.values():
+                while not free.empty():
+                    free.get_nowait().End()
+            self._handles.clear()
+
+
+def _set_image(api, img: np.ndarray):
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    img = np.ascontiguousarray(img)
+    height, width = img.shape[:2]
+    bytes_per_pixel = 1 if img.ndim == 2 else img.shape[2]
+    api.SetImageBytes(img.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel)
+
+
+def _iterate_words(api) -> List[OCRWord]:
+    words = []
+    iterator = api.GetIterator()
+    if iterator is None:
+        return words
+    block = par = line = 0
+    for word in tesserocr.iterate_level(iterator, tesserocr.RIL.WORD):
+        if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+            block, par, line = block + 1, 0, 0
+        if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+            par, line = par + 1, 0
+        if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+            line += 1
+        text = word.GetUTF8Text(tesserocr.RIL.WORD)
+        box = word.BoundingBox(tesserocr.RIL.WORD)
+        if not text or box is None:
+            continue
+        x1, y1, x2, y2 = box
+        words.append(OCRWord(text, x1, y1, x2 - x1, y2 - y1, word.Confidence(tesserocr.RIL.WORD), block, par, line))
+    return words
+
+
+def words_from_tsv(data: Dict[str, list]) -> List[OCRWord]:
+    """
+    Word level rows of pytesseract's image_to_data dict output
+    """
+    words = []
+    for i, level in enumerate(data["level"]):
+        text = str(data["text"][i]).strip()
+        if level != 5 or not text:
+            continue
+        words.append(OCRWord(
+            text=text,
+            left=int(data["left"][i]),
+            top=int(data["top"][i]),
+            width=int(data["width"][i]),
+            height=int(data["height"][i]),
+            conf=float(data["conf"][i]),
+            block=int(data["block_num"][i]),
+            par=int(data["par_num"][i]),
+            line=int(data["line_num"][i]),
+        ))
+    return words
+
+
+def text_from_words(words: List[OCRWord]) -> str:
+    """
+    Rebuild plain text from words the way Tesseract lays out its text output:
+    one line per text line and a blank line between paragraphs
+    """
+    lines = []
+    previous = None
+    for word in words:
+        key = (word.block, word.par, word.line)
+        if previous is None or key != previous:
+            if previous is not None and key[:2] != previous[:2]:
+                lines.append("")
+            lines.append(word.text)
+        else:
+            lines[-1] += " " + word.text
+        previous = key
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _resolve_backend() -> str:
+    backend = settings.OCR_ENGINE
+    if backend not in ("auto", "tesserocr", "subprocess"):
+        raise ValueError(f"Unsupported OCR engine: {backend}")
+    if backend == "subprocess":
+        return backend
+    if tesserocr is None:
+        if backend == "tesserocr":
+            logger.warning("tesserocr is not installed, falling back to the tesseract subprocess")
+        return "subprocess"
+    return "tesserocr"
+
+
+engine_backend = _resolve_backend()
+engine_pool = TesseractEnginePool(settings.TESSDATA_PATH) if engine_backend == "tesserocr" else None
+
+
+def warm_up():
+    """
+    Load language data into this process' engine pool (process pool initializer)
+    """
+    if engine_pool is None:
+        return
+    try:
+        engine_pool.warm_up(settings.OCR_LANG)
+    except EngineInitError:
+        # Logged by the pool, OCR with these models uses the subprocess
+        pass
+
+
+def image_to_string(img: np.ndarray, lang: str = settings.OCR_LANG, backend: Optional[str] = None,
+                    options: TesseractOptions = DEFAULT_OPTIONS) -> str:
+    """
+    Run OCR on a preprocessed image with the configured backend.
+    backend forces "tesserocr" or "subprocess" for a single call.
+    """
+    backend = backend or engine_backend
+    if backend == "tesserocr" and engine_pool is not None:
+        try:
+            return engine_pool.image_to_string(img, lang, options)
+        except EngineInitError:
+            # Only these models are unavailable in the pool
+            pass
+    return pytesseract.image_to_string(img, lang=lang, config=options.config_string())
+
+
+def image_to_data(img: np.ndarray, lang: str = settings.OCR_LANG, backend: Optional[str] = None,
+                  options: TesseractOptions = DEFAULT_OPTIONS) -> Tuple[str, List[OCRWord]]:
+    """
+    Run OCR once and return both the plain text and the word boxes
+    """
+    backend = backend or engine_backend
+    if backend == "tesserocr" and engine_pool is not None:
+        try:
+            return engine_pool.image_to_data(img, lang, options)
+        except EngineInitError:
+            # Only these models are unavailable in the pool
+            pass
+    data = pytesseract.image_to_data(img, lang=lang, config=options.config_string(),
+                                     output_type=pytesseract.Output.DICT)
+    words = words_from_tsv(data)
+    return text_from_words(words), words
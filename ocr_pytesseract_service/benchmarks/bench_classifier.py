@@ -0,0 +1,92 @@
+"""
+False-reject rate and CPU saved by the receipt pre-classifier.
+
+The corpus directory holds two labelled folders:
+    corpus/receipt/   receipt photos and scans
+    corpus/other/     anything else users upload
+Run from the service directory:
+    python -m benchmarks.bench_classifier corpus/ --ocr
+--ocr also times the full OCR pipeline on every image to measure the CPU
+that rejected uploads no longer use; without it only the classifier runs.
+Without a corpus, synthetic images are rendered.
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from app.services.ocr_services import ocr_image_buffer
+from app.services.receipt_classifier import classify_upload
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp")
+
+
+def synthetic_corpus(count: int = 10) -> Dict[str, List[bytes]]:
+    rng = np.random.default_rng(0)
+    corpus = {"receipt": [], "other": []}
+    for i in range(count):
+        photo = np.full((3000, 2000, 3), rng.integers(40, 140, 3), np.uint8)
+        paper = np.full((2600, 900, 3), 235, np.uint8)
+        for line in range(int(rng.integers(8, 45))):
+            text = f"ITEM {rng.integers(100, 999)} {rng.integers(1, 5)} x {rng.uniform(10, 500):.2f}"
+            cv2.putText(paper, text, (30, 80 + line * 55), cv2.FONT_HERSHEY_SIMPLEX, 1.3, (20, 20, 20), 3)
+        photo[200:2800, 550:1450] = paper
+        corpus["receipt"].append(cv2.imencode(".jpg", photo)[1].tobytes())
+
+        scene = cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (2000, 1500), interpolation=cv2.INTER_CUBIC)
+        scene = np.clip(cv2.GaussianBlur(scene, (0, 0), 5) + rng.normal(0, 20, scene.shape), 0, 255).astype(np.uint8)
+        corpus["other"].append(cv2.imencode(".jpg", scene)[1].tobytes())
+    return corpus
+
+
+def load_corpus(directory: Path) -> Dict[str, List[bytes]]:
+    corpus = {}
+    for label in ("receipt", "other"):
+        folder = directory / label
+        if not folder.is_dir():
+            raise SystemExit(f"Missing {folder}")
+        corpus[label] = [path.read_bytes() for path in sorted(folder.iterdir()) if path.suffix.lower() in IMAGE_SUFFIXES]
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", type=Path, help="Directory with receipt/ and other/ folders")
+    parser.add_argument("--ocr", action="store_true", help="Also time full OCR to measure the CPU saved")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    classify_ms, ocr_ms = [], {}
+    rejected = {label: 0 for label in corpus}
+    for label, uploads in corpus.items():
+        ocr_ms[label] = []
+        for contents in uploads:
+            start = time.perf_counter()
+            classification = classify_upload(contents)
+            classify_ms.append((time.perf_counter() - start) * 1000)
+            if classification is not None and not classification.is_receipt_like:
+                rejected[label] += 1
+            if args.ocr:
+                start = time.perf_counter()
+                ocr_image_buffer(np.frombuffer(contents, np.uint8))
+                ocr_ms[label].append((time.perf_counter() - start) * 1000)
+
+    receipts, others = len(corpus["receipt"]), len(corpus["other"])
+    print(f"{receipts} receipts, {others} other images")
+    print(f"classifier: mean {statistics.fmean(classify_ms):.1f} ms per upload")
+    print(f"false rejects: {rejected['receipt']}/{receipts} ({rejected['receipt'] / max(1, receipts):.1%})")
+    print(f"non-receipts rejected: {rejected['other']}/{others} ({rejected['other'] / max(1, others):.1%})")
+    if args.ocr and ocr_ms["other"]:
+        other_ocr = statistics.fmean(ocr_ms["other"])
+        saved = rejected["other"] * other_ocr - sum(classify_ms)
+        print(f"OCR of a non-receipt: mean {other_ocr:.1f} ms")
+        print(f"CPU saved on this corpus: {saved / 1000:.2f} s "
+              f"(rejections minus the classifier's cost on every upload)")
+
+
+if __name__ == "__main__":
+    main()
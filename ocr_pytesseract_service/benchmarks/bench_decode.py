@@ -0,0 +1,81 @@
+"""
+Latency and memory saved by the greyscale, pixel-budgeted decode stage
+compared to the full-resolution colour decode it replaced.
+
+Both paths are timed up to a thresholded image ready for Tesseract:
+    full     cv2.IMREAD_COLOR, grey conversion, Otsu
+    budget   decode_image (reduced JPEG decode, budget, text scale), Otsu
+Run from the service directory:
+    python -m benchmarks.bench_decode photos/*.jpg --runs 5
+Without image paths 12 MP phone-photo sized receipts are rendered.
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.decode import decode_image
+
+
+def synthetic_photos(count: int = 4) -> List[bytes]:
+    rng = np.random.default_rng(0)
+    photos = []
+    for _ in range(count):
+        photo = np.full((4000, 3000, 3), rng.integers(40, 140, 3), np.uint8)
+        paper = np.full((3600, 1400, 3), 235, np.uint8)
+        for line in range(60):
+            text = f"ITEM {rng.integers(100, 999)} {rng.integers(1, 5)} x {rng.uniform(10, 500):.2f}"
+            cv2.putText(paper, text, (40, 80 + line * 58), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (20, 20, 20), 3)
+        photo[200:3800, 800:2200] = paper
+        photos.append(cv2.imencode(".jpg", photo, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+    return photos
+
+
+def full_decode(buffer: np.ndarray) -> int:
+    img = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=gray)
+    return img.nbytes + gray.nbytes
+
+
+def budget_decode(buffer: np.ndarray) -> int:
+    gray, _ = decode_image(buffer)
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=gray)
+    return gray.nbytes
+
+
+def measure(decode: Callable[[np.ndarray], int], buffers: List[np.ndarray], runs: int):
+    timings, allocated = [], []
+    for _ in range(runs):
+        for buffer in buffers:
+            start = time.perf_counter()
+            allocated.append(decode(buffer))
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), statistics.fmean(allocated) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", type=Path)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    uploads = [path.read_bytes() for path in args.images] if args.images else synthetic_photos()
+    buffers = [np.frombuffer(contents, np.uint8) for contents in uploads]
+    full_ms, full_mb = measure(full_decode, buffers, args.runs)
+    budget_ms, budget_mb = measure(budget_decode, buffers, args.runs)
+
+    print(f"{len(buffers)} images, OCR_DECODE_MAX_PIXELS={settings.OCR_DECODE_MAX_PIXELS}, "
+          f"OCR_TARGET_LINE_HEIGHT={settings.OCR_TARGET_LINE_HEIGHT}")
+    print(f"full colour decode: p50 {full_ms:.1f} ms, {full_mb:.1f} MB of arrays")
+    print(f"budgeted decode:    p50 {budget_ms:.1f} ms, {budget_mb:.1f} MB of arrays")
+    print(f"saved per upload:   {full_ms - budget_ms:.1f} ms, {full_mb - budget_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare per-image OCR latency of the tesseract subprocess backend and the
+persistent tesserocr engine pool.
+
+Run from the service directory:
+    python -m benchmarks.bench_engines receipts/*.jpg --runs 10
+Without image paths a synthetic receipt is rendered.
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services import tesseract_engine
+from app.services.ocr_services import preprocess_image
+
+
+def synthetic_receipt(lines: int = 30) -> np.ndarray:
+    img = np.full((60 + lines * 32, 640, 3), 255, np.uint8)
+    for i in range(lines):
+        text = f"ITEM {i:03d}  {i % 5 + 1} x {12.5 * (i + 1):.2f}  {12.5 * (i + 1) * (i % 5 + 1):.2f}"
+        cv2.putText(img, text, (20, 50 + i * 32), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+    return img
+
+
+def load_images(paths: List[str]) -> List[np.ndarray]:
+    if not paths:
+        return [preprocess_image(synthetic_receipt())]
+    images = []
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            raise SystemExit(f"Could not read image: {path}")
+        images.append(preprocess_image(img))
+    return images
+
+
+def measure(ocr: Callable[[np.ndarray], str], images: List[np.ndarray], runs: int) -> Dict[str, float]:
+    # One untimed pass so both backends start warm (page cache, engine init)
+    for img in images:
+        ocr(img)
+    timings = []
+    for _ in range(runs):
+        for img in images:
+            start = time.perf_counter()
+            ocr(img)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "mean": statistics.fmean(timings),
+        "p50": timings[len(timings) // 2],
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="Receipt images to OCR")
+    parser.add_argument("--runs", type=int, default=5, help="Timed passes over all images")
+    parser.add_argument("--lang", default=settings.OCR_LANG)
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    backends = {
+        "subprocess": lambda img: tesseract_engine.image_to_string(img, args.lang, backend="subprocess"),
+    }
+    if tesseract_engine.tesserocr is not None:
+        pool = tesseract_engine.TesseractEnginePool(settings.TESSDATA_PATH)
+        backends["tesserocr"] = lambda img: pool.image_to_string(img, args.lang)
+    else:
+        print("tesserocr is not installed, only the subprocess backend is measured")
+
+    print(f"{'backend':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, ocr in backends.items():
+        result = measure(ocr, images, args.runs)
+        print(f"{name:<12}{result['mean']:>10.1f}{result['p50']:>10.1f}{result['p95']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of parse_receipt_data on long synthetic receipts.
+
+Run from the service directory:
+    python -m benchmarks.bench_parser --lines 400 --runs 200
+    python -m benchmarks.bench_parser --layout x5   # a chain parsed by its template
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.ocr_services import parse_receipt_data
+
+PRODUCTS = ["Хлеб белый", "Молоко 3.2%", "Сыр российский", "Яблоки", "Чай черный", "Кофе молотый", "Вода", "Пакет"]
+
+
+def long_receipt(lines: int, seed: int = 0) -> str:
+    """
+    Receipt text with a header, item rows in the layouts the parser knows and a footer
+    """
+    rng = random.Random(seed)
+    rows = ["ООО \"РОМАШКА\"", "г. Москва, ул. Ленина 1", "ИНН 7700000000", "КАССОВЫЙ ЧЕК", "Дата 12.03.2024 14:22"]
+    for i in range(lines):
+        product = rng.choice(PRODUCTS)
+        quantity = rng.randint(1, 5)
+        price = rng.randint(10, 999) + rng.randint(0, 99) / 100
+        layout = i % 3
+        if layout == 0:
+            rows.append(f"{product} {quantity} {price * quantity:.2f}")
+        elif layout == 1:
+            rows.append(product)
+            rows.append(f"{price:.2f} {price * quantity:.2f}")
+        else:
+            rows.append(f"{product} арт. {rng.randint(1000, 9999)} скидка не применялась")
+    rows += ["ИТОГО: 12345.67", "НДС: 1234.56", "Скидка: 10,00", "Спасибо за покупку!"]
+    return "\n".join(rows)
+
+
+def x5_receipt(lines: int, seed: int = 0) -> str:
+    """
+    Receipt text in the X5 layout, recognised by the "x5" template
+    """
+    rng = random.Random(seed)
+    rows = ["ООО \"АГРОТОРГ\"", "Магазин \"Пятёрочка\"", "ИНН 7825706086", "КАССОВЫЙ ЧЕК", "Приход"]
+    for _ in range(lines):
+        quantity = rng.randint(1, 5)
+        price = rng.randint(10, 999) + rng.randint(0, 99) / 100
+        rows.append(rng.choice(PRODUCTS))
+        rows.append(f"{quantity} X {price:.2f} ={price * quantity:.2f}")
+    rows += ["ИТОГ =12345.67", "Дата 12.03.2024 14:22"]
+    return "\n".join(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=400, help="Item rows per receipt")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--layout", choices=["generic", "x5"], default="generic",
+                        help="generic: unknown shop parsed by the heuristics, x5: chain template")
+    args = parser.parse_args()
+
+    text = x5_receipt(args.lines) if args.layout == "x5" else long_receipt(args.lines)
+    parse_receipt_data(text)
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        parse_receipt_data(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(
+        f"{len(text.splitlines())} lines: mean {statistics.fmean(timings):.3f} ms, "
+        f"p50 {timings[len(timings) // 2]:.3f} ms, p95 {timings[int(len(timings) * 0.95)]:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
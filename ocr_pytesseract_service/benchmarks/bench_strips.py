@@ -0,0 +1,49 @@
+"""
+Compare wall-clock OCR latency of a tall receipt recognised in one call and
+as parallel strips.
+
+Run from the service directory:
+    python -m benchmarks.bench_strips long_receipt.jpg --runs 5
+Without an image path a 200-line synthetic receipt is rendered.
+"""
+import argparse
+
+import cv2
+
+from app.core.config import settings
+from app.services import tesseract_engine
+from app.services.ocr_services import preprocess_image
+from app.services.strip_ocr import find_strip_bounds, ocr_strips
+from benchmarks.bench_engines import measure, synthetic_receipt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image", nargs="?", help="Tall receipt image to OCR")
+    parser.add_argument("--runs", type=int, default=3, help="Timed passes")
+    parser.add_argument("--strip-height", type=int, default=settings.OCR_STRIP_HEIGHT)
+    parser.add_argument("--lang", default=settings.OCR_LANG)
+    args = parser.parse_args()
+
+    if args.image:
+        img = cv2.imread(args.image, cv2.IMREAD_COLOR)
+        if img is None:
+            raise SystemExit(f"Could not read image: {args.image}")
+    else:
+        img = synthetic_receipt(lines=200)
+    img = preprocess_image(img)
+    bounds = find_strip_bounds(img, args.strip_height, 2 * (settings.OCR_TARGET_LINE_HEIGHT or 40))
+
+    print(f"{img.shape[1]}x{img.shape[0]} image, {len(bounds)} strips, {settings.OCR_STRIP_WORKERS} strip workers")
+    variants = {
+        "single": lambda page: tesseract_engine.image_to_string(page, args.lang),
+        "strips": lambda page: ocr_strips(page, bounds, args.lang)[0],
+    }
+    print(f"{'variant':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, ocr in variants.items():
+        result = measure(ocr, [img], args.runs)
+        print(f"{name:<12}{result['mean']:>10.1f}{result['p50']:>10.1f}{result['p95']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Benchmark suite of the receipt pipeline on the synthetic Russian corpus
+(benchmarks/corpus.py), compared against a stored baseline.
+
+Measures, per receipt:
+  parse       parse_receipt_data on the ground truth text
+  preprocess  decode and preprocessing of the tier, per stage
+  end_to_end  process_receipt_bytes without the result cache, per stage
+              (classify, decode, qr, preprocessing stages, ocr, parse)
+and reports p50/p95 latency, end-to-end throughput, the share of receipts
+whose total was read correctly and peak RSS of this process and of the
+tesseract processes it started. Needs only the tesseract binary;
+--no-ocr skips end_to_end and runs without it.
+
+Run from the service directory:
+    python -m benchmarks.bench_suite --save-baseline   # record benchmarks/baseline.json on this machine
+    python -m benchmarks.bench_suite                   # compare a change against it
+    python -m benchmarks.bench_suite --check           # exit 1 when a metric regressed
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import ocr_services
+from app.services.decode import decode_image
+from app.services.ocr_tiers import OCR_TIERS, get_tier
+from app.services.preprocessing import resolve_spec, run_pipeline
+from app.services.receipt_parser import parse_receipt_data
+from benchmarks.corpus import SyntheticReceipt, generate_corpus
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+# Timing changes smaller than this are run-to-run noise, whatever the percentage
+MIN_REGRESSION_MS = 1.0
+
+
+def summarise(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+def stage_summary(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    stages: Dict[str, List[float]] = {}
+    for timings in runs:
+        for stage, ms in timings.items():
+            stages.setdefault(stage, []).append(ms)
+    return {stage: summarise(samples) for stage, samples in stages.items()}
+
+
+def bench_parse(corpus: List[SyntheticReceipt], runs: int) -> Dict[str, Any]:
+    samples = []
+    for _ in range(runs):
+        for receipt in corpus:
+            start = time.perf_counter()
+            parse_receipt_data(receipt.text)
+            samples.append((time.perf_counter() - start) * 1000)
+    return summarise(samples)
+
+
+def bench_preprocess(corpus: List[SyntheticReceipt], runs: int, tier: Optional[str]) -> Dict[str, Any]:
+    spec = resolve_spec(None, get_tier(tier).preprocessing)
+    totals, stages = [], []
+    for _ in range(runs):
+        for receipt in corpus:
+            start = time.perf_counter()
+            img, decode_info = decode_image(np.frombuffer(receipt.data, np.uint8))
+            result = run_pipeline(img, spec)
+            totals.append((time.perf_counter() - start) * 1000)
+            stages.append({"decode": decode_info.decode_ms, **result.timings})
+    return {**summarise(totals), "stages": stage_summary(stages)}
+
+
+def bench_end_to_end(corpus: List[SyntheticReceipt], runs: int, tier: Optional[str]) -> Dict[str, Any]:
+    # Every run must do the work: no cached results, no process pool start-up in the timings
+    ocr_services.receipt_cache = None
+    ocr_services.ocr_executor.mode = "thread"
+
+    async def run_corpus():
+        totals, stages, correct = [], [], 0
+        for receipt in corpus:
+            timings: Dict[str, float] = {}
+            start = time.perf_counter()
+            result = await ocr_services.process_receipt_bytes(receipt.data, timings, tier=tier)
+            totals.append((time.perf_counter() - start) * 1000)
+            stages.append(timings)
+            correct += result["total_amount"] == receipt.expected["total_amount"]
+        return totals, stages, correct
+
+    # Untimed pass: tesseract models and page cache warm
+    asyncio.run(run_corpus())
+    totals, stages, correct = [], [], 0
+    start = time.perf_counter()
+    for _ in range(runs):
+        run_totals, run_stages, run_correct = asyncio.run(run_corpus())
+        totals += run_totals
+        stages += run_stages
+        correct += run_correct
+    elapsed = time.perf_counter() - start
+    return {
+        **summarise(totals),
+        "throughput_per_s": round(len(totals) / elapsed, 3),
+        "total_accuracy": round(correct / len(totals), 3),
+        "stages": stage_summary(stages),
+    }
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in kilobytes on Linux; children are the tesseract subprocesses
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def flatten(report: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    values = {}
+    for key, value in report.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            values[f"{prefix}{key}"] = value
+    return values
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Print every metric against the baseline, returns the regressed ones.
+    Throughput and accuracy regress when they drop, everything else when it grows.
+    """
+    if baseline["config"] != current["config"]:
+        print(f"Warning: baseline was recorded with {baseline['config']}, not {current['config']}")
+    now, before = flatten(current["results"]), flatten(baseline["results"])
+    regressions = []
+    print(f"{'metric':<44}{'baseline':>12}{'current':>12}{'change':>9}")
+    for metric in sorted(now.keys() & before.keys()):
+        old, new = before[metric], now[metric]
+        change = (new - old) / old if old else 0.0
+        higher_is_better = metric.endswith(("throughput_per_s", "total_accuracy"))
+        noisy = metric.endswith("_ms") and abs(new - old) < MIN_REGRESSION_MS
+        regressed = not noisy and (change < -tolerance if higher_is_better else change > tolerance)
+        if regressed:
+            regressions.append(metric)
+        print(f"{metric:<44}{old:>12.3f}{new:>12.3f}{change:>+9.1%}" + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=12, help="Synthetic receipts in the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=3, help="Timed passes over the corpus")
+    parser.add_argument("--tier", choices=list(OCR_TIERS), help="OCR tier, OCR_DEFAULT_TIER if unset")
+    parser.add_argument("--no-ocr", action="store_true", help="Skip end_to_end, for machines without tesseract")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change counted as a regression")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 when a metric regressed")
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.count, args.seed)
+    print(f"{len(corpus)} synthetic receipts, {args.runs} runs, tier {get_tier(args.tier).name}")
+
+    results = {"parse": bench_parse(corpus, args.runs * 10), "preprocess": bench_preprocess(corpus, args.runs, args.tier)}
+    if not args.no_ocr:
+        results["end_to_end"] = bench_end_to_end(corpus, args.runs, args.tier)
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    report = {
+        "config": {
+            "count": args.count, "seed": args.seed, "tier": get_tier(args.tier).name,
+            "lang": settings.OCR_LANG, "engine": settings.OCR_ENGINE, "ocr": not args.no_ocr,
+        },
+        "machine": {"platform": platform.platform(), "python": platform.python_version()},
+        "results": results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(json.dumps(results, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(json.dumps(results, indent=2))
+        print(f"No baseline at {args.baseline}, record one with --save-baseline")
+        return
+
+    regressions = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+    print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}" if regressions else "No regressions")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Latency and accuracy of each OCR tier (see app/services/ocr_tiers.py).
+
+Accuracy is character accuracy against ground truth text, 1 - edit distance
+divided by the ground truth length, after collapsing whitespace.
+
+Run from the service directory:
+    python -m benchmarks.bench_tiers receipts/ --runs 3
+where receipts/ holds images with ground truth next to them (a.jpg + a.txt).
+Without a directory synthetic receipts are rendered.
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.ocr_services import ocr_image_buffer
+from app.services.ocr_tiers import OCR_TIERS
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".tif", ".tiff")
+
+
+def synthetic_corpus(count: int = 5) -> List[Tuple[np.ndarray, str]]:
+    corpus = []
+    for seed in range(count):
+        rng = np.random.default_rng(seed)
+        lines = [f"ITEM {rng.integers(100, 999)} {rng.integers(1, 5)} x {rng.uniform(10, 500):.2f}" for _ in range(25)]
+        img = np.full((80 + len(lines) * 36, 720), 255, np.uint8)
+        for i, line in enumerate(lines):
+            cv2.putText(img, line, (20, 50 + i * 36), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+        # Mild blur and noise, as in a phone photo
+        img = cv2.GaussianBlur(img, (3, 3), 0)
+        img = np.clip(img + rng.normal(0, 8, img.shape), 0, 255).astype(np.uint8)
+        corpus.append((cv2.imencode(".png", img)[1], "\n".join(lines)))
+    return corpus
+
+
+def load_corpus(directory: Path) -> List[Tuple[np.ndarray, str]]:
+    corpus = []
+    for path in sorted(directory.iterdir()):
+        truth = path.with_suffix(".txt")
+        if path.suffix.lower() in IMAGE_SUFFIXES and truth.exists():
+            corpus.append((np.fromfile(path, np.uint8), truth.read_text(encoding="utf-8")))
+    if not corpus:
+        raise SystemExit(f"No images with ground truth in {directory}")
+    return corpus
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def character_accuracy(text: str, truth: str) -> float:
+    text, truth = " ".join(text.split()), " ".join(truth.split())
+    return max(0.0, 1 - edit_distance(text, truth) / max(1, len(truth)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", type=Path, help="Directory of images with .txt ground truth")
+    parser.add_argument("--runs", type=int, default=3, help="Timed passes over the corpus")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    print(f"{len(corpus)} images, {args.runs} runs")
+    print(f"{'tier':<10}{'mean ms':>10}{'p95 ms':>10}{'accuracy':>10}")
+    for name in OCR_TIERS:
+        # Untimed pass: loads the tier's models
+        ocr_image_buffer(corpus[0][0], tier=name)
+        timings, accuracy = [], []
+        for _ in range(args.runs):
+            for buffer, truth in corpus:
+                start = time.perf_counter()
+                result = ocr_image_buffer(buffer, tier=name)
+                timings.append((time.perf_counter() - start) * 1000)
+                accuracy.append(character_accuracy(result.text, truth))
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{name:<10}{statistics.fmean(timings):>10.1f}{p95:>10.1f}{statistics.fmean(accuracy):>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Synthetic Russian receipts for the benchmarks: rendered in a monospace font
+like a receipt printer, with known text and fields, as clean scans or as phone
+photos (background, skew, blur, sensor noise), of varying length.
+
+Write a corpus to disk, as images with .txt ground truth for bench_tiers:
+    python -m benchmarks.corpus out/ --count 20
+"""
+import argparse
+import os
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Fonts with Cyrillic glyphs found on common Linux distributions; BENCH_FONT overrides
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
+    "/usr/share/fonts/TTF/DejaVuSansMono.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSansMono.ttf",
+    "/usr/share/fonts/dejavu-sans-mono-fonts/DejaVuSansMono.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationMono-Regular.ttf",
+    "/usr/share/fonts/liberation-mono/LiberationMono-Regular.ttf",
+    "/usr/share/fonts/truetype/freefont/FreeMono.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansMono-Regular.ttf",
+)
+
+PRODUCTS = [
+    "Хлеб белый", "Молоко пастер.", "Сыр Российский", "Яблоки Гала", "Чай черный", "Кофе молотый",
+    "Вода питьевая", "Пакет-майка", "Сахар-песок", "Гречка ядрица", "Масло сливочное", "Кефир",
+]
+SHOPS = ['ООО "РОМАШКА"', 'ИП Иванов И.И.', 'ООО "ПРОДУКТЫ У ДОМА"', 'АО "ТОРГОВЫЙ ДОМ"']
+
+# Paper width of an 80 mm receipt printer at 203 dpi
+PAPER_WIDTH = 576
+FONT_SIZE = 22
+LINE_HEIGHT = 30
+
+# Degradations per profile
+PROFILES = {
+    # Flatbed scan: straight, sharp, a little noise
+    "scan": {"background": None, "skew": 0.0, "blur": 0.0, "noise": 4.0, "scale": 1.0},
+    # Phone photo: paper on a table, rotated, slightly out of focus, upscaled to camera resolution
+    "photo": {"background": 70, "skew": 4.0, "blur": 1.2, "noise": 10.0, "scale": 1.8},
+}
+
+
+@dataclass
+class SyntheticReceipt:
+    name: str
+    # Encoded image, PNG for scans and JPEG for photos
+    data: bytes
+    # Text as printed, the OCR ground truth
+    text: str
+    # What parse_receipt_data should find
+    expected: Dict[str, Any] = field(default_factory=dict)
+
+
+def find_font(size: int = FONT_SIZE) -> ImageFont.FreeTypeFont:
+    path = os.getenv("BENCH_FONT") or next((path for path in FONT_CANDIDATES if os.path.exists(path)), None)
+    if path is None:
+        raise SystemExit("No font with Cyrillic glyphs found, install fonts-dejavu-core or set BENCH_FONT")
+    return ImageFont.truetype(path, size)
+
+
+def receipt_lines(rng: random.Random, items: int) -> List[str]:
+    lines = [rng.choice(SHOPS), "г. Москва, ул. Ленина, д. 1", f"ИНН {rng.randint(10**9, 10**10 - 1)}",
+             "КАССОВЫЙ ЧЕК", "Приход"]
+    total = 0.0
+    for _ in range(items):
+        quantity = rng.randint(1, 5)
+        price = rng.randint(20, 999) + rng.choice([0, 0.5, 0.9, 0.99])
+        total += quantity * price
+        lines.append(f"{rng.choice(PRODUCTS):<20}{quantity:>3} {quantity * price:>10.2f}")
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    lines += [
+        "-" * 34,
+        f"ИТОГО: {total:.2f}",
+        f"НДС 20%: {total / 6:.2f}",
+        f"{day:02d}.{month:02d}.2024 {rng.randint(8, 21):02d}:{rng.randint(0, 59):02d}",
+        "Спасибо за покупку!",
+    ]
+    return lines
+
+
+def render(lines: Sequence[str], font: ImageFont.FreeTypeFont) -> np.ndarray:
+    paper = Image.new("L", (PAPER_WIDTH, 40 + len(lines) * LINE_HEIGHT), 245)
+    draw = ImageDraw.Draw(paper)
+    for i, line in enumerate(lines):
+        draw.text((16, 20 + i * LINE_HEIGHT), line, font=font, fill=25)
+    return np.asarray(paper).copy()
+
+
+def degrade(paper: np.ndarray, profile: Dict[str, Any], rng: random.Random) -> np.ndarray:
+    img = paper
+    if profile["background"] is not None:
+        # Paper on a darker table with a margin around it
+        margin = PAPER_WIDTH // 4
+        img = cv2.copyMakeBorder(img, margin, margin, margin, margin, cv2.BORDER_CONSTANT,
+                                 value=profile["background"])
+    if profile["skew"]:
+        angle = rng.uniform(-profile["skew"], profile["skew"])
+        height, width = img.shape
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        img = cv2.warpAffine(img, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                             borderValue=profile["background"] or 245)
+    if profile["scale"] != 1.0:
+        img = cv2.resize(img, None, fx=profile["scale"], fy=profile["scale"], interpolation=cv2.INTER_CUBIC)
+    if profile["blur"]:
+        img = cv2.GaussianBlur(img, (0, 0), profile["blur"])
+    noise = np.random.default_rng(rng.randint(0, 2**32 - 1)).normal(0, profile["noise"], img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def generate_corpus(count: int = 12, seed: int = 0, profiles: Sequence[str] = ("scan", "photo"),
+                    lengths: Sequence[int] = (8, 25, 80)) -> List[SyntheticReceipt]:
+    """
+    count receipts cycling through the profiles and item counts, the same for the same seed
+    """
+    font = find_font()
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(count):
+        profile = profiles[index % len(profiles)]
+        items = lengths[index // len(profiles) % len(lengths)]
+        lines = receipt_lines(rng, items)
+        img = degrade(render(lines, font), PROFILES[profile], rng)
+        if profile == "scan":
+            data = cv2.imencode(".png", img)[1].tobytes()
+        else:
+            data = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+        total = float(lines[-4].split()[-1])
+        day, month, year = lines[-2].split()[0].split(".")
+        corpus.append(SyntheticReceipt(
+            name=f"{index:03d}-{profile}-{items}",
+            data=data,
+            text="\n".join(lines),
+            expected={"total_amount": total, "bill_date": f"{year}-{month}-{day}", "items": items},
+        ))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", type=Path, help="Directory for the images and their .txt ground truth")
+    parser.add_argument("--count", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    for receipt in generate_corpus(args.count, args.seed):
+        suffix = ".png" if "-scan-" in receipt.name else ".jpg"
+        (args.output / receipt.name).with_suffix(suffix).write_bytes(receipt.data)
+        (args.output / receipt.name).with_suffix(".txt").write_text(receipt.text, encoding="utf-8")
+    print(f"Wrote {args.count} receipts to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Offline bulk OCR of a receipt archive: a directory tree or a tarball of images,
+PDFs and TIFFs, processed on all cores into a JSONL file with one line per file.
+
+The output is the checkpoint: lines are fsynced every --checkpoint-every files
+and files already in it are skipped, so an interrupted run is continued by
+running the same command again.
+
+Run from the service directory:
+    python bulk_ocr.py /data/receipts -o receipts.jsonl
+    python bulk_ocr.py /data/receipts-2023.tar.gz -o receipts.jsonl --tier fast
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple, Union
+
+from app.core.config import settings
+from app.services import ocr_services, tesseract_engine
+from app.services.ocr_tiers import OCR_TIERS
+
+logger = logging.getLogger("bulk_ocr")
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff", ".pdf"}
+
+# A file to process: its name in the output and either its path or, for tar
+# members, its contents
+SourceItem = Tuple[str, Union[str, bytes]]
+
+
+def load_completed(output: Path, retry_errors: bool = False) -> Set[str]:
+    """
+    Names of the files already in the output. A line cut off by an interrupted
+    run is removed, so that appending continues on a fresh line. With
+    retry_errors the error lines are removed too, their files are processed
+    again and get a single line in the output.
+    """
+    if not output.exists():
+        return set()
+    with open(output, "rb+") as file:
+        data = file.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            logger.warning(f"Dropping incomplete last line of {output}")
+            file.truncate(end)
+
+    completed = set()
+    kept, retried = [], 0
+    for line in data[:end].decode("utf-8").splitlines(keepends=True):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if retry_errors and "error" in record:
+            retried += 1
+            continue
+        completed.add(record["file"])
+        kept.append(line)
+
+    if retried:
+        # Written next to the output and renamed over it, an interruption leaves either file whole
+        rewritten = output.with_name(output.name + ".tmp")
+        with open(rewritten, "w", encoding="utf-8") as file:
+            file.writelines(kept)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(rewritten, output)
+        logger.info(f"Retrying {retried} files that failed in earlier runs")
+    return completed
+
+
+def iter_source(source: Path, completed: Set[str]) -> Iterator[SourceItem]:
+    """
+    Files of a directory tree (sorted, as paths) or of a tarball (in archive
+    order, as contents) that are not completed yet
+    """
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            name = path.relative_to(source).as_posix()
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS and name not in completed:
+                yield name, str(path)
+        return
+
+    # Streaming mode: members are read in order without seeking, also for .tar.gz
+    with tarfile.open(source, "r|*") as archive:
+        for member in archive:
+            if (not member.isfile() or member.name in completed
+                    or Path(member.name).suffix.lower() not in IMAGE_EXTENSIONS):
+                continue
+            yield member.name, archive.extractfile(member).read()
+
+
+def init_worker():
+    """
+    Files are processed in parallel, one per worker, so the OCR of a single
+    file stays on this worker's core and no results are cached
+    """
+    settings.OCR_STRIP_WORKERS = 1
+    settings.OCR_DOCUMENT_CONCURRENCY = 1
+    ocr_services.ocr_executor.mode = "thread"
+    ocr_services.receipt_cache = None
+    tesseract_engine.warm_up()
+
+
+def process_file(name: str, source: Union[str, bytes], tier: Optional[str] = None) -> Dict[str, Any]:
+    """
+    OCR and parse one file, the output line for it. Runs in the worker processes.
+    """
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    try:
+        contents = Path(source).read_bytes() if isinstance(source, str) else source
+        result = asyncio.run(ocr_services.process_receipt_bytes(contents, timings, tier=tier))
+        record = {"file": name, "result": result}
+    except Exception as e:
+        record = {"file": name, "error": f"{type(e).__name__}: {str(e)}"}
+    record["timings"] = timings
+    record["ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return record
+
+
+class JSONLWriter:
+    """Appends output lines and fsyncs them every checkpoint_every lines"""
+
+    def __init__(self, path: Path, checkpoint_every: int):
+        self.file = open(path, "a", encoding="utf-8")
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.unsynced = 0
+        self.written = 0
+        self.errors = 0
+        self.durations = []
+
+    def write(self, record: Dict[str, Any]):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.written += 1
+        self.errors += "error" in record
+        self.durations.append(record["ms"])
+        self.unsynced += 1
+        if self.unsynced >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        self.checkpoint()
+        self.file.close()
+
+
+def run(source: Path, output: Path, workers: int, tier: Optional[str] = None,
+        retry_errors: bool = False, checkpoint_every: int = 100) -> JSONLWriter:
+    """
+    Process every file of source not yet in output. workers=0 processes the
+    files in this process, one at a time.
+    """
+    completed = load_completed(output, retry_errors)
+    if completed:
+        logger.info(f"Resuming: {len(completed)} files already in {output}")
+
+    writer = JSONLWriter(output, checkpoint_every)
+    items = iter_source(source, completed)
+    try:
+        if workers == 0:
+            init_worker()
+            for name, item in items:
+                writer.write(process_file(name, item, tier))
+            return writer
+
+        # Spawned like the service's OCR pool; at most two files per worker are
+        # in flight so a large tarball is never read into memory ahead of the OCR
+        pending: Set[Future] = set()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=init_worker) as pool:
+            try:
+                for name, item in items:
+                    pending.add(pool.submit(process_file, name, item, tier))
+                    if len(pending) >= 2 * workers:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            writer.write(future.result())
+                for future in wait(pending).done:
+                    writer.write(future.result())
+            except KeyboardInterrupt:
+                # Files in progress are dropped and processed again on the next run
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        return writer
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", type=Path, help="Directory or tarball (.tar, .tar.gz, ...) of receipts")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL file, created or resumed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes, 0 processes the files in this process")
+    parser.add_argument("--tier", choices=list(OCR_TIERS), help="Speed/accuracy profile, OCR_DEFAULT_TIER if unset")
+    parser.add_argument("--retry-errors", action="store_true", help="Process files that failed in earlier runs again")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="Files between fsyncs of the output")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.source.exists():
+        parser.error(f"No such directory or file: {args.source}")
+
+    start = time.perf_counter()
+    try:
+        writer = run(args.source, args.output, args.workers, args.tier, args.retry_errors, args.checkpoint_every)
+    except KeyboardInterrupt:
+        logger.warning(f"Interrupted, run the same command again to continue from {args.output}")
+        sys.exit(130)
+
+    elapsed = time.perf_counter() - start
+    durations = sorted(writer.durations)
+    summary = f"{writer.written} files ({writer.errors} errors) in {elapsed:.1f} s"
+    if durations:
+        summary += (f", {writer.written / elapsed:.2f} files/s, per file p50 {statistics.median(durations):.0f} ms, "
+                    f"p95 {durations[int(len(durations) * 0.95)]:.0f} ms")
+    logger.info(summary)
+
+
+if __name__ == "__main__":
+    main()
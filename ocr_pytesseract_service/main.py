@@ -1,14 +1,24 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from app.api.routes import ocr
+from app.api.routes import ocr, live, health, metrics
 from app.core.config import settings
+from app.services.ocr_pool import ocr_executor
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the OCR pool with the app and stop its workers on shutdown
+    ocr_executor.start()
+    yield
+    ocr_executor.shutdown()
 
 app = FastAPI(
     title="Russian Receipt OCR Service",
     description="API for extracting receipt information from images using OCR",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -22,6 +32,9 @@ app.add_middleware(
 
 # Include routers
 app.include_router(ocr.router)
+app.include_router(live.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
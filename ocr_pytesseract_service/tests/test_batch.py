@@ -0,0 +1,61 @@
+# tests/test_batch.py
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import ocr
+from main import app
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    state = {"running": 0, "peak": 0}
+
+    async def process_receipt_bytes(contents, tier=None, preprocessing=None):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        try:
+            await asyncio.sleep(0.02)
+            if contents == b"broken":
+                raise ValueError("cannot identify image file")
+            return {"text": contents.decode()}
+        finally:
+            state["running"] -= 1
+
+    monkeypatch.setattr(ocr, "process_receipt_bytes", process_receipt_bytes)
+    return state
+
+
+def post_batch(*contents):
+    files = [("files", (f"receipt{i}.jpg", data, "image/jpeg")) for i, data in enumerate(contents)]
+    response = TestClient(app).post("/ocr/extract-text/batch", files=files)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_one_line_per_file(fake_ocr):
+    lines = post_batch(b"first", b"second", b"third")
+    assert sorted((line["index"], line["filename"], line["result"]["text"]) for line in lines) == [
+        (0, "receipt0.jpg", "first"), (1, "receipt1.jpg", "second"), (2, "receipt2.jpg", "third")
+    ]
+
+
+def test_failed_file_does_not_abort_the_batch(fake_ocr):
+    lines = sorted(post_batch(b"first", b"broken", b"third"), key=lambda line: line["index"])
+    assert [line.get("result", {}).get("text") for line in lines] == ["first", None, "third"]
+    assert "cannot identify image file" in lines[1]["error"]
+
+
+def test_concurrency_is_bounded(fake_ocr, monkeypatch):
+    monkeypatch.setattr(ocr.settings, "OCR_BATCH_CONCURRENCY", 2)
+    assert len(post_batch(*[b"receipt"] * 8)) == 8
+    assert fake_ocr["peak"] == 2
+
+
+def test_too_many_files(fake_ocr, monkeypatch):
+    monkeypatch.setattr(ocr.settings, "OCR_BATCH_MAX_FILES", 2)
+    files = [("files", (f"receipt{i}.jpg", b"receipt", "image/jpeg")) for i in range(3)]
+    assert TestClient(app).post("/ocr/extract-text/batch", files=files).status_code == 413
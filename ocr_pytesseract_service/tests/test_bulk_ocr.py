@@ -0,0 +1,105 @@
+# tests/test_bulk_ocr.py
+import io
+import json
+import tarfile
+
+import pytest
+
+import bulk_ocr
+from app.services import ocr_services
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    processed = []
+
+    async def process_receipt_bytes(contents, timings=None, tier=None, **kwargs):
+        if contents == b"broken":
+            raise ValueError("Could not decode image")
+        processed.append(contents)
+        timings["ocr"] = 1.0
+        return {"is_receipt": True, "total_amount": float(len(contents))}
+
+    monkeypatch.setattr(ocr_services, "process_receipt_bytes", process_receipt_bytes)
+    # workers=0 runs init_worker in the test process, restore what it changes
+    for name in ("OCR_STRIP_WORKERS", "OCR_DOCUMENT_CONCURRENCY"):
+        monkeypatch.setattr(ocr_services.settings, name, getattr(ocr_services.settings, name))
+    monkeypatch.setattr(ocr_services.ocr_executor, "mode", ocr_services.ocr_executor.mode)
+    monkeypatch.setattr(ocr_services, "receipt_cache", ocr_services.receipt_cache)
+    return processed
+
+
+def read_output(path):
+    return {record["file"]: record for record in map(json.loads, path.read_text(encoding="utf-8").splitlines())}
+
+
+def test_directory_run_writes_one_line_per_image(tmp_path, fake_ocr):
+    archive = tmp_path / "archive"
+    (archive / "2023").mkdir(parents=True)
+    (archive / "a.jpg").write_bytes(b"aaaa")
+    (archive / "2023" / "b.PNG").write_bytes(b"bb")
+    (archive / "2023" / "bad.jpg").write_bytes(b"broken")
+    (archive / "notes.txt").write_text("not a receipt")
+    output = tmp_path / "out.jsonl"
+
+    writer = bulk_ocr.run(archive, output, workers=0)
+
+    records = read_output(output)
+    assert set(records) == {"a.jpg", "2023/b.PNG", "2023/bad.jpg"}
+    assert records["a.jpg"]["result"]["total_amount"] == 4.0
+    assert records["a.jpg"]["timings"] == {"ocr": 1.0} and records["a.jpg"]["ms"] >= 0
+    assert "Could not decode image" in records["2023/bad.jpg"]["error"]
+    assert (writer.written, writer.errors) == (3, 1)
+    # Processed like in a worker process: in the thread pool and without the cache
+    assert ocr_services.ocr_executor.mode == "thread"
+    assert ocr_services.receipt_cache is None
+
+
+def test_resume_skips_completed_files_and_drops_cut_off_line(tmp_path, fake_ocr):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        (archive / name).write_bytes(name.encode())
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"file": "a.jpg", "result": {}}) + "\n" + '{"file": "b.jp', encoding="utf-8")
+
+    bulk_ocr.run(archive, output, workers=0)
+
+    assert fake_ocr == [b"b.jpg", b"c.jpg"]
+    assert list(read_output(output)) == ["a.jpg", "b.jpg", "c.jpg"]
+
+
+def test_retry_errors(tmp_path, fake_ocr):
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"file": "a.jpg", "error": "boom"}) + "\n", encoding="utf-8")
+    assert bulk_ocr.load_completed(output) == {"a.jpg"}
+    assert bulk_ocr.load_completed(output, retry_errors=True) == set()
+
+
+def test_retried_files_get_one_line(tmp_path, fake_ocr):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    (archive / "a.jpg").write_bytes(b"aaaa")
+    (archive / "b.jpg").write_bytes(b"bb")
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"file": "a.jpg", "error": "boom"}) + "\n"
+                      + json.dumps({"file": "b.jpg", "result": {}}) + "\n", encoding="utf-8")
+
+    bulk_ocr.run(archive, output, workers=0, retry_errors=True)
+
+    lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [record["file"] for record in lines] == ["b.jpg", "a.jpg"]
+    assert lines[1]["result"]["total_amount"] == 4.0
+    assert fake_ocr == [b"aaaa"]
+
+
+def test_tarball_source(tmp_path, fake_ocr):
+    source = tmp_path / "archive.tar.gz"
+    with tarfile.open(source, "w:gz") as archive:
+        for name, data in (("x/1.jpg", b"one"), ("x/2.pdf", b"two!"), ("x/readme.md", b"#")):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+    items = list(bulk_ocr.iter_source(source, completed={"x/1.jpg"}))
+    assert items == [("x/2.pdf", b"two!")]
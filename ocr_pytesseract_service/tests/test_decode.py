@@ -0,0 +1,81 @@
+# tests/test_decode.py
+import io
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services import decode
+from app.services.decode import choose_jpeg_reduction, decode_image, estimate_line_height, scale_for_ocr
+
+
+def text_lines(height, width=800, line_height=20, gap=20):
+    gray = np.full((height, width), 255, np.uint8)
+    for top in range(gap, height - line_height, line_height + gap):
+        gray[top:top + line_height, 20:width - 20:3] = 0
+    return gray
+
+
+def jpeg(gray, orientation=None):
+    exif = Image.Exif()
+    if orientation:
+        exif[decode.EXIF_ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    Image.fromarray(gray).save(buffer, format="JPEG", quality=90, exif=exif)
+    return np.frombuffer(buffer.getvalue(), np.uint8)
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(decode.settings, "OCR_DECODE_MAX_PIXELS", 1_000_000)
+    monkeypatch.setattr(decode.settings, "OCR_TARGET_LINE_HEIGHT", 0)
+
+
+def test_choose_jpeg_reduction():
+    # Largest reduction that stays above the budget, never below it
+    assert choose_jpeg_reduction(4000, 3000, 4_000_000) == 1
+    assert choose_jpeg_reduction(8000, 6000, 4_000_000) == 2
+    assert choose_jpeg_reduction(4000, 3000, 200_000) == 4
+    assert choose_jpeg_reduction(4000, 3000, 100) == 8
+
+
+def test_estimate_line_height():
+    assert estimate_line_height(text_lines(600, line_height=24)) == pytest.approx(24, abs=1)
+    assert estimate_line_height(np.full((600, 800), 255, np.uint8)) is None
+
+
+def test_large_jpeg_is_decoded_reduced_within_budget(budget):
+    img, info = decode_image(jpeg(text_lines(3000, width=4000)))
+    assert img.ndim == 2
+    # cv2.resize rounds the size to whole pixels
+    assert (img.shape[0] - 1) * (img.shape[1] - 1) <= 1_000_000
+    assert info.source_size == (4000, 3000)
+    assert info.jpeg_reduction == 2
+    assert info.bytes_saved == 4000 * 3000 * 3 - img.nbytes
+    assert info.decode_ms > 0
+
+
+def test_source_size_follows_exif_orientation(budget):
+    # Stored landscape, displayed portrait
+    img, info = decode_image(jpeg(text_lines(400, width=1000), orientation=6))
+    assert info.source_size == (400, 1000)
+    assert (img.shape[1], img.shape[0]) == info.decoded_size == (400, 1000)
+
+
+def test_text_is_scaled_towards_target_line_height(monkeypatch):
+    monkeypatch.setattr(decode.settings, "OCR_DECODE_MAX_PIXELS", 4_000_000)
+    monkeypatch.setattr(decode.settings, "OCR_TARGET_LINE_HEIGHT", 40)
+    img, info = scale_for_ocr(text_lines(600, line_height=20), (800, 600))
+    assert info.text_scale == 2.0
+    assert img.shape == (1200, 1600)
+
+    # Growing the image stops at the pixel budget
+    monkeypatch.setattr(decode.settings, "OCR_DECODE_MAX_PIXELS", 960_000)
+    img, info = scale_for_ocr(text_lines(600, line_height=20), (800, 600))
+    assert (img.shape[0] - 1) * (img.shape[1] - 1) <= 960_000
+
+
+def test_garbage_is_rejected():
+    with pytest.raises(ValueError):
+        decode_image(np.frombuffer(b"not an image", np.uint8))
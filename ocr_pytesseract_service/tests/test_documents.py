@@ -0,0 +1,130 @@
+# tests/test_documents.py
+import asyncio
+import io
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services import ocr_services
+from app.services.documents import DocumentTooLargeError, detect_document_type, page_count, render_page
+from app.services.ocr_pool import OCRExecutor, OCRQueueFullError
+
+# Page heights at 72 dpi; rendered at 144 dpi they tell the pages apart
+PAGE_HEIGHTS = (100, 120, 140)
+PAGE_TEXT = {
+    200: "ООО Ромашка\nг. Москва\nИНН 7700000000\nКассовый чек\nПриход\n",
+    240: "Молоко 2 179.80\nХлеб 1 45.00\n",
+    280: "Итого: 224.80\n12.03.2024 14:22\n",
+}
+
+
+def document(format_name):
+    pages = [Image.new("L", (160, height), 255) for height in PAGE_HEIGHTS]
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format=format_name, save_all=True, append_images=pages[1:], resolution=72)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    def ocr_decoded_image(img, decode_info, detect_qr=False, tier=None, preprocessing=None):
+        return ocr_services.OCRResult(text=PAGE_TEXT[img.shape[0]], decode=decode_info, timings={"ocr": 1.0})
+
+    monkeypatch.setattr(ocr_services, "ocr_decoded_image", ocr_decoded_image)
+    monkeypatch.setattr(ocr_services, "receipt_cache", None)
+    monkeypatch.setattr(ocr_services.ocr_executor, "mode", "thread")
+    monkeypatch.setattr(ocr_services.settings, "OCR_TARGET_LINE_HEIGHT", 0)
+
+
+def test_detects_and_renders_pdf_pages():
+    pdf = document("PDF")
+    assert detect_document_type(pdf) == "pdf"
+    assert page_count(pdf, "pdf") == 3
+    assert render_page(pdf, "pdf", 2, 144).shape == (280, 320)
+
+
+def test_oversized_pdf_page_is_rendered_within_pixel_budget(monkeypatch):
+    monkeypatch.setattr("app.services.documents.settings.OCR_DECODE_MAX_PIXELS", 1_000_000)
+    # A 200 x 100 inch page, 60000 x 30000 pixels at 300 dpi
+    buffer = io.BytesIO()
+    Image.new("L", (200, 100), 255).save(buffer, format="PDF", resolution=1)
+
+    page = render_page(buffer.getvalue(), "pdf", 0, 300)
+    # pdfium rounds the bitmap size up
+    assert (page.shape[0] - 1) * (page.shape[1] - 1) <= 1_000_000
+    assert page.shape[1] == pytest.approx(2 * page.shape[0], abs=2)
+
+
+def test_pdf_pages_merged_into_one_receipt(fake_ocr):
+    result = asyncio.run(ocr_services.process_receipt_bytes(document("PDF"), dpi=144))
+    assert result["pages"] == 3
+    assert result["total_amount"] == 224.8
+    assert result["bill_date"] == "2024-03-12"
+    assert [item["description"] for item in result["items"]] == ["Молоко", "Хлеб"]
+
+
+def test_tiff_streams_page_results_then_merged(fake_ocr, monkeypatch):
+    # TIFF pages keep their stored resolution
+    monkeypatch.setattr(ocr_services, "ocr_decoded_image", _by_tiff_height(ocr_services.ocr_decoded_image))
+    tiff = document("TIFF")
+    assert detect_document_type(tiff) == "tiff"
+
+    async def collect():
+        return [line async for line in ocr_services.iter_document_results(tiff, "tiff")]
+
+    lines = asyncio.run(collect())
+    assert sorted(line["page"] for line in lines[:-1]) == [0, 1, 2]
+    assert "page" not in lines[-1] and lines[-1]["result"]["pages"] == 3
+
+
+def test_concurrent_documents_queue_their_pages(fake_ocr, monkeypatch):
+    # More pages in flight than the executor accepts at once: admitted documents wait, never fail
+    monkeypatch.setattr(ocr_services, "ocr_executor", OCRExecutor("thread", workers=2, queue_size=1))
+    monkeypatch.setattr(ocr_services.settings, "OCR_DOCUMENT_CONCURRENCY", 8)
+    slow = _by_tiff_height(ocr_services.ocr_decoded_image)
+    monkeypatch.setattr(ocr_services, "ocr_decoded_image", lambda *args: time.sleep(0.05) or slow(*args))
+    tiff = document("TIFF")
+
+    async def scenario():
+        return await asyncio.gather(*(ocr_services.process_receipt_bytes(tiff) for _ in range(2)))
+
+    assert [result["pages"] for result in asyncio.run(scenario())] == [3, 3]
+    assert ocr_services.ocr_executor.stats()["in_progress"] == 0
+
+
+def test_document_is_rejected_when_the_executor_is_full(fake_ocr, monkeypatch):
+    executor = OCRExecutor("thread", workers=1, queue_size=0)
+    executor._pending = 1
+    monkeypatch.setattr(ocr_services, "ocr_executor", executor)
+    with pytest.raises(OCRQueueFullError):
+        asyncio.run(ocr_services.process_receipt_bytes(document("TIFF")))
+
+
+def test_too_many_pages(fake_ocr, monkeypatch):
+    monkeypatch.setattr(ocr_services.settings, "OCR_DOCUMENT_MAX_PAGES", 2)
+    with pytest.raises(DocumentTooLargeError):
+        asyncio.run(ocr_services.process_receipt_bytes(document("PDF")))
+
+
+def _by_tiff_height(ocr_decoded_image):
+    def wrapper(img, decode_info, detect_qr=False, tier=None, preprocessing=None):
+        img = img.repeat(2, axis=0)
+        return ocr_decoded_image(img, decode_info, detect_qr, tier, preprocessing)
+    return wrapper
+
+
+@pytest.mark.parametrize("tier", ["fast", "balanced"])
+def test_tiff_page_is_preprocessed_without_copying_first(monkeypatch, tier):
+    # PIL hands TIFF pages out read-only; with nothing to rescale or crop the
+    # preprocessing stages get that array itself
+    monkeypatch.setattr(ocr_services.settings, "OCR_TARGET_LINE_HEIGHT", 0)
+    monkeypatch.setattr(ocr_services.settings, "OCR_ITEM_EXTRACTION", "text")
+    monkeypatch.setattr(ocr_services.settings, "OCR_PRICE_REOCR", False)
+    monkeypatch.setattr(ocr_services.tesseract_engine, "image_to_string",
+                        lambda img, lang, options=None: PAGE_TEXT[240] if set(np.unique(img)) <= {0, 255} else "")
+    tiff = np.frombuffer(document("TIFF"), np.uint8)
+
+    result = ocr_services.ocr_document_page(tiff, "tiff", 1, 144, tier=tier)
+    assert result.text == PAGE_TEXT[240]
@@ -0,0 +1,58 @@
+# tests/test_fiscal_qr.py
+import asyncio
+
+import cv2
+import numpy as np
+
+from app.services import ocr_services
+from app.services.fiscal_qr import decode_fiscal_qr, parse_fiscal_qr
+
+PAYLOAD = "t=20240312T1422&s=224.80&fn=9289000100123456&i=12345&fp=1234567890&n=1"
+
+
+def receipt_with_qr(payload=PAYLOAD):
+    qr = cv2.QRCodeEncoder.create().encode(payload)
+    qr = cv2.resize(qr, None, fx=8, fy=8, interpolation=cv2.INTER_NEAREST)
+    page = np.full((2400, 1200), 240, np.uint8)
+    for i in range(40):
+        cv2.putText(page, f"Item {i} 12.50", (40, 60 + i * 40), cv2.FONT_HERSHEY_SIMPLEX, 1, 20, 2)
+    page[1800:1800 + qr.shape[0], 400:400 + qr.shape[1]] = qr
+    return page
+
+
+def test_parse_payload():
+    fiscal = parse_fiscal_qr(PAYLOAD)
+    assert fiscal.bill_date == "2024-03-12"
+    assert fiscal.date_time.hour == 14 and fiscal.date_time.minute == 22
+    assert fiscal.total_amount == 224.8
+    assert (fiscal.fn, fiscal.fd, fiscal.fp, fiscal.operation) == ("9289000100123456", "12345", "1234567890", "1")
+
+
+def test_parse_payload_with_seconds():
+    assert parse_fiscal_qr("t=20240312T142205&s=10").date_time.second == 5
+
+
+def test_rejects_other_qr_codes():
+    assert parse_fiscal_qr("https://example.com/?s=1") is None
+    assert parse_fiscal_qr("t=yesterday&s=10.00") is None
+
+
+def test_decode_from_image():
+    assert decode_fiscal_qr(receipt_with_qr()).total_amount == 224.8
+
+
+def test_header_only_skips_ocr(monkeypatch):
+    async def no_ocr(*args):
+        raise AssertionError("full OCR must not run")
+
+    monkeypatch.setattr(ocr_services.ocr_executor, "mode", "thread")
+    monkeypatch.setattr(ocr_services, "run_ocr_pipeline", no_ocr)
+    contents = cv2.imencode(".png", receipt_with_qr())[1].tobytes()
+    timings = {}
+
+    result = asyncio.run(ocr_services.process_receipt_bytes(contents, timings, header_only=True))
+    assert result["bill_date"] == "2024-03-12"
+    assert result["total_amount"] == 224.8
+    assert result["is_receipt"] is True
+    assert result["items"] == []
+    assert "qr" in timings
@@ -0,0 +1,61 @@
+# tests/test_layout_parser.py
+from app.services.layout_parser import items_from_words
+from app.services.receipt_parser import parse_receipt_data
+from app.services.tesseract_engine import OCRWord
+
+CHAR_WIDTH = 12
+LINE_HEIGHT = 30
+
+
+def layout(rows):
+    """
+    Word boxes for rows of (x, text) cells; numbers are right-aligned at x
+    """
+    words = []
+    for line, cells in enumerate(rows, start=1):
+        top = line * LINE_HEIGHT * 1.5
+        for x, text in cells:
+            start = x - len(text) * CHAR_WIDTH if text[0].isdigit() else x
+            for offset, token in _split(text):
+                width = len(token) * CHAR_WIDTH
+                left = start + offset
+                words.append(OCRWord(token, int(left), int(top), width, LINE_HEIGHT, 90.0, 1, 1, line))
+    return words
+
+
+def _split(text):
+    offset = 0
+    for token in text.split(" "):
+        yield offset, token
+        offset += (len(token) + 1) * CHAR_WIDTH
+
+
+def test_rows_with_quantity_and_unit_price():
+    words = layout([
+        [(20, "ООО Ромашка")],
+        [(20, "Молоко"), (400, "2"), (520, "89.90"), (700, "179.80")],
+        [(20, "Хлеб белый"), (400, "1"), (520, "45.00"), (700, "45.00")],
+        [(20, "ИТОГО"), (700, "224.80")],
+    ])
+    assert items_from_words(words) == [
+        {"description": "Молоко", "quantity": 2.0, "unit_price": 89.9, "total_price": 179.8},
+        {"description": "Хлеб белый", "quantity": 1.0, "unit_price": 45.0, "total_price": 45.0},
+    ]
+
+
+def test_description_from_previous_row():
+    words = layout([
+        [(20, "Сыр российский")],
+        [(300, "0,350 x 640.00"), (700, "224.00")],
+        [(20, "Вода"), (700, "39.00")],
+    ])
+    assert items_from_words(words) == [
+        {"description": "Сыр российский", "quantity": 0.35, "unit_price": 640.0, "total_price": 224.0},
+        {"description": "Вода", "quantity": 1.0, "unit_price": 39.0, "total_price": 39.0},
+    ]
+
+
+def test_falls_back_to_text_without_price_column():
+    text = "Магазин\nИтого: 10.00\n"
+    words = layout([[(20, "Магазин")], [(20, "Итого:"), (700, "10.00")]])
+    assert parse_receipt_data(text, words=words) == parse_receipt_data(text)
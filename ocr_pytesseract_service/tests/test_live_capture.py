@@ -0,0 +1,110 @@
+# tests/test_live_capture.py
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from app.api.routes import live
+from app.services.decode import DecodeInfo
+from app.services.live_capture import FrameGate, FrameMailbox, ReceiptAccumulator
+from app.services.ocr_services import OCRResult
+from main import app
+
+
+def frame(shift=0, blur=0, text="Итого: 123.45"):
+    img = np.full((720, 960), 235, np.uint8)
+    for i in range(10):
+        cv2.putText(img, f"{text} {i}", (40 + shift, 60 + i * 60), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 20, 3)
+    if blur:
+        img = cv2.GaussianBlur(img, (0, 0), blur)
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+def test_gate_waits_for_a_still_sharp_view_and_skips_repeats():
+    gate = FrameGate(min_sharpness=100)
+    assert gate.check(frame(blur=6)).status == "blurry"
+    assert gate.check(frame()).status == "unstable"
+    assert gate.check(frame()).status == "ocr"
+    assert gate.check(frame()).status == "duplicate"
+    # A different part of the receipt comes into view
+    assert gate.check(frame(text="Хлеб 2 x 45.00")).status == "unstable"
+    assert gate.check(frame(text="Хлеб 2 x 45.00")).status == "ocr"
+
+
+def test_gate_rejects_garbage():
+    assert FrameGate().check(b"not an image").status == "undecodable"
+
+
+def test_fields_firm_up_when_results_agree():
+    accumulator = ReceiptAccumulator(confirmations=2)
+    item = {"description": "Хлеб", "quantity": 1.0, "unit_price": 45.0, "total_price": 45.0}
+    accumulator.add({"total_amount": 123.45, "bill_date": None, "items": [item]})
+    assert accumulator.snapshot() == {"firm": {}, "pending": {"total_amount": 123.45}, "items": []}
+
+    accumulator.add({"total_amount": 123.45, "bill_date": "2024-03-12", "items": [item]})
+    snapshot = accumulator.snapshot()
+    assert snapshot["firm"] == {"total_amount": 123.45}
+    assert snapshot["pending"] == {"bill_date": "2024-03-12"}
+    assert snapshot["items"] == [item]
+
+    receipt = accumulator.receipt()
+    assert receipt["total_amount"] == 123.45 and receipt["bill_date"] == "2024-03-12"
+    assert receipt["is_receipt"] is True
+
+
+def test_fiscal_qr_fields_are_firm_at_once():
+    accumulator = ReceiptAccumulator(confirmations=3)
+    accumulator.add({"total_amount": 224.8, "bill_date": "2024-03-12", "fiscal": {"fn": "1"}, "items": []})
+    accumulator.add({"total_amount": 22.48, "items": []})
+    assert accumulator.snapshot()["firm"] == {"bill_date": "2024-03-12", "total_amount": 224.8}
+
+
+def test_mailbox_keeps_only_the_newest_frame():
+    async def scenario():
+        mailbox = FrameMailbox()
+        for contents in (b"1", b"2", b"3"):
+            mailbox.put(contents)
+        mailbox.close()
+        return await mailbox.get(), await mailbox.get(), mailbox.dropped
+
+    assert asyncio.run(scenario()) == ((3, b"3"), None, 2)
+
+
+def test_websocket_session(monkeypatch):
+    calls = []
+
+    async def run_ocr_pipeline(contents, detect_qr=False, tier=None, preprocessing=None):
+        calls.append(contents)
+        decode = DecodeInfo((960, 720), (960, 720), 1, 1.0, 0, 0, 1.0)
+        return OCRResult(text="Магазин\nЧек\nИтого: 123.45\n", decode=decode)
+
+    monkeypatch.setattr(live, "run_ocr_pipeline", run_ocr_pipeline)
+    monkeypatch.setattr(live.settings, "OCR_FISCAL_QR", False)
+
+    with TestClient(app).websocket_connect("/ocr/live") as websocket:
+        statuses = []
+        for _ in range(3):
+            websocket.send_bytes(frame())
+            message = websocket.receive_json()
+            statuses.append(message["status"])
+            if message["status"] == "ocr":
+                update = websocket.receive_json()
+                assert update["type"] == "receipt"
+                assert update["pending"] == {"total_amount": 123.45}
+        websocket.send_json({"type": "end"})
+        final = websocket.receive_json()
+
+    assert statuses == ["unstable", "ocr", "duplicate"]
+    assert len(calls) == 1
+    assert final["type"] == "final"
+    assert final["receipt"]["total_amount"] == 123.45
+
+
+def test_websocket_rejects_unknown_tier():
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with TestClient(app).websocket_connect("/ocr/live?tier=turbo"):
+            pass
+    assert refused.value.code == 1008
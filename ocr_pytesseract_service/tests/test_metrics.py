@@ -0,0 +1,35 @@
+# tests/test_metrics.py
+import os
+
+from fastapi.testclient import TestClient
+
+from app.services import ocr_services
+from app.services.decode import DecodeInfo
+from app.services.metrics import server_timing_header
+from main import app
+
+
+def fake_pipeline(timings):
+    async def run_ocr_pipeline(contents, detect_qr=False, tier=None, preprocessing=None):
+        decode = DecodeInfo((2000, 3000), (1000, 1500), 2, 1.0, 18_000_000, 1_500_000, timings["decode"])
+        return ocr_services.OCRResult(text="Магазин\nИтого: 10.00\n", decode=decode, timings=dict(timings))
+    return run_ocr_pipeline
+
+
+def test_server_timing_header():
+    assert server_timing_header({"decode": 12.34, "ocr": 800.0}) == "decode;dur=12.3, ocr;dur=800.0"
+
+
+def test_extract_text_reports_stage_timings(monkeypatch):
+    monkeypatch.setattr(ocr_services, "run_ocr_pipeline", fake_pipeline({"decode": 5.0, "preprocess": 2.0, "ocr": 300.0}))
+    client = TestClient(app)
+
+    response = client.post("/ocr/extract-text", files={"file": ("receipt.jpg", os.urandom(2048), "image/jpeg")})
+    assert response.status_code == 200
+    assert response.json()["total_amount"] == 10.0
+    stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    assert stages[-4:] == ["decode", "preprocess", "ocr", "parse"]
+
+    metrics = client.get("/metrics").text
+    assert 'ocr_stage_duration_seconds_count{pixels="4-12MP",stage="ocr",upload="<256KB"}' in metrics
+    assert "ocr_receipts_total" in metrics
@@ -0,0 +1,74 @@
+# tests/test_ocr_cache.py
+import asyncio
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from app.services.decode import perceptual_hash, hamming_distance
+from app.services.ocr_cache import ReceiptCache
+
+
+def make_cache(**kwargs):
+    options = {"max_entries": 2, "ttl_seconds": 60}
+    options.update(kwargs)
+    return ReceiptCache(**options)
+
+
+def test_exact_hit_and_miss_counters():
+    cache = make_cache()
+    key = cache.make_key(b"image", "rus")
+
+    assert asyncio.run(cache.get(key, "rus")) is None
+    asyncio.run(cache.set(key, {"total_amount": 10.0}, "rus"))
+    assert asyncio.run(cache.get(key, "rus")) == {"total_amount": 10.0}
+
+    assert cache.counters["hits"] == 1
+    assert cache.counters["misses"] == 1
+
+
+def test_key_depends_on_config():
+    assert ReceiptCache.make_key(b"image", "rus") != ReceiptCache.make_key(b"image", "eng")
+
+
+def test_cached_value_is_not_shared():
+    cache = make_cache()
+    asyncio.run(cache.set("k", {"items": []}, "rus"))
+    asyncio.run(cache.get("k", "rus"))["items"].append("mutated")
+
+    assert asyncio.run(cache.get("k", "rus")) == {"items": []}
+
+
+def test_lru_eviction():
+    cache = make_cache()
+    for key in ("a", "b"):
+        asyncio.run(cache.set(key, {"key": key}, "rus"))
+    asyncio.run(cache.get("a", "rus"))
+    asyncio.run(cache.set("c", {"key": "c"}, "rus"))
+
+    assert asyncio.run(cache.get("b", "rus")) is None
+    assert asyncio.run(cache.get("a", "rus")) == {"key": "a"}
+
+
+def test_ttl_expiry():
+    cache = make_cache()
+    with patch("app.services.ocr_cache.time.monotonic", return_value=100.0):
+        asyncio.run(cache.set("k", {"key": "k"}, "rus"))
+    with patch("app.services.ocr_cache.time.monotonic", return_value=161.0):
+        assert asyncio.run(cache.get("k", "rus")) is None
+
+
+def test_near_duplicate_tier():
+    img = np.full((400, 300), 255, np.uint8)
+    for i in range(10):
+        cv2.putText(img, f"ITEM {i} 12.50", (10, 30 + i * 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    original = perceptual_hash(img)
+    resized = perceptual_hash(cv2.resize(img, (240, 320), interpolation=cv2.INTER_AREA))
+    assert hamming_distance(original, resized) <= 6
+
+    cache = make_cache(near_duplicate_distance=6)
+    asyncio.run(cache.set("original", {"total_amount": 1.0}, "rus", original))
+
+    assert asyncio.run(cache.get("resized", "rus", resized)) == {"total_amount": 1.0}
+    assert asyncio.run(cache.get("resized", "eng", resized)) is None
+    assert cache.counters["near_hits"] == 1
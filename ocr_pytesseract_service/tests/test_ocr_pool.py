@@ -0,0 +1,126 @@
+# tests/test_ocr_pool.py
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from fastapi.testclient import TestClient
+
+from app.services.ocr_pool import OCRExecutor, OCRQueueFullError, SharedArray, call_with_shared_array
+from main import app
+
+
+def test_shared_array_round_trip():
+    array = np.arange(12, dtype=np.uint16).reshape(3, 4)
+    with SharedArray(array) as shared:
+        assert shared.descriptor[1:] == ((3, 4), array.dtype.str)
+        assert call_with_shared_array(shared.descriptor, lambda mapped, offset: (mapped + offset).tolist(), 1) == \
+            (array + 1).tolist()
+
+
+def test_shared_array_survives_errors_in_the_worker_function():
+    def fail(mapped):
+        raise ValueError(f"bad image {mapped.shape}")
+
+    with SharedArray(np.zeros(4, np.uint8)) as shared:
+        with pytest.raises(ValueError):
+            call_with_shared_array(shared.descriptor, fail)
+        # The mapping was closed, the block can still be attached
+        assert call_with_shared_array(shared.descriptor, np.sum) == 0
+
+
+def test_rejects_jobs_beyond_workers_and_queue():
+    executor = OCRExecutor("thread", workers=1, queue_size=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()["in_progress"] == 2
+        with pytest.raises(OCRQueueFullError):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+        assert executor.stats()["in_progress"] == 0
+        # Capacity is released once the jobs finish
+        return await executor.run(sum, [1, 2])
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_waiting_jobs_queue_for_a_slot_and_go_first():
+    executor = OCRExecutor("thread", workers=1, queue_size=0)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiting = [asyncio.create_task(executor.run(sum, [index], wait=True)) for index in range(3)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()["waiting"] == 3
+        # A cancelled waiter gives up its place without leaking a slot
+        waiting[1].cancel()
+        await asyncio.sleep(0)
+        release.set()
+        await running
+        # New jobs do not overtake the waiting ones, which only ever fail if cancelled
+        results = await asyncio.gather(*waiting, return_exceptions=True)
+        assert results[0] == 0 and results[2] == 2
+        assert isinstance(results[1], asyncio.CancelledError)
+        assert executor.stats()["in_progress"] == 0 and executor.stats()["waiting"] == 0
+        executor.admit()
+        return await executor.run(sum, [1, 2])
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_jobs_arriving_while_others_wait_are_rejected():
+    executor = OCRExecutor("thread", workers=1, queue_size=0)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.create_task(executor.run(sum, [1], wait=True))
+        await asyncio.sleep(0)
+        with pytest.raises(OCRQueueFullError):
+            executor.admit()
+        release.set()
+        await running
+        # The freed slot went to the waiting job, not to a newcomer
+        assert executor.stats()["in_progress"] == 1
+        with pytest.raises(OCRQueueFullError):
+            await executor.run(sum, [2])
+        return await waiting
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_process_pool_passes_buffers_and_recovers_from_dead_workers():
+    executor = OCRExecutor("process", workers=1, queue_size=0)
+
+    async def scenario():
+        assert await executor.run_with_buffer(np.sum, b"\x01\x02\x03") == 6
+        broken = executor._pool
+        shutdown_calls = []
+        shutdown = broken.shutdown
+        broken.shutdown = lambda **kwargs: shutdown_calls.append(kwargs) or shutdown(**kwargs)
+        with pytest.raises(BrokenProcessPool):
+            await executor.run(os._exit, 1)
+        # The broken pool is shut down without waiting and replaced on the next job
+        assert executor._pool is None
+        assert shutdown_calls == [{"wait": False, "cancel_futures": True}]
+        return await executor.run(sum, [1, 2])
+
+    try:
+        assert asyncio.run(scenario()) == 3
+    finally:
+        executor.shutdown()
+
+
+def test_health_reports_the_executor():
+    response = TestClient(app).get("/health")
+    assert response.status_code == 200
+    assert set(response.json()["ocr_executor"]) == {"mode", "workers", "queue_size", "in_progress", "waiting"}
@@ -0,0 +1,30 @@
+# tests/test_ocr_tiers.py
+from fastapi.testclient import TestClient
+
+from app.services.ocr_tiers import OCR_TIERS, get_tier
+from app.services.tesseract_engine import TesseractOptions
+from main import app
+
+
+def test_config_string():
+    options = TesseractOptions(oem=1, psm=7, whitelist="0123456789.,", tessdata_path="/models/fast")
+    assert options.config_string() == '--tessdata-dir "/models/fast" --oem 1 --psm 7 -c tessedit_char_whitelist=0123456789.,'
+    assert TesseractOptions().config_string() == ""
+
+
+def test_default_tier_keeps_tesseract_defaults():
+    assert get_tier().name == "balanced"
+    assert get_tier().page == TesseractOptions()
+
+
+def test_tiers_whitelist_numeric_zones():
+    for tier in OCR_TIERS.values():
+        assert set(tier.numeric.whitelist) <= set("0123456789.,-")
+
+
+def test_unknown_tier_is_rejected():
+    response = TestClient(app).post(
+        "/ocr/extract-text?tier=turbo",
+        files={"file": ("receipt.jpg", b"not an image", "image/jpeg")}
+    )
+    assert response.status_code == 400
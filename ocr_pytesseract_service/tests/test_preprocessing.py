@@ -0,0 +1,123 @@
+# tests/test_preprocessing.py
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.preprocessing import (
+    PreprocessingSpecError, Stage, compile_pipeline, parse_request_spec, parse_spec, resolve_spec, run_pipeline
+)
+from app.services.ocr_services import preprocess_image
+from main import app
+
+
+def receipt_photo(light_gradient=False):
+    img = np.full((600, 400, 3), 230, np.uint8)
+    if light_gradient:
+        # Lamp on one side: the right half is much darker than the left
+        img = (img * np.linspace(1.0, 0.45, 400)[None, :, None]).astype(np.uint8)
+    for i in range(12):
+        cv2.putText(img, f"Item {i}  12.50", (15, 40 + i * 45), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (30, 30, 30), 2)
+    return img
+
+
+def test_parses_presets_and_parameters():
+    assert parse_spec("minimal") == [Stage("grey"), Stage("threshold", ("otsu",))]
+    assert parse_spec("grey, threshold:sauvola:25:0.2") == [Stage("grey"), Stage("threshold", ("sauvola", "25", "0.2"))]
+    # Parameters default when left out
+    assert parse_spec("morphology") == [Stage("morphology", ("open", "1"))]
+
+
+@pytest.mark.parametrize("spec", ["grey,sharpen", "threshold:adaptive:4:5", "denoise:median:x", "morphology:open",
+                                  "threshold:sauvola:25:abc", "threshold:adaptive:25:nan", "resize:0.0001"])
+def test_rejects_invalid_specs(spec):
+    with pytest.raises(PreprocessingSpecError):
+        parse_spec(spec)
+
+
+def test_noop_stages_are_dropped():
+    stages = compile_pipeline("grey,grey,region,deskew,resize:1,denoise:median:1,threshold:otsu,"
+                              "threshold:otsu,morphology:open:1")
+    assert [str(stage) for stage in stages] == ["grey", "region", "threshold:otsu"]
+    assert [str(stage) for stage in compile_pipeline("grey,region,threshold:otsu", receipt_crop=False)] == \
+        ["grey", "threshold:otsu"]
+
+
+def test_otsu_after_a_non_binary_stage_is_kept():
+    stages = compile_pipeline("threshold:otsu,resize:0.5,threshold:otsu")
+    assert [str(stage) for stage in stages] == ["threshold:otsu", "resize:0.5", "threshold:otsu"]
+    # Stages that keep a binary image binary do not stop the second Otsu from being dropped
+    assert [str(stage) for stage in compile_pipeline("threshold:otsu,morphology:open:3,threshold:otsu")] == \
+        ["threshold:otsu", "morphology:open:3"]
+
+
+@pytest.mark.parametrize("spec", ["resize:4,resize:4", "grey," * 8 + "grey", "grey,denoise:nlmeans:30",
+                                  "resize:0.25,resize:0.25", "morphology:open:100001", "denoise:median:99",
+                                  "threshold:sauvola:1001:0.2"])
+def test_request_specs_are_bounded(spec):
+    parse_spec(spec)
+    with pytest.raises(PreprocessingSpecError):
+        parse_request_spec(spec)
+
+
+def test_resize_stays_within_pixel_budget(monkeypatch):
+    monkeypatch.setattr("app.services.preprocessing.settings.OCR_DECODE_MAX_PIXELS", 40_000)
+    result = run_pipeline(np.zeros((100, 100), np.uint8), "resize:4,resize:4")
+    assert result.image.shape == (200, 200)
+    assert result.skipped == ["resize:4"]
+
+
+def test_resize_keeps_at_least_one_pixel():
+    assert run_pipeline(np.zeros((4, 300), np.uint8), "resize:0.05").image.shape == (1, 75)
+
+
+def test_resolve_spec_prefers_request_then_setting(monkeypatch):
+    monkeypatch.setattr("app.services.preprocessing.settings.OCR_PREPROCESSING", None)
+    assert resolve_spec(None, "standard") == "standard"
+    assert resolve_spec("full", "standard") == "full"
+    monkeypatch.setattr("app.services.preprocessing.settings.OCR_PREPROCESSING", "minimal")
+    assert resolve_spec(None, "standard") == "minimal"
+
+
+def test_times_stages_and_reports_skipped():
+    gray = cv2.cvtColor(receipt_photo(), cv2.COLOR_BGR2GRAY)
+    result = run_pipeline(gray, "grey,denoise:median:3,threshold:otsu")
+
+    assert list(result.timings) == ["grey", "denoise", "threshold"]
+    assert result.skipped == ["grey"]
+    assert set(np.unique(result.image)) <= {0, 255}
+
+
+def test_sauvola_keeps_text_under_uneven_light():
+    photo = cv2.cvtColor(receipt_photo(light_gradient=True), cv2.COLOR_BGR2GRAY)
+    otsu = run_pipeline(photo.copy(), "threshold:otsu").image
+    sauvola = run_pipeline(photo.copy(), "threshold:sauvola:31:0.2").image
+
+    # Otsu turns the dim half of the paper black, Sauvola keeps it white
+    assert otsu[:, 300:].mean() < 128
+    assert sauvola[:, 300:].mean() > 200
+
+
+def test_preprocess_image_matches_otsu():
+    photo = receipt_photo()
+    _, expected = cv2.threshold(cv2.cvtColor(photo, cv2.COLOR_BGR2GRAY), 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    assert np.array_equal(preprocess_image(photo), expected)
+
+
+def test_invalid_pipeline_is_rejected():
+    response = TestClient(app).post(
+        "/ocr/extract-text?preprocessing=grey,sharpen",
+        files={"file": ("receipt.jpg", b"not an image", "image/jpeg")}
+    )
+    assert response.status_code == 400
+    assert "sharpen" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("spec", ["resize:4,resize:4,resize:4,denoise:nlmeans:30", "threshold:sauvola:25:abc",
+                                  "resize:0.0001", "morphology:open:100000"])
+def test_unbounded_pipeline_is_rejected(spec):
+    response = TestClient(app).post(
+        f"/ocr/extract-text?preprocessing={spec}",
+        files={"file": ("receipt.jpg", b"not an image", "image/jpeg")}
+    )
+    assert response.status_code == 400
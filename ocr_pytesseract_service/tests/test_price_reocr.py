@@ -0,0 +1,58 @@
+# tests/test_price_reocr.py
+import numpy as np
+
+from app.services import price_reocr
+from app.services.tesseract_engine import OCRWord
+
+
+def word(text, left, top, conf=96.0):
+    return OCRWord(text, left, top, len(text) * 12, 30, conf, 1, 1, top // 45)
+
+
+WORDS = [
+    word("Молоко", 20, 45), word("179.80", 628, 45),
+    word("Хлеб", 20, 90), word("4S.0O", 628, 90, conf=41.0),
+    word("Сыр", 20, 135), word("300.00", 628, 135, conf=62.0),
+]
+
+
+def test_only_doubtful_price_cells_are_read_again(monkeypatch):
+    cells = []
+
+    def fake_ocr(cell, lang, options):
+        cells.append(cell.shape)
+        # Cells are told apart by width: 5 characters for 4S.0O, 6 for 300.00
+        return "45.00\n" if cell.shape[1] < 100 else "3OO.00\n"
+
+    monkeypatch.setattr(price_reocr.tesseract_engine, "image_to_string", fake_ocr)
+    binary = np.full((200, 720), 255, np.uint8)
+    words, corrected = price_reocr.reocr_price_column(binary, WORDS, max_confidence=90)
+
+    # The clean, confident 179.80 is trusted; 4S.0O and 300.00 are cropped
+    assert len(cells) == 2
+    assert corrected == 1
+    assert words[3].text == "45.00"
+    # A reading that is not a price never replaces the first pass
+    assert words[5].text == "300.00"
+
+
+def test_normalise_price():
+    assert price_reocr.normalise_price(" 1 234.50\n") == "1234.50"
+    assert price_reocr.normalise_price("12.5") is None
+    assert price_reocr.normalise_price("-15.00") == "-15.00"
+    assert price_reocr.normalise_price("--15.00-") == "-15.00"
+
+
+def test_negative_prices_keep_their_sign(monkeypatch):
+    readings = []
+    monkeypatch.setattr(price_reocr.tesseract_engine, "image_to_string",
+                        lambda cell, lang, options: readings.append(cell.shape) or "15.00\n")
+    binary = np.full((240, 720), 255, np.uint8)
+    discount = [word("Скидка", 20, 45), word("-15.00", 628, 45), word("Возврат", 20, 90),
+                word("-1S.00", 628, 90, conf=41.0), word("Хлеб", 20, 135), word("45.00", 628, 135), word("Сыр", 20, 180), word("300.00", 628, 180)]
+    words, corrected = price_reocr.reocr_price_column(binary, discount, max_confidence=90)
+
+    # A confident negative price is clean; a doubtful one keeps its minus after the re-read
+    assert len(readings) == 1
+    assert corrected == 1
+    assert [w.text for w in words[1::2]] == ["-15.00", "-15.00", "45.00", "300.00"]
@@ -0,0 +1,76 @@
+# tests/test_receipt_classifier.py
+import asyncio
+
+import cv2
+import numpy as np
+
+from app.services import ocr_services
+from app.services.decode import DecodeInfo
+from app.services.receipt_classifier import classify_upload
+
+
+def encode(img):
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+def receipt_photo(lines=45):
+    photo = np.full((3000, 2000, 3), (70, 90, 110), np.uint8)
+    paper = np.full((2600, 900, 3), 235, np.uint8)
+    for i in range(lines):
+        cv2.putText(paper, f"ITEM {i:03d} 2 x 45.90", (30, 80 + i * 55), cv2.FONT_HERSHEY_SIMPLEX, 1.3, (20, 20, 20), 3)
+    photo[200:2800, 550:1450] = paper
+    return photo
+
+
+def test_accepts_receipt_photo():
+    classification = classify_upload(encode(receipt_photo()))
+    assert classification.is_receipt_like
+    assert classification.features.text_lines >= 40
+
+
+def test_accepts_short_receipt():
+    assert classify_upload(encode(receipt_photo(lines=6))).is_receipt_like
+
+
+def test_rejects_photo_without_text():
+    rng = np.random.default_rng(0)
+    scene = cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (2000, 1500), interpolation=cv2.INTER_CUBIC)
+    scene = np.clip(cv2.GaussianBlur(scene, (0, 0), 5) + rng.normal(0, 25, scene.shape), 0, 255).astype(np.uint8)
+    assert not classify_upload(encode(scene)).is_receipt_like
+
+
+def test_rejects_blank_page():
+    assert not classify_upload(encode(np.full((1500, 1000, 3), 250, np.uint8))).is_receipt_like
+
+
+def test_undecodable_upload_is_left_to_ocr():
+    assert classify_upload(b"not an image") is None
+
+
+def test_receipt_with_fiscal_qr_and_few_lines_gets_ocr(monkeypatch):
+    qr = cv2.QRCodeEncoder.create().encode("t=20240312T1422&s=224.80&fn=9289000100123456&i=12345&fp=1234567890&n=1")
+    qr = cv2.resize(qr, None, fx=8, fy=8, interpolation=cv2.INTER_NEAREST)
+    # A close-up of the QR code at the bottom of a receipt, on a red tablecloth
+    photo = np.full((1200, 1000, 3), (40, 80, 200), np.uint8)
+    photo[150:250 + qr.shape[0], 200:300 + qr.shape[1]] = 240
+    photo[200:200 + qr.shape[0], 250:250 + qr.shape[1]] = qr[:, :, None]
+    contents = encode(photo)
+    assert not classify_upload(contents).is_receipt_like
+
+    ocr_calls = []
+
+    async def run_ocr_pipeline(contents, detect_qr=False, tier=None, preprocessing=None):
+        ocr_calls.append(detect_qr)
+        return ocr_services.OCRResult(text="ИТОГО 224.80\n", decode=DecodeInfo((1000, 1200), (1000, 1200), 1, 1.0, 0, 0, 1.0))
+
+    monkeypatch.setattr(ocr_services, "run_ocr_pipeline", run_ocr_pipeline)
+    monkeypatch.setattr(ocr_services, "receipt_cache", None)
+    monkeypatch.setattr(ocr_services.ocr_executor, "mode", "thread")
+    monkeypatch.setattr(ocr_services.settings, "OCR_PRECLASSIFY", True)
+    monkeypatch.setattr(ocr_services.settings, "OCR_FISCAL_QR", True)
+
+    result = asyncio.run(ocr_services.process_receipt_bytes(contents))
+    # OCR ran without looking for the QR code a second time
+    assert ocr_calls == [False]
+    assert result["bill_date"] == "2024-03-12"
+    assert result["total_amount"] == 224.8
@@ -0,0 +1,28 @@
+# tests/test_receipt_parser.py
+import json
+from pathlib import Path
+
+import pytest
+
+from app.services.ocr_services import parse_receipt_data
+
+# Inputs and outputs recorded from the regex cascade parse_receipt_data used
+# before the single-pass parser: hand-written receipts, long synthetic ones
+# and randomly generated texts that exercise all three item strategies
+GOLDEN_CASES = json.loads((Path(__file__).parent / "data" / "parser_golden.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("case", GOLDEN_CASES, ids=[f"case{i}" for i in range(len(GOLDEN_CASES))])
+def test_matches_golden_output(case):
+    assert parse_receipt_data(case["text"]) == case["expected"]
+
+
+def test_amount_on_next_line():
+    result = parse_receipt_data("Магазин\nИтого к оплате:\n  123,45\n")
+    assert result["total_amount"] == 123.45
+    assert result["is_receipt"] is True
+
+
+def test_label_priority_beats_position():
+    result = parse_receipt_data("ИТОГО: 10.00\nВсего: 20.00\nК оплате: 30.00")
+    assert result["total_amount"] == 20.0
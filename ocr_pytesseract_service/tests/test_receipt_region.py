@@ -0,0 +1,40 @@
+# tests/test_receipt_region.py
+import cv2
+import numpy as np
+
+from app.services.receipt_region import estimate_skew, extract_receipt_region
+
+
+def receipt_paper(lines=30):
+    paper = np.full((1200, 500), 235, np.uint8)
+    for i in range(lines):
+        cv2.putText(paper, f"Item {i}  12.50", (20, 40 + i * 38), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 20, 2)
+    return paper
+
+
+def rotated(img, angle, border):
+    height, width = img.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(img, matrix, (width, height), borderValue=border)
+
+
+def test_crops_receipt_on_dark_background():
+    photo = np.full((1600, 1200), 60, np.uint8)
+    photo[200:1400, 350:850] = receipt_paper()
+    cropped, info = extract_receipt_region(rotated(photo, 4, 60))
+
+    assert info.found
+    assert abs(info.output_size[0] - 500) < 15 and abs(info.output_size[1] - 1200) < 15
+    # Only paper left: no dark background pixels along the borders
+    assert cropped[5:-5, 5].min() > 150 and cropped[5:-5, -5].min() > 150
+
+
+def test_estimates_skew_of_full_frame_scan():
+    assert abs(estimate_skew(rotated(receipt_paper(), -3, 235)) - 3) <= 0.4
+
+
+def test_scan_filling_the_frame_is_not_cropped():
+    scan = receipt_paper()
+    output, info = extract_receipt_region(scan)
+    assert not info.found
+    assert output.shape == scan.shape
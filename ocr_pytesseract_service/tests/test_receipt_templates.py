@@ -0,0 +1,95 @@
+# tests/test_receipt_templates.py
+import json
+
+import pytest
+
+from app.services import receipt_templates
+from app.services.receipt_parser import parse_receipt_data
+from app.services.receipt_templates import (
+    BUILTIN_TEMPLATES, TemplateRegistry, build_template, header_tokens, load_templates
+)
+
+X5_RECEIPT = """ООО "АГРОТОРГ"
+Магазин "Пятёрочка" 12345
+г. Москва, ул. Ленина, 1
+КАССОВЫЙ ЧЕК
+Приход
+Молоко 3.2% 1л
+2 X 89.99 =179.98
+Хлеб Бородинский
+1 X 45.50 =45.50
+ИТОГ =225.48
+Дата 12.03.2024 14:22
+"""
+
+MAGNIT_RECEIPT = """АО "Тандер"
+Магазин МАГНИТ
+КАССОВЫЙ ЧЕК
+Сыр Российский 0.35 * 650.00 = 227.50
+Вода питьевая 1.5л 3 * 39.90 = 119.70
+ИТОГО: 347.20
+"""
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = TemplateRegistry(BUILTIN_TEMPLATES)
+    monkeypatch.setattr(receipt_templates, "template_registry", registry)
+    return registry
+
+
+def test_header_tokens_fold_latin_lookalikes():
+    # OCR often mixes Latin letters into Cyrillic words
+    assert header_tokens(["MAГHИT"]) == header_tokens(["Магнит"])
+    assert header_tokens(["Пятёрочка"]) == header_tokens(["ПЯТЕРОЧКА"])
+
+
+def test_matches_chain_from_header(registry):
+    assert registry.match(X5_RECEIPT.splitlines()).name == "x5"
+    assert registry.match(MAGNIT_RECEIPT.splitlines()).name == "magnit"
+    assert registry.match(["ООО Ромашка", "КАССОВЫЙ ЧЕК"]) is None
+
+
+def test_x5_items_and_total(registry):
+    result = parse_receipt_data(X5_RECEIPT)
+    assert result["items"] == [
+        {"description": "Молоко 3.2% 1л", "quantity": 2.0, "unit_price": 89.99, "total_price": 179.98},
+        {"description": "Хлеб Бородинский", "quantity": 1.0, "unit_price": 45.5, "total_price": 45.5},
+    ]
+    # "ИТОГ =" is not one of the generic total labels
+    assert result["total_amount"] == 225.48
+    assert result["bill_date"] == "2024-03-12"
+    assert result["is_receipt"] is True
+
+
+def test_magnit_items(registry):
+    result = parse_receipt_data(MAGNIT_RECEIPT)
+    assert [item["description"] for item in result["items"]] == ["Сыр Российский", "Вода питьевая 1.5л"]
+    assert result["items"][0]["quantity"] == 0.35
+    assert result["total_amount"] == 347.2
+
+
+def test_unknown_layout_uses_generic_parser(registry, monkeypatch):
+    text = "Магазин\nАдрес\nИНН 123\nЧек 1\nКассир\nХлеб 2 90.00\nИтого: 90.00\n"
+    with_templates = parse_receipt_data(text)
+    monkeypatch.setattr(receipt_templates, "template_registry", None)
+    assert with_templates == parse_receipt_data(text)
+
+
+def test_loads_templates_from_json(tmp_path, registry):
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps([{
+        "name": "lenta",
+        "tokens": ["Лента"],
+        "items": r"^(?P<description>[^\d\n]+?)\s+(?P<quantity>\d+)\s*шт\s+(?P<total_price>\d+\.\d{2})$",
+    }], ensure_ascii=False), encoding="utf-8")
+    for template in load_templates(str(path)):
+        registry.register(template)
+
+    result = parse_receipt_data("ООО ЛЕНТА\nЧек\nЯблоки 2 шт 120.00\n")
+    assert result["items"] == [{"description": "Яблоки", "quantity": 2.0, "unit_price": 60.0, "total_price": 120.0}]
+
+
+def test_token_owned_by_two_templates_is_rejected(registry):
+    with pytest.raises(ValueError):
+        registry.register(build_template("copy", ["Магнит"], items=r"(?P<description>x)"))
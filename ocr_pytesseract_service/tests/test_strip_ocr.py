@@ -0,0 +1,53 @@
+# tests/test_strip_ocr.py
+import numpy as np
+
+from app.services.strip_ocr import find_strip_bounds, stitch_text, stitch_words
+from app.services.tesseract_engine import OCRWord
+
+
+def text_lines(height, width=400, line_height=20, gap=10):
+    binary = np.full((height, width), 255, np.uint8)
+    for top in range(0, height - line_height, line_height + gap):
+        binary[top:top + line_height, 10:width - 10] = 0
+    return binary
+
+
+def test_short_image_is_one_strip():
+    assert find_strip_bounds(text_lines(500), 400, 40) == [(0, 500)]
+
+
+def test_cuts_fall_in_gaps_between_lines():
+    binary = text_lines(3000)
+    bounds = find_strip_bounds(binary, 1000, 40)
+    assert len(bounds) == 3
+    assert bounds[0][0] == 0 and bounds[-1][1] == 3000
+    for (_, bottom), (top, _) in zip(bounds, bounds[1:]):
+        assert bottom == top
+        assert (binary[bottom] == 255).all()
+
+
+def test_overlaps_when_there_is_no_gap():
+    binary = np.zeros((3000, 400), np.uint8)
+    bounds = find_strip_bounds(binary, 1000, 40)
+    assert bounds == [(0, 1040), (960, 2040), (1960, 3000)]
+
+
+def test_stitch_drops_repeated_overlap_lines():
+    first = "Молоко 2 179.80\nХлеб 1 45.00\n\f"
+    second = "Хлеб 1 45.00\nСыр 1 300.00\n"
+    assert stitch_text([first, second], [(0, 1040), (960, 2000)]) == "Молоко 2 179.80\nХлеб 1 45.00\n\nСыр 1 300.00\n"
+
+
+def test_stitch_keeps_repeated_rows_at_a_gap_cut():
+    first = "Молоко 2 179.80\nПакет 1 5.00\n\f"
+    second = "Пакет 1 5.00\nИтого: 189.80\n"
+    assert stitch_text([first, second], [(0, 1000), (1000, 2000)]) == \
+        "Молоко 2 179.80\nПакет 1 5.00\n\nПакет 1 5.00\nИтого: 189.80\n"
+
+
+def test_stitch_words_keeps_overlap_words_once():
+    word = OCRWord("45.00", 10, 70, 50, 20, 90.0, 1, 1, 1)
+    bounds = [(0, 100), (60, 200)]
+    # The same word seen at the bottom of the first strip and the top of the second
+    words = stitch_words([[word], [OCRWord("45.00", 10, 10, 50, 20, 90.0, 1, 1, 1)]], bounds)
+    assert len(words) == 1 and words[0].top == 70
@@ -0,0 +1,142 @@
+# tests/test_tesseract_engine.py
+import enum
+
+import numpy as np
+import pytest
+
+from app.services import tesseract_engine
+from app.services.tesseract_engine import EngineInitError, TesseractEnginePool, TesseractOptions
+
+
+class FakeAPI:
+    created = []
+    attempts = 0
+
+    def __init__(self, lang, path=None, oem=None):
+        FakeAPI.attempts += 1
+        if lang == "missing":
+            raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+        self.lang, self.path, self.oem = lang, path, oem
+        self.psm = FakeTesserocr.PSM.AUTO
+        self.variables = {}
+        self.calls = []
+        FakeAPI.created.append(self)
+
+    def SetPageSegMode(self, psm):
+        self.psm = psm
+
+    def SetVariable(self, name, value):
+        self.variables[name] = value
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        self.calls.append(("image", width, height))
+
+    def GetUTF8Text(self):
+        return f"text psm={self.psm.value} whitelist={self.variables.get('tessedit_char_whitelist', '')}"
+
+    def Clear(self):
+        self.calls.append(("clear",))
+
+    def End(self):
+        self.calls.append(("end",))
+
+
+class FakeTesserocr:
+    class PSM(enum.IntEnum):
+        AUTO = 3
+        SINGLE_LINE = 7
+
+    class OEM(enum.IntEnum):
+        LSTM_ONLY = 1
+
+    PyTessBaseAPI = FakeAPI
+
+
+@pytest.fixture
+def fake_tesserocr(monkeypatch):
+    FakeAPI.created, FakeAPI.attempts = [], 0
+    monkeypatch.setattr(tesseract_engine, "tesserocr", FakeTesserocr)
+    return FakeTesserocr
+
+
+def test_handles_are_reused_per_language_and_model(fake_tesserocr):
+    pool = TesseractEnginePool("/tessdata")
+    with pool.acquire("rus") as first:
+        pass
+    with pool.acquire("rus") as second:
+        pass
+    with pool.acquire("rus", TesseractOptions(oem=1, tessdata_path="/fast")) as fast:
+        pass
+
+    assert first is second
+    assert fast is not first
+    assert (first.path, fast.path, fast.oem) == ("/tessdata", "/fast", FakeTesserocr.OEM.LSTM_ONLY)
+    assert len(FakeAPI.created) == 2
+
+    pool.close()
+    assert ("end",) in first.calls and ("end",) in fast.calls
+
+
+def test_per_call_options_are_reset_on_release(fake_tesserocr):
+    pool = TesseractEnginePool()
+    img = np.zeros((10, 20), np.uint8)
+    text = pool.image_to_string(img, "rus", TesseractOptions(psm=7, whitelist="0123456789"))
+    assert text == "text psm=7 whitelist=0123456789"
+
+    # The next caller gets the same handle back with Tesseract's defaults
+    assert pool.image_to_string(img, "rus") == "text psm=3 whitelist="
+    api = FakeAPI.created[0]
+    assert len(FakeAPI.created) == 1
+    assert api.calls.count(("clear",)) == 2
+    assert ("image", 20, 10) in api.calls
+
+
+def test_handle_is_returned_when_the_caller_fails(fake_tesserocr):
+    pool = TesseractEnginePool()
+    with pytest.raises(ValueError):
+        with pool.acquire("rus"):
+            raise ValueError("OCR failed")
+    with pool.acquire("rus"):
+        pass
+    assert len(FakeAPI.created) == 1
+
+
+def test_language_data_errors_are_reported(fake_tesserocr):
+    with pytest.raises(EngineInitError):
+        with TesseractEnginePool().acquire("missing"):
+            pass
+
+
+@pytest.mark.parametrize("configured, installed, expected", [
+    ("auto", True, "tesserocr"),
+    ("auto", False, "subprocess"),
+    ("tesserocr", False, "subprocess"),
+    ("subprocess", True, "subprocess"),
+])
+def test_resolve_backend(monkeypatch, configured, installed, expected):
+    monkeypatch.setattr(tesseract_engine.settings, "OCR_ENGINE", configured)
+    monkeypatch.setattr(tesseract_engine, "tesserocr", FakeTesserocr if installed else None)
+    assert tesseract_engine._resolve_backend() == expected
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setattr(tesseract_engine.settings, "OCR_ENGINE", "cuneiform")
+    with pytest.raises(ValueError):
+        tesseract_engine._resolve_backend()
+
+
+def test_falls_back_to_subprocess_only_for_models_that_cannot_start(fake_tesserocr, monkeypatch):
+    pool = TesseractEnginePool()
+    monkeypatch.setattr(tesseract_engine, "engine_backend", "tesserocr")
+    monkeypatch.setattr(tesseract_engine, "engine_pool", pool)
+    monkeypatch.setattr(tesseract_engine.pytesseract, "image_to_string",
+                        lambda img, lang, config: "subprocess text")
+    img = np.zeros((10, 20), np.uint8)
+
+    for _ in range(2):
+        assert tesseract_engine.image_to_string(img, lang="missing") == "subprocess text"
+    # The failing models are not initialised again, the others still use the pool
+    assert FakeAPI.attempts == 1
+    assert tesseract_engine.image_to_string(img, lang="rus") == "text psm=3 whitelist="
+    assert tesseract_engine.engine_backend == "tesserocr"
+    assert tesseract_engine.engine_pool is pool